@@ -0,0 +1,242 @@
+import os
+import sys
+import time
+import struct
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+# Headless: bpy/nrfile/nrtools stand-ins. Module level, so multiprocessing workers get them too
+import nrbenchstub
+bpy = nrbenchstub.install()
+
+import nrimp
+import nrbulk
+import nrdecode
+import nrblendimp
+
+
+# Import hot paths benchmarks. Blender independent.
+#   python nrbench.py --help
+#
+# Each stage reports wall time (untraced run), allocated bytes still alive after the stage
+# and peak traced memory (tracemalloc run).
+
+
+def createIndexBuffer(triCount, vertCount):
+    rnd = np.random.default_rng(0)
+    return rnd.integers(0, vertCount, size=triCount * 3, dtype=np.int32).tobytes()
+
+
+# Old path: struct.unpack_from per triangle
+def decodeTrianglesStruct(indexData, indexCount):
+    faces = []
+    for idx in range(0, int(indexCount/3)):
+        faces.append(struct.unpack_from("iii", indexData, 12*idx))
+    return faces
+
+
+# Old path: from_pydata + bmesh round trip, UVs written per loop (nrbenchstub.BMesh stands in for bmesh)
+def buildMeshBmesh(mesh, positions3, faces, texCoords):
+    mesh.from_pydata(positions3, [], faces)
+    mesh.update()
+
+    bm = nrbenchstub.BMesh()
+    try:
+        bm.from_mesh(mesh)
+        bm.verts.ensure_lookup_table()
+        uv_lay = bm.loops.layers.uv.new("uv_0")
+        for face in bm.faces:
+            for vv in face.loops:
+                uv = texCoords[vv.vert.index]
+                vv[uv_lay].uv.x = uv[0]
+                vv[uv_lay].uv.y = 1.0 - uv[1]
+        bm.to_mesh(mesh)
+    finally:
+        bm.free()
+    mesh.update()
+
+
+# New path: single pass on the Mesh datablock
+def buildMeshSinglePass(mesh, positions, faces, loopUvs):
+    nrblendimp.buildMeshGeometry(mesh, positions, faces=faces)
+    nrblendimp.BlenderImporter()._createTexCoords(mesh, [(0, loopUvs)])
+    mesh.update(calc_edges=True)
+
+
+def timeIt(func, *args):
+    t = time.perf_counter()
+    res = func(*args)
+    return res, time.perf_counter() - t
+
+
+class StageResult(object):
+    def __init__(self, name, seconds, allocBytes, peakBytes):
+        self.name       = name
+        self.seconds    = seconds
+        self.allocBytes = allocBytes
+        self.peakBytes  = peakBytes
+
+    def __str__(self):
+        return "{:<32} {:>9.4f}s  alloc={:>10.2f}MB  peak={:>10.2f}MB".format(
+            self.name, self.seconds, self.allocBytes / 1048576.0, self.peakBytes / 1048576.0)
+
+
+# func() is called twice: timed, then traced. setup() runs before each call (not measured)
+def measureStage(name, func, setup=None):
+    if setup:
+        setup()
+    res, seconds = timeIt(func)
+    del res
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        res = func()
+        allocBytes, peakBytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = StageResult(name, seconds, allocBytes, peakBytes)
+    print(result)
+    return result
+
+
+def benchIndexDecoding(triCount):
+    indexData = createIndexBuffer(triCount, triCount)
+    indexCount = triCount * 3
+
+    facesOld, tOld = timeIt(decodeTrianglesStruct, indexData, indexCount)
+    facesNew, tNew = timeIt(nrbulk.decodeTriangles, indexData, indexCount)
+
+    if not np.array_equal(np.asarray(facesOld, dtype=np.int32), facesNew):
+        raise RuntimeError("decodeTriangles() result mismatch")
+
+    print("Index decoding, triangles={}".format(triCount))
+    print("  struct.unpack_from: {:.4f}s".format(tOld))
+    print("  nrbulk:             {:.4f}s  (x{:.0f})".format(tNew, tOld / max(tNew, 1e-9)))
+
+
+# Mesh build with one UV layer. Stand-in datablocks: Python side work only, blender internal copies are not included
+def benchMeshBuild(triCount):
+    vertCount = max(triCount // 2, 3)
+    rnd = np.random.default_rng(0)
+    positions = rnd.random((vertCount, 3), dtype=np.float32)
+    faces = nrbulk.decodeTriangles(createIndexBuffer(triCount, vertCount), triCount * 3)
+    texCoords = rnd.random((vertCount, 2), dtype=np.float32)
+    # Decoder outputs: lists (old nrtools unpack), arrays (nrdecode)
+    positionsList, facesList, texCoordsList = positions.tolist(), [tuple(f) for f in faces.tolist()], texCoords.tolist()
+    loopUvs = nrbulk.gatherByIndexes(nrbulk.texCoordsToArray(texCoords), faces.ravel())
+
+    meshOld = nrbenchstub.Mesh("old")
+    meshNew = nrbenchstub.Mesh("new")
+    res, tOld = timeIt(buildMeshBmesh, meshOld, positionsList, facesList, texCoordsList)
+    res, tNew = timeIt(buildMeshSinglePass, meshNew, positions, faces, loopUvs)
+
+    for name, attr in (("vertices", "co"), ("loops", "vertex_index")):
+        if not np.allclose(getattr(meshOld, name).arrays[attr], getattr(meshNew, name).arrays[attr]):
+            raise RuntimeError("buildMeshGeometry() {} mismatch".format(name))
+    if not np.allclose(meshOld.uv_layers["uv_0"].data.arrays["uv"], meshNew.uv_layers["uv_0"].data.arrays["uv"]):
+        raise RuntimeError("buildMeshGeometry() uv mismatch")
+
+    print("Mesh build, vertices={} triangles={} uvSets=1".format(vertCount, triCount))
+    print("  from_pydata + bmesh: {:.4f}s".format(tOld))
+    print("  buildMeshGeometry:   {:.4f}s  (x{:.0f})".format(tNew, tOld / max(tNew, 1e-9)))
+
+
+def createOptions(args):
+    options = nrimp.ImportOptions()
+    if args.color_sets > 0:
+        options.vertCol.loadMode = nrimp.VertexColorsLoadMode.Auto
+    if not args.normals:
+        options.normalVecs.loadMode = nrimp.NormalVectorsLoadMode.Disabled
+    if 0 == args.uv_sets:
+        options.texCoord.loadMode = nrimp.TexcoordLoadMode.Disabled
+    options.extraOptions.instanceMeshes = args.instance
+    options.extraOptions.mergeGroupMeshes = args.merge
+    options.extraOptions.maxMeshVertices = args.max_mesh_vertices
+    options.extraOptions.texturePrefetchThreads = args.prefetch_threads
+    return options
+
+
+def createMeshDescList(args):
+    topology = {"triangles": nrbenchstub.PrimitiveTopology.TriangleList,
+                "lines":     nrbenchstub.PrimitiveTopology.LineList,
+                "points":    nrbenchstub.PrimitiveTopology.PointList}[args.topology]
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=args.vertices, primCount=args.prims, topology=topology,
+                                        postVs=args.postvs, uvSets=args.uv_sets, colorSets=args.color_sets,
+                                        normals=args.normals, texturesCount=args.textures)
+    return [desc] * args.meshes
+
+
+def benchImport(args):
+    options = createOptions(args)
+    loadPostVs = args.postvs
+    workDir = tempfile.mkdtemp(prefix="nrbench_")
+    try:
+        captureDir = nrbenchstub.generateCapture(workDir, args.files, createMeshDescList(args))
+        fileList = nrdecode.collectFiles([captureDir])
+        fileName = fileList[0]
+
+        print("Import: files={} meshes/file={} vertices={} prims={} topology={} postVs={} uvSets={} colorSets={} normals={}".format(
+            args.files, args.meshes, args.vertices, args.prims, args.topology, args.postvs, args.uv_sets, args.color_sets, args.normals))
+
+        resetBpy = lambda: nrbenchstub.reset(bpy)
+        hashManager = sys.modules["nrtools"].MeshHashesManager()
+
+        measureStage("decodeFile", lambda: nrdecode.decodeFile(loadPostVs, fileName, options, hashManager))
+
+        # Building consumes decoded arrays: fresh FileData per run
+        decoded = []
+        def decodeAndReset():
+            resetBpy()
+            decoded[:] = [nrdecode.decodeFile(loadPostVs, fileName, options, hashManager)]
+        measureStage("build (_importFileData)", lambda: nrblendimp.BlenderImporter()._importFileData(options, decoded.pop()), decodeAndReset)
+
+        measureStage("_importMeshImpl", lambda: nrblendimp.BlenderImporter()._importMeshImpl(loadPostVs, fileName, options, hashManager), resetBpy)
+
+        options.extraOptions.workersCount = 0
+        measureStage("importFiles (serial)", lambda: nrblendimp.importFiles(loadPostVs, [captureDir], options), resetBpy)
+
+        if args.workers > 0:
+            # Traced memory covers the main process only
+            options.extraOptions.workersCount = args.workers
+            measureStage("importFiles (workers={})".format(args.workers), lambda: nrblendimp.importFiles(loadPostVs, [captureDir], options), resetBpy)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Ninja Ripper importer benchmarks (headless)")
+    parser.add_argument("--index-tris", type=int, default=1000000, help="Triangles for index decoding benchmark")
+    parser.add_argument("--build-tris", type=int, default=100000, help="Triangles for mesh build benchmark (bmesh baseline)")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--meshes", type=int, default=2, help="Meshes per file")
+    parser.add_argument("--vertices", type=int, default=50000)
+    parser.add_argument("--prims", type=int, default=100000, help="Triangles/lines per mesh")
+    parser.add_argument("--topology", choices=["triangles", "lines", "points"], default="triangles")
+    parser.add_argument("--postvs", action="store_true", help="PostVS (xyzw) positions")
+    parser.add_argument("--uv-sets", type=int, default=1)
+    parser.add_argument("--color-sets", type=int, default=0)
+    parser.add_argument("--no-normals", dest="normals", action="store_false")
+    parser.add_argument("--textures", type=int, default=1, help="Textures per mesh")
+    parser.add_argument("--workers", type=int, default=0, help="ExtraOptions.workersCount for parallel importFiles run")
+    parser.add_argument("--prefetch-threads", type=int, default=0, help="ExtraOptions.texturePrefetchThreads")
+    parser.add_argument("--instance", action="store_true", help="ExtraOptions.instanceMeshes")
+    parser.add_argument("--merge", action="store_true", help="ExtraOptions.mergeGroupMeshes")
+    parser.add_argument("--max-mesh-vertices", type=int, default=0, help="ExtraOptions.maxMeshVertices")
+    args = parser.parse_args(argv[1:])
+
+    if args.index_tris > 0:
+        benchIndexDecoding(args.index_tris)
+    if args.build_tris > 0:
+        benchMeshBuild(args.build_tris)
+    benchImport(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
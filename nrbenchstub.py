@@ -0,0 +1,692 @@
+import os
+import shutil
+import sys
+import json
+import types
+import contextlib
+import math
+import struct
+import hashlib
+
+import numpy as np
+
+
+# Headless stand-ins for the benchmark suite (nrbench.py).
+#
+#   bpy     - minimal Mesh/Object/Material/Image datablocks. foreach_set() copies into numpy arrays,
+#             close to the cost of the C implementation.
+#   nrfile  - synthetic captures. A synthetic .nr file is a small JSON description, buffers are generated on parse().
+#   nrtools - reference per-vertex decoders for the synthetic interleaved float32 layout.
+#
+# install() registers them in sys.modules before nrdecode/nrblendimp are imported.
+# Benchmarks measure the importer code (nrdecode/nrbulk/nrblendimp), not real .nr parsing.
+
+
+################################################################
+# Synthetic capture description
+
+class SyntheticMeshDesc(object):
+    def __init__(self, vertexCount=1000, primCount=1000, topology=0, postVs=False,
+                 uvSets=1, colorSets=0, normals=True, texturesCount=1, group0Id=0, group1Id=0):
+        self.vertexCount   = vertexCount
+        self.primCount     = primCount     # Triangles/lines. Ignored for PointList
+        self.topology      = topology      # PrimitiveTopology
+        self.postVs        = postVs
+        self.uvSets        = uvSets
+        self.colorSets     = colorSets
+        self.normals       = normals
+        self.texturesCount = texturesCount
+        self.group0Id      = group0Id
+        self.group1Id      = group1Id
+
+
+def writeSyntheticFile(fileName, meshDescList, seed=0):
+    data = {"seed": seed, "meshes": [d.__dict__ for d in meshDescList]}
+    with open(fileName, "w") as f:
+        json.dump(data, f)
+
+
+# Directory with filesCount synthetic .nr files and their textures.
+# Returns directory path with trailing separator (importFiles)
+def generateCapture(directory, filesCount, meshDescList, textureSize=64 * 1024):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for i in range(filesCount):
+        writeSyntheticFile(os.path.join(directory, "frame_{:05d}.nr".format(i)), meshDescList, seed=i)
+
+    texturesCount = max([d.texturesCount for d in meshDescList] + [0])
+    for i in range(texturesCount):
+        with open(os.path.join(directory, "tex_{}.dds".format(i)), "wb") as f:
+            f.write(b"DDS " + bytes(textureSize))
+    return os.path.join(directory, "")
+
+
+################################################################
+# nrfile stand-in
+
+class ShaderStage:
+    PreVs  = 0
+    PostVs = 1
+
+
+class PrimitiveTopology:
+    TriangleList = 0
+    LineList     = 1
+    PointList    = 2
+
+
+def topologyToStr(t):
+    return {0: "TriangleList", 1: "LineList", 2: "PointList"}.get(t, "Unknown")
+
+
+class SyntheticAttr(object):
+    def __init__(self, name, offset, compCount):
+        self.name      = name
+        self.offset    = offset     # Bytes
+        self.compCount = compCount  # float32 components
+
+
+class SyntheticVertexAttributes(object):
+    def __init__(self, attrs, stride):
+        self.attrs  = attrs
+        self.stride = stride
+
+    def getAttr(self, idx):
+        return self.attrs[idx]
+
+    def getAttrCount(self):
+        return len(self.attrs)
+
+
+class SyntheticStream(object):
+    def __init__(self, data, count):
+        self.data  = data
+        self.count = count
+
+    def read(self):
+        return self.data
+
+    def getVertexCount(self):
+        return self.count
+
+    def getIndexCount(self):
+        return self.count
+
+
+class SyntheticMesh(object):
+    def __init__(self, desc, rnd):
+        self.desc = desc
+        attrs = []
+        offset = 0
+
+        def addAttr(name, compCount):
+            attrs.append(SyntheticAttr(name, offset, compCount))
+            return offset + compCount * 4
+
+        offset = addAttr("POSITION", 4 if desc.postVs else 3)
+        if desc.normals:
+            offset = addAttr("NORMAL", 3)
+        for i in range(desc.uvSets):
+            offset = addAttr("TEXCOORD", 2)
+        for i in range(desc.colorSets):
+            offset = addAttr("COLOR", 4)
+
+        self.vatrs = SyntheticVertexAttributes(attrs, offset)
+        comps = offset // 4
+        vertexData = rnd.random((desc.vertexCount, comps), dtype=np.float32)
+        if desc.postVs:
+            vertexData[:, 3] = 1.0
+        self.vert = SyntheticStream(vertexData.tobytes(), desc.vertexCount)
+
+        primSize = {PrimitiveTopology.TriangleList: 3, PrimitiveTopology.LineList: 2}.get(desc.topology, 0)
+        self.indx = None
+        if primSize:
+            indexes = rnd.integers(0, desc.vertexCount, size=desc.primCount * primSize, dtype=np.int32)
+            self.indx = SyntheticStream(indexes.tobytes(), len(indexes))
+
+        self.textures = ["tex_{}.dds".format(i) for i in range(desc.texturesCount)]
+
+    def getShaderStage(self):
+        return ShaderStage.PostVs if self.desc.postVs else ShaderStage.PreVs
+
+    def getPrimitiveTopology(self):
+        return self.desc.topology
+
+    def getVertexAttributes(self, idx):
+        return self.vatrs if 0 == idx else None
+
+    def getVertexes(self, idx):
+        return self.vert if 0 == idx else None
+
+    def getIndexes(self, idx):
+        return self.indx
+
+    def getTextures(self):
+        return self.textures
+
+    def getGroup0Id(self):
+        return self.desc.group0Id
+
+    def getGroup1Id(self):
+        return self.desc.group1Id
+
+    def getWidth(self):
+        return 1920
+
+    def getHeight(self):
+        return 1080
+
+
+class NRFile(object):
+    def __init__(self):
+        self.meshes = []
+        self.fileSize = 0
+        self.error = ""
+
+    def parse(self, fileName):
+        try:
+            with open(fileName, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+        rnd = np.random.default_rng(data.get("seed", 0))
+        for d in data["meshes"]:
+            desc = SyntheticMeshDesc()
+            desc.__dict__.update(d)
+            mesh = SyntheticMesh(desc, rnd)
+            self.meshes.append(mesh)
+            self.fileSize += len(mesh.vert.data) + (len(mesh.indx.data) if mesh.indx else 0)
+        return True
+
+    def getErrorString(self):
+        return self.error
+
+    def getFileSize(self):
+        return self.fileSize
+
+    def getMeshCount(self):
+        return len(self.meshes)
+
+    def getMesh(self, idx):
+        return self.meshes[idx]
+
+
+################################################################
+# nrtools stand-in. Per-vertex Python decoding, same shape of results as nrtools
+
+def logInfo(msg):
+    pass
+
+
+def logWarn(msg):
+    pass
+
+
+def logError(msg):
+    pass
+
+
+def _findAttrs(vatrs, name):
+    return [i for i, a in enumerate(vatrs.attrs) if a.name == name]
+
+
+# comps: [nrimp.AttrComp, ...] -> [(c0, c1, ...), ...]
+def unpackVertexComponentVaAsList(vert, vertexData, vatrs, comps):
+    offsets = [vatrs.getAttr(c.attr).offset + 4 * c.comp for c in comps]
+    stride = vatrs.stride
+    res = []
+    for v in range(vert.getVertexCount()):
+        base = v * stride
+        res.append(tuple(struct.unpack_from("f", vertexData, base + o)[0] for o in offsets))
+    return res
+
+
+def createPos3FromPreVsAsList(options, vatrs, vert, vertexData):
+    import nrimp
+    return unpackVertexComponentVaAsList(vert, vertexData, vatrs, [nrimp.AttrComp(0, 0), nrimp.AttrComp(0, 1), nrimp.AttrComp(0, 2)])
+
+
+# D3DX projection matrices (row vector convention: clip = pos * projMat), near/far 0.01/1000
+def _createProjMatrix(posPostVs, width, height):
+    import nrimp
+    zn, zf = 0.01, 1000.0
+    rh = posPostVs.useRightHanded
+    if nrimp.PositionTransformMode.Matrix == posPostVs.transformMode:
+        return [[float(x) for x in row] for row in posPostVs.projMat]
+    if nrimp.PositionTransformMode.FOV == posPostVs.transformMode:
+        ys = 1.0 / math.tan(math.radians(posPostVs.fovY) / 2.0)
+        xs = ys * float(height) / float(width)
+        if rh:
+            return [[xs, 0.0, 0.0, 0.0], [0.0, ys, 0.0, 0.0], [0.0, 0.0, zf / (zn - zf), -1.0], [0.0, 0.0, zn * zf / (zn - zf), 0.0]]
+        return [[xs, 0.0, 0.0, 0.0], [0.0, ys, 0.0, 0.0], [0.0, 0.0, zf / (zf - zn), 1.0], [0.0, 0.0, -zn * zf / (zf - zn), 0.0]]
+    # OrthoProj
+    m22 = 1.0 / (zn - zf) if rh else 1.0 / (zf - zn)
+    return [[2.0 / width, 0.0, 0.0, 0.0], [0.0, 2.0 / height, 0.0, 0.0], [0.0, 0.0, m22, 0.0], [0.0, 0.0, zn / (zn - zf), 1.0]]
+
+
+# Gauss-Jordan elimination with partial pivoting
+def _invertMatrix(m):
+    n = len(m)
+    a = [list(row) + [1.0 if i == j else 0.0 for j in range(n)] for i, row in enumerate(m)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        p = a[col][col]
+        a[col] = [x / p for x in a[col]]
+        for r in range(n):
+            if (r != col) and a[r][col]:
+                f = a[r][col]
+                a[r] = [x - f * y for x, y in zip(a[r], a[col])]
+    return [row[n:] for row in a]
+
+
+# Reference per-vertex unprojection: xyzw * inverse(projMat), divided by w
+def createPos3FromPostVsAsList(options, nrmesh, vatrs, vert, vertexData):
+    p = options.posPostVs
+    xyzw = unpackVertexComponentVaAsList(vert, vertexData, vatrs, [p.x, p.y, p.z, p.w])
+    invMat = _invertMatrix(_createProjMatrix(p, nrmesh.getWidth(), nrmesh.getHeight()))
+    res = []
+    for v in xyzw:
+        x, y, z, w = [sum(v[k] * invMat[k][j] for k in range(4)) for j in range(4)]
+        if 0.0 == w:
+            w = 1.0
+        res.append((x / w, y / w, z / w))
+    return res
+
+
+def createTexturesList(textures, fileDirectory):
+    return [os.path.join(fileDirectory, t) for t in textures]
+
+
+def createTexListForTexSlot(options, texList):
+    return texList
+
+
+def isMeshLoadingSkipped(options, vert, indx, textures):
+    return False, ""
+
+
+def createTexCoordList(options, vatrs):
+    import nrimp
+    return [nrimp.TexCoordAttrComp(nrimp.AttrComp(i, 0), nrimp.AttrComp(i, 1)) for i in _findAttrs(vatrs, "TEXCOORD")]
+
+
+def createUVIdxListForUvIdx(options, texCoordAttrCompIdxList):
+    return list(range(len(texCoordAttrCompIdxList)))
+
+
+def createNormalVectorsAuto(vatrs):
+    import nrimp
+    idxs = _findAttrs(vatrs, "NORMAL")
+    if not idxs:
+        return None
+    return [nrimp.AttrComp(idxs[0], i) for i in range(3)]
+
+
+def createVertexColorAttrsList(vatrs):
+    return _findAttrs(vatrs, "COLOR")
+
+
+def unpackVertexColorsAsList(vert, vertexData, vatrs, colorAttrIdx, r, g, b, a, compsCount):
+    import nrimp
+    rgba = unpackVertexComponentVaAsList(vert, vertexData, vatrs, [nrimp.AttrComp(colorAttrIdx, i) for i in range(4)])
+    return [(c[r], c[g], c[b], c[a])[:compsCount] for c in rgba]
+
+
+# Meshes with the same vertex/index buffers as an earlier mesh of the capture are skipped
+class MeshHashesManager(object):
+    def __init__(self):
+        self.skips = {}  # (abspath, meshIdx) -> skipMsg
+
+    def loadHashes(self, loadPostVs, paths, options):
+        import nrdecode
+        seen = {}
+        for fileName in sorted(nrdecode.collectFiles(paths)):
+            nr = NRFile()
+            if not nr.parse(fileName):
+                continue
+            for meshIdx, mesh in enumerate(nr.meshes):
+                h = hashlib.sha1(mesh.vert.data)
+                if mesh.indx:
+                    h.update(mesh.indx.data)
+                key = h.hexdigest()
+                if key in seen:
+                    self.skips[(os.path.abspath(fileName), meshIdx)] = "Duplicate mesh skipped: {} {} (same as {} {})".format(fileName, meshIdx, *seen[key])
+                else:
+                    seen[key] = (fileName, meshIdx)
+
+    def skipMeshLoading(self, fileName, meshIdx):
+        skipMsg = self.skips.get((os.path.abspath(fileName), meshIdx))
+        return (skipMsg is not None), (skipMsg or "")
+
+
+################################################################
+# bpy stand-in
+
+class _Collection(object):
+    def __init__(self, count=0):
+        self.count = count
+        self.arrays = {}
+
+    def __len__(self):
+        return self.count
+
+    def add(self, n):
+        self.count += n
+
+    def foreach_set(self, attr, seq):
+        self.arrays[attr] = np.array(seq)
+
+
+class _LayerCollection(object):
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.layers = []
+
+    def new(self, name="", type=None, domain=None):
+        count = len(self.mesh.vertices) if 'POINT' == domain else len(self.mesh.loops)
+        layer = types.SimpleNamespace(name=name, data=_Collection(count))
+        self.layers.append(layer)
+        return layer
+
+    def __getitem__(self, name):
+        return [x for x in self.layers if x.name == name][0]
+
+
+# ID custom properties (obj["prop"])
+class _IDProps(object):
+    def __getitem__(self, key):
+        return self.__dict__.setdefault("_props", {})[key]
+
+    def __setitem__(self, key, value):
+        self.__dict__.setdefault("_props", {})[key] = value
+
+    def get(self, key, default=None):
+        return self.__dict__.setdefault("_props", {}).get(key, default)
+
+
+class Mesh(object):
+    def __init__(self, name):
+        self.name = name
+        self.users = 0
+        self.vertices = _Collection()
+        self.loops    = _Collection()
+        self.polygons = _Collection()
+        self.edges    = _Collection()
+        self.uv_layers        = _LayerCollection(self)
+        self.color_attributes = _LayerCollection(self)
+        self.materials = []
+        self.normals = None
+
+    def update(self, calc_edges=False, calc_edges_loose=False):
+        if calc_edges:
+            # Unique edges, same order of work as blender
+            loops = self.loops.arrays.get("vertex_index", np.empty(0, dtype=np.int32)).reshape(-1, 3).astype(np.int64)
+            e = np.sort(np.concatenate((loops[:, [0, 1]], loops[:, [1, 2]], loops[:, [2, 0]])), axis=1)
+            self.edges.count = len(np.unique((e[:, 0] << 32) | e[:, 1]))
+
+    # Python sequences converted element by element, as blender does
+    def from_pydata(self, vertices, edges, faces):
+        self.vertices.add(len(vertices))
+        self.vertices.foreach_set("co", [c for v in vertices for c in v])
+        self.loops.add(3 * len(faces))
+        self.polygons.add(len(faces))
+        self.loops.foreach_set("vertex_index", [i for f in faces for i in f])
+        self.polygons.foreach_set("loop_start", [3 * i for i in range(len(faces))])
+        self.update(calc_edges=True)
+
+    def shade_flat(self):
+        pass
+
+    def normals_split_custom_set_from_vertices(self, normals):
+        self.normals = np.array(normals, dtype=np.float32)
+
+
+class _Node(object):
+    def __init__(self):
+        self.location = types.SimpleNamespace(x=0.0, y=0.0)
+        self.inputs  = [None] * 4
+        self.outputs = [None] * 4
+        self.image = None
+        self.layer_name = ""
+
+
+class _NodeList(list):
+    def new(self, nodeType):
+        node = _Node()
+        self.append(node)
+        return node
+
+
+class Material(_IDProps):
+    def __init__(self, name):
+        self.name = name
+        self.use_nodes = False
+        self.node_tree = types.SimpleNamespace(nodes=_NodeList([_Node()]), links=types.SimpleNamespace(new=lambda a, b: None))
+
+
+class Image(object):
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.filepath = path
+        self.filepath_raw = path
+        self.file_format = 'DDS'
+        self.is_float = False
+        self.size = (256, 256)
+
+    # Writes "converted" pixels: source file copy
+    def save(self):
+        shutil.copyfile(self.filepath, self.filepath_raw)
+
+
+class _DataCollection(dict):
+    def __init__(self, factory):
+        dict.__init__(self)
+        self.factory = factory
+
+    # Taken names get a numeric suffix, as in blender ("name.001")
+    def new(self, name, *args, **kwargs):
+        uniqueName = name
+        suffix = 0
+        while uniqueName in self:
+            suffix = suffix + 1
+            uniqueName = "{}.{:03d}".format(name, suffix)
+        item = self.factory(uniqueName, *args)
+        self[uniqueName] = item
+        return item
+
+    # bpy collections iterate datablocks
+    def __iter__(self):
+        return iter(list(self.values()))
+
+    def remove(self, item, do_unlink=True):
+        self.pop(item.name, None)
+
+
+class Object(_IDProps):
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.location = (0.0, 0.0, 0.0)
+
+    def select_set(self, flag):
+        pass
+
+
+class _ObjectLinks(object):
+    def __init__(self):
+        self.objects = []
+
+    def link(self, obj):
+        self.objects.append(obj)
+
+
+class SceneCollection(object):
+    def __init__(self, name=""):
+        self.name = name
+        self.objects  = _ObjectLinks()
+        self.children = _ObjectLinks()
+
+
+class Scene(_IDProps):
+    def __init__(self):
+        self.cursor = types.SimpleNamespace(location=(0.0, 0.0, 0.0))
+        self.collection = SceneCollection("Scene")
+
+
+def _loadImage(path, check_existing=False):
+    if not os.path.isfile(path):
+        raise RuntimeError("Cannot read: {}".format(path))
+    return Image(path)
+
+
+# bpy.data.libraries stand-in: .blend library is a JSON list of material names
+class _Libraries(object):
+    def __init__(self, materials):
+        self.materials = materials
+        self.loadCount = 0
+
+    def write(self, path, datablocks, fake_user=False, path_remap='NONE'):
+        with open(path, "w") as f:
+            json.dump(sorted(d.name for d in datablocks), f)
+
+    @contextlib.contextmanager
+    def load(self, path, link=False):
+        with open(path, "r") as f:
+            dataFrom = types.SimpleNamespace(materials=json.load(f))
+        dataTo = types.SimpleNamespace(materials=[])
+        yield dataFrom, dataTo
+        self.loadCount = self.loadCount + 1
+        dataTo.materials = [self.materials.new(name) for name in dataTo.materials]
+
+
+################################################################
+# bmesh stand-in. Only used by the nrbench baseline (bmesh round trip of the old mesh builder):
+# BMesh elements are Python objects, from_mesh()/to_mesh() copy the whole mesh
+
+class BMVert(object):
+    __slots__ = ("index", "co")
+
+    def __init__(self, index, co):
+        self.index = index
+        self.co = co
+
+
+class BMLoop(object):
+    __slots__ = ("vert", "layers")
+
+    def __init__(self, vert):
+        self.vert = vert
+        self.layers = {}
+
+    def __getitem__(self, layer):
+        item = self.layers.get(layer)
+        if item is None:
+            item = types.SimpleNamespace(uv=types.SimpleNamespace(x=0.0, y=0.0))
+            self.layers[layer] = item
+        return item
+
+
+class BMFace(object):
+    __slots__ = ("loops",)
+
+    def __init__(self, loops):
+        self.loops = loops
+
+
+class _BMVertSeq(list):
+    def ensure_lookup_table(self):
+        pass
+
+
+class _BMLayers(list):
+    def new(self, name):
+        self.append(name)
+        return name
+
+
+class BMesh(object):
+    def __init__(self):
+        self.verts = _BMVertSeq()
+        self.faces = []
+        self.loops = types.SimpleNamespace(layers=types.SimpleNamespace(uv=_BMLayers()))
+
+    def from_mesh(self, mesh):
+        co = mesh.vertices.arrays["co"].reshape(-1, 3).tolist()
+        self.verts = _BMVertSeq(BMVert(i, tuple(c)) for i, c in enumerate(co))
+        loops = mesh.loops.arrays["vertex_index"].tolist()
+        verts = self.verts
+        self.faces = [BMFace([BMLoop(verts[loops[i]]), BMLoop(verts[loops[i + 1]]), BMLoop(verts[loops[i + 2]])])
+                      for i in range(0, len(loops), 3)]
+
+    def to_mesh(self, mesh):
+        mesh.vertices.foreach_set("co", [c for v in self.verts for c in v.co])
+        mesh.loops.foreach_set("vertex_index", [l.vert.index for f in self.faces for l in f.loops])
+        for layer in self.loops.layers.uv:
+            uvLayer = mesh.uv_layers.new(name=layer)
+            uvLayer.data.foreach_set("uv", [c for f in self.faces for l in f.loops for c in (l[layer].uv.x, l[layer].uv.y)])
+
+    def free(self):
+        self.verts = _BMVertSeq()
+        self.faces = []
+
+
+def createBpyModule():
+    bpy = types.ModuleType("bpy")
+    bpy.app = types.SimpleNamespace(version=(4, 2, 0))
+
+    images = _DataCollection(Image)
+    images.load = _loadImage
+    bpy.data = types.SimpleNamespace(
+        meshes=_DataCollection(Mesh),
+        objects=_DataCollection(Object),
+        materials=_DataCollection(Material),
+        collections=_DataCollection(SceneCollection),
+        images=images,
+        textures=_DataCollection(lambda name, type=None: types.SimpleNamespace(name=name, image=None)))
+
+    bpy.data.libraries = _Libraries(bpy.data.materials)
+
+    scene = Scene()
+    bpy.context = types.SimpleNamespace(
+        scene=scene,
+        collection=scene.collection,
+        view_layer=types.SimpleNamespace(objects=types.SimpleNamespace(active=None)),
+        screen=types.SimpleNamespace(areas=[]))
+    bpy.ops = types.SimpleNamespace(view3d=types.SimpleNamespace(view_selected=lambda *a, **k: None))
+
+    bpy.props = types.ModuleType("bpy.props")
+    bpy.props.__all__ = []
+    return bpy
+
+
+# Clear datablocks between benchmark runs
+def reset(bpy):
+    for c in (bpy.data.meshes, bpy.data.objects, bpy.data.materials, bpy.data.collections, bpy.data.images, bpy.data.textures):
+        c.clear()
+    bpy.context.scene.collection.objects.objects = []
+    bpy.context.scene.collection.children.objects = []
+    bpy.context.scene.__dict__.pop("_props", None)
+
+
+def createModule(name, attrs):
+    mod = types.ModuleType(name)
+    for k in attrs:
+        setattr(mod, k, globals()[k])
+    return mod
+
+
+def install():
+    bpy = createBpyModule()
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.props"] = bpy.props
+    sys.modules["nrfile"] = createModule("nrfile", ["ShaderStage", "PrimitiveTopology", "topologyToStr", "NRFile"])
+    sys.modules["nrtools"] = createModule("nrtools", [
+        "logInfo", "logWarn", "logError",
+        "unpackVertexComponentVaAsList", "createPos3FromPreVsAsList", "createPos3FromPostVsAsList",
+        "createTexturesList", "createTexListForTexSlot", "isMeshLoadingSkipped",
+        "createTexCoordList", "createUVIdxListForUvIdx", "createNormalVectorsAuto",
+        "createVertexColorAttrsList", "unpackVertexColorsAsList", "MeshHashesManager"])
+    return bpy
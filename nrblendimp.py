@@ -1,16 +1,28 @@
 import os
 import sys
-import glob
-import time, struct, os
-import random
+import time
+import json
+import hashlib
+import collections
 
-import bpy, bmesh, mathutils
+import bpy
 from bpy.props import *
+import numpy as np
 
 
 import nrfile
 import nrtools
 import nrimp
+import nrbulk
+import nrdecode
+import nrmerge
+import nrsplit
+import nrincremental
+import nrbounds
+import nrhashes
+import nrsidecar
+import nrtextures
+import nrprofile
 
 
 def isVersionLess280():
@@ -51,49 +63,311 @@ def isImageLoaded(img):
     return True
 
 
+# Bulk mesh construction (replaces mesh.from_pydata)
+#   positions: Nx3 float32 array (nrbulk.positionsToArray)
+
+def setMeshVertices(mesh, positions):
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.ravel())
+
+
+# faces: Nx3 int32 array (nrbulk.decodeTriangles)
+def setMeshFaces(mesh, faces):
+    faceCount = len(faces)
+    mesh.loops.add(faceCount * 3)
+    mesh.polygons.add(faceCount)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faceCount * 3, 3, dtype=np.int32))
+    if ver_blender() < 2:
+        # blender 4.0+: loop_total is read-only and calculated from loop_start
+        mesh.polygons.foreach_set("loop_total", np.full(faceCount, 3, dtype=np.int32))
+
+
+# edges: Nx2 int32 array (nrbulk.decodeLines)
+def setMeshEdges(mesh, edges):
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set("vertices", edges.ravel())
+
+
+# Allocate and fill vertices/loops/polygons/edges. Each stream is a single foreach_set
+#   mesh.update() is left to the caller
+#   useSmooth: smooth shading for all polygons
+def buildMeshGeometry(mesh, positions, faces=None, edges=None, useSmooth=False):
+    setMeshVertices(mesh, positions)
+
+    if (faces is not None) and (0 != len(faces)):
+        setMeshFaces(mesh, faces)
+        setMeshShading(mesh, useSmooth)
+
+    if (edges is not None) and (0 != len(edges)):
+        setMeshEdges(mesh, edges)
+
+
+# Polygons shading with a single write
+def setMeshShading(mesh, useSmooth):
+    if hasattr(mesh, "shade_flat"):
+        # blender 4.1+: new polygons are smooth by default. Flat is the same as from_pydata()
+        if not useSmooth:
+            mesh.shade_flat()
+    elif useSmooth:
+        mesh.polygons.foreach_set("use_smooth", np.ones(len(mesh.polygons), dtype=bool))
+
+
+# Vertex colors layer from Nx4 rgba array.
+#   blender 3.4+ : point domain color attribute
+#   blender < 3.4: loop color layer, expanded by loopVertIndexes
+#                  (3.2/3.3 color attributes have no color_srgb, "color" would convert raw values as linear)
+def newColorLayer(mesh, name, colors, loopVertIndexes):
+    if hasattr(mesh, "color_attributes") and (bpy.app.version >= (3, 4, 0)):
+        attr = mesh.color_attributes.new(name=name, type='BYTE_COLOR', domain='POINT')
+        if not attr:
+            return False
+        # Raw values as before (bmesh byte colors)
+        attr.data.foreach_set("color_srgb", colors.ravel())
+        return True
+
+    vcLayer = mesh.vertex_colors.new(name=name)
+    if not vcLayer:
+        return False
+
+    if 0 == len(loopVertIndexes):
+        return True
+
+    loopColors = nrbulk.gatherByIndexes(colors, loopVertIndexes)
+    if isVersionLess280():
+        # blender 2.79: rgb
+        loopColors = np.ascontiguousarray(loopColors[:, :3])
+    vcLayer.data.foreach_set("color", loopColors.ravel())
+    return True
+
+
+# Returns MeshUVLoopLayer or None (layers limit reached)
+def newUvLayer(mesh, name):
+    if hasattr(mesh, "uv_textures"):
+        # blender <= 2.79
+        if not mesh.uv_textures.new(name):
+            return None
+        return mesh.uv_layers[name]
+    return mesh.uv_layers.new(name=name)
+
+
 class GroupManager(object):
     def __init__(self):
         self.colDict = {}
+        self.__newChildren = []  # [(parentCollection, childCollection), ...] not linked yet
+        self.__newParents  = []  # Parent collections not linked to the scene yet
 
 
-    def addObjectToCollection(self, groupId0, groupId1, obj):
-        if not hasattr(bpy.context.scene, "collection"):
-            # Blender < 2.8 has no collections??????
-            return None
+    def __newCollection(self, name):
+        collection = bpy.data.collections.new(name=name)
+        self.colDict[name] = collection
+        return collection
 
-        parentGroupName = ("grp_{}".format(groupId0))
-        parentCollection = self.colDict.get(parentGroupName)
-        if not parentCollection:
-            #nrtools.logInfo("NewParentGroup={}".format(parentGroupName))
-            parentCollection = bpy.data.collections.new(name=parentGroupName)
-            bpy.context.scene.collection.children.link(parentCollection)
-            self.colDict[parentGroupName] = parentCollection
 
-        childGroupName = ("grp_{}_{}".format(groupId0, groupId1))
-        childCollection = self.colDict.get(childGroupName)
-        if not childCollection:
-            #nrtools.logInfo("NewChildGroup={}".format(childGroupName))
-            childCollection = bpy.data.collections.new(name=childGroupName)
+    # Creates missing grp_{g0}/grp_{g0}_{g1} collections of all groupKeys [(groupId0, groupId1), ...] in one pass.
+    # New collections stay detached until linkNewCollections(): objects linked to them don't resync the scene
+    def prepareCollections(self, groupKeys):
+        for groupId0, groupId1 in sorted(set(groupKeys)):
+            parentGroupName = ("grp_{}".format(groupId0))
+            parentCollection = self.colDict.get(parentGroupName)
+            if not parentCollection:
+                parentCollection = self.__newCollection(parentGroupName)
+                self.__newParents.append(parentCollection)
+
+            childGroupName = ("grp_{}_{}".format(groupId0, groupId1))
+            if childGroupName not in self.colDict:
+                self.__newChildren.append((parentCollection, self.__newCollection(childGroupName)))
+
+
+    def getCollection(self, groupId0, groupId1):
+        return self.colDict.get("grp_{}_{}".format(groupId0, groupId1))
+
+
+    # Filled collections are attached bottom-up: children to parents, then parents to the scene
+    def linkNewCollections(self):
+        for parentCollection, childCollection in self.__newChildren:
             parentCollection.children.link(childCollection) # Add to parent
-            self.colDict[childGroupName] = childCollection
+        for parentCollection in self.__newParents:
+            bpy.context.scene.collection.children.link(parentCollection)
+        self.__newChildren = []
+        self.__newParents  = []
+
+
+# Batched scene assembly. Objects are created unlinked and linked per collection by flush()
+# (after each file, ExtraOptions.linkAfterImport - after the whole import).
+# Group collections are created in one pass and attached to the scene after they are filled.
+class SceneAssembler(object):
+    def __init__(self, groupMgr):
+        self.groupMgr  = groupMgr
+        self.__pending = []   # [(obj, (groupId0, groupId1) or None), ...]
+        self.__location = None
+
+
+    # 3D cursor location, read once per import
+    def getLocation(self):
+        if self.__location is None:
+            scene = bpy.context.scene
+            if hasattr(scene, "cursor_location"):
+                self.__location = tuple(scene.cursor_location)
+            elif hasattr(scene.cursor, "location"):
+                self.__location = tuple(scene.cursor.location)
+        return self.__location
+
+
+    #   groupKey: (groupId0, groupId1) (ExtraOptions.groupMeshes) or None (active collection)
+    def add(self, obj, groupKey=None):
+        self.__pending.append((obj, groupKey))
+
+
+    def flush(self):
+        if not self.__pending:
+            return
+        pending, self.__pending = self.__pending, []
+
+        scene = bpy.context.scene
+        if not hasattr(scene, "collection"):
+            # blender < 2.80
+            for obj, groupKey in pending:
+                scene.objects.link(obj)
+            return
 
-        childCollection.objects.link(obj) # Add object to child collection
+        self.groupMgr.prepareCollections([groupKey for obj, groupKey in pending if groupKey is not None])
+        byGroup = collections.OrderedDict()
+        for obj, groupKey in pending:
+            byGroup.setdefault(groupKey, []).append(obj)
+
+        for groupKey, objList in byGroup.items():
+            collection = self.groupMgr.getCollection(*groupKey) if groupKey else bpy.context.collection
+            link = collection.objects.link
+            for obj in objList:
+                link(obj)
+        self.groupMgr.linkNewCollections()
+
+
+MAX_LISTED_IMAGES = 256  # MaterialManager.loadedImgs/failedImgs length limit
+
+MATERIAL_KEY_PROP = "nrMaterialKey"  # MaterialLibrary digest of the material key
+MATERIAL_LIBRARY_INDEX_FILE_NAME = ".nrmatlib.json"
+MATERIAL_LIBRARY_VERSION = 1
+
+
+# Persistent material library (ExtraOptions.materialLibraryDir).
+# Materials created by an import are written to a new .blend of the directory (one per import),
+# .nrmatlib.json maps material key digests to these files (nrsidecar format, "materials": {digest: file}).
+# Later imports link materials with known keys instead of building node trees. Textures are referenced by absolute paths.
+# The directory may be shared with ExtraOptions.textureCacheDir: the index names differ.
+class MaterialLibrary(object):
+    def __init__(self, directory):
+        self.directory = directory
+        self.linkedCount = 0
+        self.__index = {}  # digest -> .blend file name
+        self.__new   = {}  # digest -> material created by this import
+        self.__load()
+
+
+    @staticmethod
+    def calcDigest(materialKey):
+        return hashlib.sha1(repr(materialKey).encode("utf-8")).hexdigest()
+
+
+    @staticmethod
+    def getMaterialName(digest):
+        return "nrmat_{}".format(digest[:24])
+
+
+    def isSupported(self):
+        return hasattr(bpy.data, "libraries") and hasattr(bpy.data.libraries, "write")
+
+
+    # Unknown/outdated/corrupt index: empty, materials are built and saved again
+    def __load(self):
+        index = nrsidecar.loadIndexFile(self.directory, MATERIAL_LIBRARY_INDEX_FILE_NAME, MATERIAL_LIBRARY_VERSION, "materials", {}, "Material library index")
+        if not isinstance(index, dict):
+            index = {}
+        self.__index = dict((k, v) for k, v in index.items() if isinstance(v, str))
+
+
+    # Returns linked material or None (unknown key/link failed)
+    def link(self, digest):
+        fileName = self.__index.get(digest)
+        if not fileName:
+            return None
+
+        path = os.path.join(self.directory, fileName)
+        matName = self.getMaterialName(digest)
+        try:
+            with bpy.data.libraries.load(path, link=True) as (dataFrom, dataTo):
+                if matName in dataFrom.materials:
+                    dataTo.materials = [matName]
+        except Exception as e:
+            nrtools.logWarn("Material library link failed: {} {}".format(path, str(e)))
+            return None
+
+        if (not dataTo.materials) or (not dataTo.materials[0]):
+            return None
+        self.linkedCount = self.linkedCount + 1
+        return dataTo.materials[0]
+
+
+    def add(self, digest, mat):
+        self.__new[digest] = mat
+
+
+    def save(self):
+        if not self.__new:
+            return
+
+        fileName = "materials_{}_{}.blend".format(time.strftime("%Y%m%d_%H%M%S"), os.getpid())
+        path = os.path.join(self.directory, fileName)
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, exist_ok=True)
+            bpy.data.libraries.write(path, set(self.__new.values()), fake_user=True, path_remap='ABSOLUTE')
+
+            # Other imports could have extended the index meanwhile
+            self.__load()
+            for digest in self.__new:
+                self.__index[digest] = fileName
+            nrsidecar.saveIndexFile(self.directory, MATERIAL_LIBRARY_INDEX_FILE_NAME, MATERIAL_LIBRARY_VERSION, "materials", self.__index, "Material library index")
+            nrtools.logInfo("Material library: {} materials saved to {}".format(len(self.__new), path))
+        except Exception as e:
+            nrtools.logWarn("Material library save failed: {} {}".format(path, str(e)))
+        self.__new = {}
 
 
 class MaterialManager(object):    
     def __init__(self):
         self.__matId = 0
         self.__textureCache = {}
-        self.loadedImgs = []
+        self.loadedImgs = []  # First MAX_LISTED_IMAGES paths. Totals: loadedImgsCount/failedImgsCount
         self.failedImgs = []
-        self.__materialCache = {}
-
-
-    def __calcTexListHash(self, texList):
-        res = ""
-        for texFile in texList:
-            res = res + texFile
-        return res
+        self.loadedImgsCount = 0
+        self.failedImgsCount = 0
+        self.__materialCache = {}  # calcMaterialKey() -> material (None: create failed)
+        self.__textureIds = {}     # path -> content hash (path if unreadable)
+        self.library = None     # MaterialLibrary. ExtraOptions.materialLibraryDir
+        self.prefetcher = None  # nrtextures.TexturePrefetcher
+        self.textureCache = None  # nrtextures.TextureCache
+        self.__imageByHash = {}  # content hash -> image. ExtraOptions.textureCacheDir
+
+
+    # Texture identity in material keys: content hash, so textures saved under different names share materials
+    def __getTextureId(self, fullpath):
+        textureId = self.__textureIds.get(fullpath)
+        if textureId:
+            return textureId
+
+        if self.textureCache:
+            textureId = self.textureCache.getContentHash(fullpath)
+        elif self.prefetcher:
+            textureId = self.prefetcher.getContentHash(fullpath)
+        if not textureId:
+            try:
+                textureId = nrtextures.calcFileHash(fullpath)
+            except Exception:
+                textureId = os.path.abspath(fullpath)
+        self.__textureIds[fullpath] = textureId
+        return textureId
 
 
     def __createMatName(self):
@@ -102,51 +376,22 @@ class MaterialManager(object):
         return matName
 
 
-    def __createNewMat(self):
-        matName = self.__createMatName()
+    def __createNewMat(self, matName=None):
+        if not matName:
+            matName = self.__createMatName()
         mat = bpy.data.materials.new(matName)
         if (False == isVersionLess280()):
             mat.use_nodes = True
         return mat
 
 
-    # Material == [texFile0+texFile1+texFile2...]
-    def __createMaterialCached(self, options, texList):
-        #if (0 == len(texList)):
-        #    return None
-
-        mat = None
-        try:
-            texList1 = nrtools.createTexListForTexSlot(options, texList)
-            texListHash = self.__calcTexListHash(texList1)
-            mat = self.__materialCache.get(texListHash, "materialnotfound")
-            if "materialnotfound" == mat:
-                # Create new material
-                mat = self.__createNewMat()
-
-                if isVersionLess280():
-                    # blender <= 2.79
-                    self.__createTextures27(mat, options, texList1)
-                else:
-                    # blender >= 2.8
-                    self.__createTextureNodes28(mat, options, texList1, True)
-
-                # Add material to cache.
-                # If mat == None then material create error
-                self.__materialCache[texListHash] = mat
-        except Exception as e:
-            nrtools.logError("Exception in __createMaterialCached(): {}".format(str(e)))
-            mat = None
-        return mat
-
-
-    def __createMaterial(self, options, texList, vcLayerList):
+    def __createMaterial(self, options, texList, vcLayerList, matName=None):
         mat = None
         try:
             texList1 = nrtools.createTexListForTexSlot(options, texList)
             connectTexImage = (len(vcLayerList) == 0)
             connectVC = not connectTexImage
-            mat = self.__createNewMat()
+            mat = self.__createNewMat(matName)
             if isVersionLess280():
                 # blender <= 2.79
                 if options.isTexCoordEnabled():
@@ -163,18 +408,150 @@ class MaterialManager(object):
         return mat
 
 
-    # Load textures/Vertex colors
+    # Load textures/Vertex colors. Meshes with equal calcMaterialKey() share one material
     def createMaterial(self, options, texList, vcLayerList):
         if ((False == options.isTexCoordEnabled() or (0==len(texList))) and (False == options.isVertexColorEnabled())):
             return None
 
-        # If Vertex colors are disabled then use material cache
-        if (False == options.isVertexColorEnabled()):
-            # Textures only
-            return self.__createMaterialCached(options, texList)
+        key = self.calcMaterialKey(options, texList, len(vcLayerList))
+        if key in self.__materialCache:
+            return self.__materialCache[key]
+
+        matName = None
+        if self.library:
+            digest = MaterialLibrary.calcDigest(key)
+            mat = self.library.link(digest)
+            if mat:
+                self.__materialCache[key] = mat
+                return mat
+            matName = MaterialLibrary.getMaterialName(digest)
+
+        # If mat == None then material create error
+        mat = self.__createMaterial(options, texList, vcLayerList, matName)
+        self.__materialCache[key] = mat
+        if mat and self.library:
+            mat[MATERIAL_KEY_PROP] = digest
+            self.library.add(digest, mat)
+        return mat
+
+
+    # Material identity: (texture content hashes, texture slot, vertex color config).
+    # Meshes with equal keys get equal materials from createMaterial() (also ExtraOptions.mergeGroupMeshes)
+    def calcMaterialKey(self, options, texList, vcLayersCount):
+        if texList is None:
+            return None
+
+        textureIds = ()
+        if options.isTexCoordEnabled():
+            texList1 = nrtools.createTexListForTexSlot(options, texList)
+            textureIds = tuple(self.__getTextureId(texFile) for texFile in texList1)
+
+        vertexColors = None
+        if options.isVertexColorEnabled() and (vcLayersCount > 0):
+            # Layer names are vc_0..vc_N: the connected layer is defined by index
+            vcIdx = options.vertCol.vcIdx if options.vertCol.vcIdx < vcLayersCount else 0
+            vertexColors = (vcLayersCount, vcIdx)
+        return (textureIds, options.texCoord.textureSlotIdx, vertexColors)
+
+
+    def __addLoaded(self, fullpath):
+        self.loadedImgsCount = self.loadedImgsCount + 1
+        if len(self.loadedImgs) < MAX_LISTED_IMAGES:
+            self.loadedImgs.append(fullpath)
+
 
-        # Textures/Vertex colors
-        return self.__createMaterial(options, texList, vcLayerList)
+    def __addFailed(self, fullpath):
+        self.failedImgsCount = self.failedImgsCount + 1
+        if len(self.failedImgs) < MAX_LISTED_IMAGES:
+            self.failedImgs.append(fullpath)
+
+
+    # Waits for prefetch of the texture. Invalid texture -> failedImgs
+    def __isPrefetchedValid(self, fullpath):
+        if (not self.prefetcher) or self.prefetcher.isValid(fullpath):
+            return True
+        self.__addFailed(fullpath)
+        return False
+
+
+    # Returns loaded image or None (load failed/image too small)
+    def __tryLoadImage(self, path, checkExisting):
+        try:
+            img = bpy.data.images.load(path, check_existing=checkExisting)
+        except Exception as e:
+            return None
+        if isImageLoaded(img):
+            return img
+        if img:
+            bpy.data.images.remove(img)
+        return None
+
+
+    # Converted copy of loaded image saved to the texture cache. Image keeps its source path
+    def __storeInCache(self, img, fullpath, contentHash):
+        if getattr(img, "is_float", False):
+            fileFormat, ext = 'OPEN_EXR', '.exr'
+        else:
+            fileFormat, ext = 'TARGA_RAW', '.tga'
+
+        srcFormat = img.file_format
+        try:
+            path = self.textureCache.getEntryPath(contentHash, ext)
+            img.filepath_raw = path
+            img.file_format = fileFormat
+            img.save()
+            self.textureCache.add(contentHash, path)
+        except Exception as e:
+            nrtools.logWarn("Texture cache store failed: {} {}".format(fullpath, str(e)))
+        finally:
+            img.filepath_raw = fullpath
+            img.file_format = srcFormat
+
+
+    # images.load() through the texture cache (ExtraOptions.textureCacheDir).
+    # Identical textures (content hash) share one image. Returns image or None. Updates loadedImgs/failedImgs
+    def __loadImage(self, fullpath, checkExisting):
+        contentHash = None
+        if self.textureCache:
+            contentHash = self.textureCache.getContentHash(fullpath)
+
+        if contentHash:
+            img = self.__imageByHash.get(contentHash)
+            if img:
+                nrtools.logInfo("--> SUCCESSFULL load (same content): {}".format(fullpath))
+                self.__addLoaded(fullpath)
+                return img
+
+            if self.textureCache.isFailed(contentHash):
+                nrtools.logError("--> FAILED to load (texture cache): {}".format(fullpath))
+                self.__addFailed(fullpath)
+                return None
+
+            cachedPath = self.textureCache.lookup(contentHash)
+            if cachedPath:
+                img = self.__tryLoadImage(cachedPath, checkExisting)
+                if img:
+                    # .blend references the source texture, not the cache entry
+                    img.name = os.path.basename(fullpath)
+                    img.filepath_raw = fullpath
+                    nrtools.logInfo("--> SUCCESSFULL load (texture cache): {}".format(fullpath))
+                    self.__addLoaded(fullpath)
+                    self.__imageByHash[contentHash] = img
+                    return img
+
+        img = self.__tryLoadImage(fullpath, checkExisting)
+        if img:
+            nrtools.logInfo("--> SUCCESSFULL load: {}".format(fullpath))
+            self.__addLoaded(fullpath)
+            if contentHash:
+                self.__storeInCache(img, fullpath, contentHash)
+                self.__imageByHash[contentHash] = img
+        else:
+            nrtools.logError("--> FAILED to load: {}".format(fullpath))
+            self.__addFailed(fullpath)
+            if contentHash:
+                self.textureCache.markFailed(contentHash)
+        return img
 
 
     # Blender >= 2.8
@@ -183,18 +560,8 @@ class MaterialManager(object):
         img = self.__textureCache.get(fullpath, "notexturefound")
         if "notexturefound" == img:
             img = None
-            try:
-                img = bpy.data.images.load(fullpath)
-                if isImageLoaded(img):
-                    nrtools.logInfo("--> SUCCESSFULL load: {}".format(fullpath))
-                    self.loadedImgs.append(fullpath)
-                else:
-                    nrtools.logError("--> FAILED to load: {}".format(fullpath))
-                    self.failedImgs.append(fullpath)
-                    bpy.data.images.remove(img)
-                    img = None
-            except Exception as e:
-                img = None
+            if self.__isPrefetchedValid(fullpath):
+                img = self.__loadImage(fullpath, False)
             self.__textureCache[fullpath] = img
         return img
 
@@ -250,22 +617,13 @@ class MaterialManager(object):
         tex = self.__textureCache.get(fullpath, "notexturefound")
         if "notexturefound" == tex:
             tex = None
-            try:
-                img = bpy.data.images.load(fullpath, True)
-                if isImageLoaded(img):
-                    nrtools.logInfo("--> SUCCESSFULL load: {}".format(fullpath))
-                    self.loadedImgs.append(fullpath)
+            if self.__isPrefetchedValid(fullpath):
+                img = self.__loadImage(fullpath, True)
+                if img:
                     # Image loaded successfully
                     #   Create texture
                     tex = bpy.data.textures.new(fullpath, type='IMAGE')
                     tex.image = img
-                else:
-                    nrtools.logError("--> FAILED to load: {}".format(fullpath))
-                    self.failedImgs.append(fullpath)
-                    bpy.data.images.remove(img)
-                    tex = None
-            except Exception as e:
-                tex = None
             self.__textureCache[fullpath] = tex
         return tex
 
@@ -313,6 +671,17 @@ class BlenderImporter(object):
         self._maxNrSize = 0
         self._maxMeshName = ''
         self.groupMgr = GroupManager()
+        self.assembler = SceneAssembler(self.groupMgr)
+        self.linkAfterImport = False  # ExtraOptions.linkAfterImport
+        self.totalInstanced = 0
+        self._meshCache = {}  # MeshData.contentHash -> Mesh. ExtraOptions.instanceMeshes
+        self.merger = nrmerge.MeshMerger()  # ExtraOptions.mergeGroupMeshes
+        self.totalMerged = 0
+        self.sourceSignatures = None  # ExtraOptions.incrementalImport: {abspath: signature}
+        self._importedFiles = {}
+        self.boundsIndex = None  # nrbounds.BoundsIndex. Region.useBoundsCache
+        self._maxMergedVertices = 0
+        self.report = nrprofile.ImportReport()
 
 
     def selectLargestObjectViewSelected(self):
@@ -343,521 +712,676 @@ class BlenderImporter(object):
     def printInfo(self):
         nrtools.logInfo("Parsed files count={}".format(self.totalFilesCount))
         nrtools.logInfo("Created meshes={}".format(self.totalCreated))
+        nrtools.logInfo("Instanced meshes={}".format(self.totalInstanced))
+        nrtools.logInfo("Merged meshes={}".format(self.totalMerged))
+        nrtools.logInfo("Loaded images={} failed={}".format(self.matMgr.loadedImgsCount, self.matMgr.failedImgsCount))
         nrtools.logInfo("Largest NR-file: {}. FileSize={}".format(self._maxMeshName, self._maxNrSize))
+        self.report.printSummary()
 
 
-    def _createTexCoords(self, options, bm, vatrs, vert, vertexData, texCoordAttrCompIdxList):
-        uvList = nrtools.createUVIdxListForUvIdx(options, texCoordAttrCompIdxList)
-
-        for uvIdx in uvList:
-            tcAttrComp = texCoordAttrCompIdxList[uvIdx]
-
-            layerTextureCoordinates = nrtools.unpackVertexComponentVaAsList(vert, vertexData, vatrs, [tcAttrComp.u, tcAttrComp.v])
-            if None == layerTextureCoordinates:
-                continue
-            
-            if 0 == len(layerTextureCoordinates):
+    # UV layers from decoded per-loop texcoords (nrdecode.decodeTexCoords)
+    def _createTexCoords(self, mesh, uvLayers):
+        for uvIdx, loopUvs in uvLayers:
+            uv_lay = newUvLayer(mesh, 'uv_' + str(uvIdx))
+            if not uv_lay:
+                nrtools.logError("UV layer create failed: uv_{}".format(uvIdx))
                 continue
 
-            if len(layerTextureCoordinates[0]) < 2:
-                continue
+            uv_lay.data.foreach_set("uv", loopUvs.ravel())
 
-            # blender 3.5+ ????????????????????????????????????????????????????
-            uv_lay = bm.loops.layers.uv.new('uv_' + str(uvIdx))   # BMLayerItem
-            for face in bm.faces:
-                for vv in face.loops:
-                    vertIndex = vv.vert.index
-                    uv = mathutils.Vector(layerTextureCoordinates[vertIndex])
-                    vv[uv_lay].uv.x = uv.x
-                    vv[uv_lay].uv.y = 1.0 - uv.y
-
-
-    def _createNormals(self, options, mesh, vatrs, vert, vertexData, faces):
-        if options.normalVecs.loadMode == nrimp.NormalVectorsLoadMode.Auto:
-            autoVAtr = nrtools.createNormalVectorsAuto(vatrs)
-            if autoVAtr:
-                normals = nrtools.unpackVertexComponentVaAsList(vert, vertexData, vatrs, autoVAtr)
-                if not normals:
-                    # Use blender AUTOSMOOTH
-                    mesh.polygons.foreach_set("use_smooth", [True] * len(faces))
-                else:
-                    if hasattr(mesh, "use_auto_smooth"):
-                        mesh.use_auto_smooth = True
-                    mesh.normals_split_custom_set_from_vertices(normals)
-            else:
-                # NORMAL/NORMALS semantic not found. 
-                # Use blender AUTOSMOOTH
-                mesh.polygons.foreach_set("use_smooth", [True] * len(faces))
 
-        elif options.normalVecs.loadMode == nrimp.NormalVectorsLoadMode.AttrComp:
-            normals = nrtools.unpackVertexComponentVaAsList(vert, vertexData, vatrs, [options.normalVecs.x, options.normalVecs.y, options.normalVecs.z])
-            if not normals:
-                return
+    # Custom normals from Nx3 float32 array. Smooth shading (normals not found) is set by buildMeshGeometry()
+    #   The array is passed as is: blender reads it through the buffer protocol, no per-vector Python objects
+    def _createNormals(self, mesh, normals):
+        if normals is None:
+            return
+
+        if hasattr(mesh, "use_auto_smooth"):
+            mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set_from_vertices(np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3))
 
-            if hasattr(mesh, "use_auto_smooth"):
-                mesh.use_auto_smooth = True
-            mesh.normals_split_custom_set_from_vertices(normals)
-        return
 
-        
-    # Create and load Vertex Colors from vertex data.
+    # Create Vertex Colors layers from decoded per-vertex colors (nrdecode.decodeVertexColors)
+    #   loopVertIndexes: flat vertex index per loop (faces.ravel()). Used by blender < 3.2 (loop color layers)
     # Return string list with vertex color layer names  [vc_0,vc_1,vc_2....]
-    def _createVertexColors(self, options, bm, vatrs, vert, vertexData, vertexColorAttrsIdxList):
+    def _createVertexColors(self, mesh, vertexColors, loopVertIndexes):
         res = []
-        idx = 0
-
-        vertCol = options.vertCol
-        for colorAttrIdx in vertexColorAttrsIdxList:
-            layerName = "vc_{}".format(idx)
-        
-            color_layer = bm.loops.layers.color.new(layerName)   # 2.79 - 3.5+
-
-            # Detect 3 or 4 component per vertex color (rgb, rgba)
-            colorCompsCnt = 4  # blender2.79 -> 3     blender2.8 -> 4
-            for face in bm.faces:
-                for vv in face.loops:
-                    colorCompsCnt = len(vv[color_layer])
-                    break
-                break
 
-            vertColorsList = nrtools.unpackVertexColorsAsList(vert, vertexData, vatrs, colorAttrIdx, vertCol.r, vertCol.g, vertCol.b, vertCol.a, colorCompsCnt)
-            if not vertColorsList:
+        for colors in vertexColors:
+            layerName = "vc_{}".format(len(res))
+            if not newColorLayer(mesh, layerName, colors, loopVertIndexes):
+                nrtools.logError("Vertex color layer create failed: {}".format(layerName))
                 continue
 
             res.append(layerName)
-            idx += 1
-            for face in bm.faces:
-                for vv in face.loops:
-                    vertIndex = vv.vert.index
-                    vv[color_layer] = vertColorsList[vertIndex]
 
         return res
 
 
-    # Create triangle mesh
-    def _createMesh(self, options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList, loadExtraUvData, vatrs1, vert1, vertexData1):
-        # Create list of faces
-        triangles = indx.read()
-        faces = []
-        for idx in range(0, int(indx.getIndexCount()/3) ):
-            p = struct.unpack_from("iii", triangles, 12*idx)
-            faces.append(p)
-
+    # mesh: shared Mesh datablock (instancing) or None (new)
+    def _createObject(self, options, meshData, mesh=None):
+        meshName = meshData.meshName
 
         #Define mesh and object
-        mesh = bpy.data.meshes.new(meshName)
+        if not mesh:
+            mesh = bpy.data.meshes.new(meshName)
         obj  = bpy.data.objects.new(meshName, mesh)
 
 
-        #Set location and scene of object
-        if hasattr(bpy.context.scene, "cursor_location"):
-            obj.location = bpy.context.scene.cursor_location
-            bpy.context.scene.objects.link(obj)
-        elif hasattr(bpy.context.scene.cursor, "location"):
-            obj.location = bpy.context.scene.cursor.location
+        #Set location of object. Linked to the scene by SceneAssembler.flush()
+        location = self.assembler.getLocation()
+        if location is not None:
+            obj.location = location
+
+        # Incremental import: source files of the object
+        if self.sourceSignatures is not None:
+            obj[nrincremental.OBJECT_SOURCES_PROP] = json.dumps(meshData.sources)
 
         # Mesh grouping
         if options.extraOptions.groupMeshes:
-            self.groupMgr.addObjectToCollection(nrmesh.getGroup0Id(), nrmesh.getGroup1Id(), obj)
+            self.assembler.add(obj, (meshData.group0Id, meshData.group1Id))
         else:
-            if 0 != ver_blender():
-                # blender >= 2.80
-                bpy.context.collection.objects.link(obj)
-
-
-        #Create mesh position+indexes
-        mesh.from_pydata(positions3, [], faces)
-
-
-        # Normal vectors
-        if options.isNormalVecsEnabled():
-            self._createNormals(options, mesh, vatrs, vert, vertexData, faces)
-
-
-        mesh.update()
-
-        # Switch to bmesh
-        bm = bmesh.new()
+            self.assembler.add(obj)
 
-        try:
-            bm.from_mesh(mesh)
+        return mesh, obj
 
 
-            # VertexColors
-            vcLayerNamesList = []
-            if options.isVertexColorEnabled():
-                vertexColorAttrsIdxList = nrtools.createVertexColorAttrsList(vatrs)
-                vcLayerNamesList = self._createVertexColors(options, bm, vatrs, vert, vertexData, vertexColorAttrsIdxList)
+    # Single pass mesh builder: positions/indexes, UVs, vertex colors and normals
+    # are written directly to the Mesh datablock followed by one mesh.update().
+    # meshData arrays are consumed (released stage by stage)
+    def _buildMesh(self, options, meshData):
+        stats = self.report.stats
 
+        # Instancing: identical geometry -> linked duplicate object
+        if meshData.contentHash:
+            mesh = self._meshCache.get(meshData.contentHash)
+            if mesh:
+                with stats.stage("build.object"):
+                    self._createObject(options, meshData, mesh)
+                self.totalInstanced = self.totalInstanced + 1
+                return True
 
-            mat = self.matMgr.createMaterial(options, texList, vcLayerNamesList)
-            if mat:
-                obj.data.materials.append(mat)
+        with stats.stage("build.object"):
+            mesh, obj = self._createObject(options, meshData)
+        if meshData.contentHash:
+            self._meshCache[meshData.contentHash] = mesh
 
+        # Decoded arrays are released as soon as they are written to the Mesh datablock
+        hasFaces = (meshData.faces is not None)
 
-            bm.verts.ensure_lookup_table()
+        #Create mesh position+indexes
+        with stats.stage("build.geometry"):
+            # Normals not found: use blender AUTOSMOOTH
+            buildMeshGeometry(mesh, meshData.positions, faces=meshData.faces, edges=meshData.edges, useSmooth=meshData.useSmooth)
+        meshData.positions = None
+        meshData.edges = None
+
+        # VertexColors
+        with stats.stage("build.colors"):
+            vcLayerNamesList = self._createVertexColors(mesh, meshData.vertexColors, meshData.getLoopVertIndexes())
+        meshData.vertexColors = []
+        meshData.faces = None
+
+        if meshData.texList is not None:
+            with stats.stage("build.material"):
+                mat = self.matMgr.createMaterial(options, meshData.texList, vcLayerNamesList)
+                if mat:
+                    obj.data.materials.append(mat)
 
             # TexCoords
-            if options.isTexCoordEnabled():
-                if not loadExtraUvData:
-                    texCoordAttrList = nrtools.createTexCoordList(options, vatrs)
-                    self._createTexCoords(options, bm, vatrs,  vert,  vertexData,  texCoordAttrList)
-                else:
-                    # Use texcoord from extra UV-data
-                    texCoordAttrList = nrtools.createTexCoordList(options, vatrs1)
-                    self._createTexCoords(options, bm, vatrs1, vert1, vertexData1, texCoordAttrList)
-
-            bm.to_mesh(mesh)
-        finally:
-            bm.free()
+            with stats.stage("build.uvs"):
+                self._createTexCoords(mesh, meshData.uvLayers)
+        meshData.uvLayers = []
 
         # Finalize
-        mesh.update()
-        return True
-
-
-    # Create lines
-    def _createLines(self, options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList, loadExtraUvData, vatrs1, vert1, vertexData1):
-        # Create list of edges
-        lineList = indx.read()
-        edges = []
-        for idx in range(0, int(indx.getIndexCount()/2) ):
-            p = struct.unpack_from("ii", lineList, 8*idx)
-            edges.append(p)
-
-
-        #Define mesh and object
-        mesh = bpy.data.meshes.new(meshName)
-        obj  = bpy.data.objects.new(meshName, mesh)
-
-
-        #Set location and scene of object
-        if hasattr(bpy.context.scene, "cursor_location"):
-            obj.location = bpy.context.scene.cursor_location
-            bpy.context.scene.objects.link(obj)
-        elif hasattr(bpy.context.scene.cursor, "location"):
-            obj.location = bpy.context.scene.cursor.location
+        with stats.stage("build.update"):
+            mesh.update(calc_edges=hasFaces)
 
-        # Mesh grouping
-        if options.extraOptions.groupMeshes:
-            self.groupMgr.addObjectToCollection(nrmesh.getGroup0Id(), nrmesh.getGroup1Id(), obj)
-        else:
-            if 0 != ver_blender():
-                # blender >= 2.80
-                bpy.context.collection.objects.link(obj)
-
-
-        #Create mesh position+indexes
-        mesh.from_pydata(positions3, edges, [])
-
-        mesh.update()
-
-        # Switch to bmesh
-        bm = bmesh.new()
+        # Normal vectors. Custom normals need valid edges (after update)
+        if hasFaces and (meshData.normals is not None):
+            with stats.stage("build.normals"):
+                self._createNormals(mesh, meshData.normals)
+        meshData.normals = None
 
-        try:
-            bm.from_mesh(mesh)
+        return True
 
 
-            # VertexColors
-            vcLayerNamesList = []
-            if options.isVertexColorEnabled():
-                vertexColorAttrsIdxList = nrtools.createVertexColorAttrsList(vatrs)
-                vcLayerNamesList = self._createVertexColors(options, bm, vatrs, vert, vertexData, vertexColorAttrsIdxList)
+    def _prefetchTextures(self, fileData):
+        if (not fileData) or (not self.matMgr.prefetcher):
+            return
+        for meshData in fileData.meshes:
+            if meshData.texList:
+                self.matMgr.prefetcher.prefetch(meshData.texList)
 
 
-            mat = self.matMgr.createMaterial(options, texList, vcLayerNamesList)
-            if mat:
-                obj.data.materials.append(mat)
+    # Create blender objects for decoded file (nrdecode.decodeFile)
+    def _importFileData(self, options, fileData):
+        if not fileData:
+            return False
 
+        self._prefetchTextures(fileData)
 
-            bm.verts.ensure_lookup_table()
+        buildStartTime = time.perf_counter()
+        for meshData in fileData.meshes:
+            self._importMeshData(options, fileData, meshData)
 
-            # TexCoords
-            if options.isTexCoordEnabled():
-                if not loadExtraUvData:
-                    texCoordAttrList = nrtools.createTexCoordList(options, vatrs)
-                    self._createTexCoords(options, bm, vatrs,  vert,  vertexData,  texCoordAttrList)
-                else:
-                    # Use texcoord from extra UV-data
-                    texCoordAttrList = nrtools.createTexCoordList(options, vatrs1)
-                    self._createTexCoords(options, bm, vatrs1, vert1, vertexData1, texCoordAttrList)
-
-            bm.to_mesh(mesh)
-        finally:
-            bm.free()
-
-        # Finalize
-        mesh.update()
+        self._finishFileData(fileData, len(fileData.meshes), time.perf_counter() - buildStartTime)
         return True
 
 
-    # Create points
-    def _createPoints(self, options, nrmesh, vatrs, vert, vertexData, positions3, meshName):
+    def _importMeshData(self, options, fileData, meshData):
+        maxVertices = options.extraOptions.maxMeshVertices
+        if (maxVertices > 0) and (len(meshData.positions) > maxVertices):
+            # Parts are built one by one, source arrays are released after the last part
+            with self.report.stats.stage("build.split"):
+                parts = nrsplit.splitMeshData(meshData, maxVertices)
+                part = next(parts, None)
+            while part:
+                self.report.stats.count("meshesSplitParts")
+                self.__importMeshPart(options, fileData, part)
+                with self.report.stats.stage("build.split"):
+                    part = next(parts, None)
+            return
 
-        #Define mesh and object
-        mesh = bpy.data.meshes.new(meshName)
-        obj  = bpy.data.objects.new(meshName, mesh)
+        self.__importMeshPart(options, fileData, meshData)
 
 
-        #Set location and scene of object
-        if hasattr(bpy.context.scene, "cursor_location"):
-            obj.location = bpy.context.scene.cursor_location
-            bpy.context.scene.objects.link(obj)
-        elif hasattr(bpy.context.scene.cursor, "location"):
-            obj.location = bpy.context.scene.cursor.location
+    def __importMeshPart(self, options, fileData, meshData):
+        if options.extraOptions.mergeGroupMeshes:
+            self._addToMerge(options, meshData)
+            return
 
-        # Mesh grouping
-        if options.extraOptions.groupMeshes:
-            self.groupMgr.addObjectToCollection(nrmesh.getGroup0Id(), nrmesh.getGroup1Id(), obj)
-        else:
-            if 0 != ver_blender():
-                # blender >= 2.80
-                bpy.context.collection.objects.link(obj)
+        if self._buildMesh(options, meshData):
+            if fileData.fileSize > self._maxNrSize:
+                self._maxNrSize = fileData.fileSize
+                self._maxMeshName = meshData.meshName
+            self.totalCreated = self.totalCreated + 1
 
 
-        #Create mesh position+indexes
-        mesh.from_pydata(positions3, [], [])
+    def _finishFileData(self, fileData, meshesCount, buildSeconds):
+        if not self.linkAfterImport:
+            self.linkObjects()
+        self.report.addFile(fileData.fileName, fileData.fileSize, meshesCount, fileData.stats, buildSeconds)
+        self.totalFilesCount = self.totalFilesCount + 1
 
-        mesh.update()
 
-        # Switch to bmesh
-        bm = bmesh.new()
+    def linkObjects(self):
+        with self.report.stats.stage("build.link"):
+            self.assembler.flush()
 
-        try:
-            bm.from_mesh(mesh)
 
-            # VertexColors
-            vcLayerNamesList = []
-            if options.isVertexColorEnabled():
-                vertexColorAttrsIdxList = nrtools.createVertexColorAttrsList(vatrs)
-                vcLayerNamesList = self._createVertexColors(options, bm, vatrs, vert, vertexData, vertexColorAttrsIdxList)
+    # ExtraOptions.mergeGroupMeshes: meshData queued, full buckets built
+    def _addToMerge(self, options, meshData):
+        with self.report.stats.stage("build.merge"):
+            materialKey = self.matMgr.calcMaterialKey(options, meshData.texList, len(meshData.vertexColors))
+            merged = self.merger.add(nrmerge.calcMergeKey(meshData, materialKey), meshData)
+        self.totalMerged = self.totalMerged + 1
+        if merged:
+            self._buildMerged(options, merged)
 
-            bm.verts.ensure_lookup_table()
 
-            bm.to_mesh(mesh)
-        finally:
-            bm.free()
+    # Build pending merge buckets. Called after all files are imported
+    def flushMerged(self, options):
+        with self.report.stats.stage("build.merge"):
+            mergedList = self.merger.flush()
+        for merged in mergedList:
+            self._buildMerged(options, merged)
 
-        # Finalize
-        mesh.update()
-        return True
 
+    def _buildMerged(self, options, meshData):
+        vertexCount = len(meshData.positions)
+        if not self._buildMesh(options, meshData):
+            return
+        self.totalCreated = self.totalCreated + 1
+        if vertexCount > self._maxMergedVertices:
+            self._maxMergedVertices = vertexCount
+            self._maxMeshName = meshData.meshName
+
+
+    # ExtraOptions.incrementalImport: removes objects of changed/deleted files.
+    # Returns files to import
+    def prepareIncremental(self, loadPostVs, paths, fileList, options):
+        scene = bpy.context.scene
+        importedFiles = nrincremental.loadJson(scene.get(nrincremental.SCENE_FILES_PROP), {})
+
+        objects = {}
+        objectSources = []
+        for obj in bpy.data.objects:
+            sources = nrincremental.loadJson(obj.get(nrincremental.OBJECT_SOURCES_PROP), None)
+            if sources:
+                objects[obj.name] = obj
+                objectSources.append((obj.name, sources))
+
+        fingerprint = nrincremental.optionsFingerprint(loadPostVs, options)
+        self.sourceSignatures = {}
+        for fileName in fileList:
+            absName = os.path.abspath(fileName)
+            self.sourceSignatures[absName] = nrincremental.fileSignature(absName, fingerprint)
+
+        plan = nrincremental.planImport(importedFiles, objectSources, paths, fileList, self.sourceSignatures)
+        for fileName in plan.filesToImport:
+            absName = os.path.abspath(fileName)
+            if absName not in self.sourceSignatures:
+                self.sourceSignatures[absName] = nrincremental.fileSignature(absName, fingerprint)
+
+        meshes = set()
+        for objKey in plan.removeKeys:
+            obj = objects[objKey]
+            if obj.data:
+                meshes.add(obj.data)
+            bpy.data.objects.remove(obj, do_unlink=True)
+        for mesh in meshes:
+            if 0 == mesh.users:
+                bpy.data.meshes.remove(mesh)
+
+        for fileName in plan.deletedFiles:
+            importedFiles.pop(fileName, None)
+        for fileName in plan.filesToImport:
+            absName = os.path.abspath(fileName)
+            importedFiles[absName] = self.sourceSignatures[absName]
+        self._importedFiles = importedFiles
+
+        nrtools.logInfo("Incremental import: files={} unchanged={} removedObjects={} deletedFiles={}".format(
+            len(plan.filesToImport), plan.skippedCount, len(plan.removeKeys), len(plan.deletedFiles)))
+        return plan.filesToImport
+
+
+    # Cancelled import: files which were not (completely) built are not recorded
+    def discardIncremental(self, fileList):
+        for fileName in fileList:
+            self._importedFiles.pop(os.path.abspath(fileName), None)
+
+
+    # Store imported files signatures in the scene
+    def finishIncremental(self):
+        if self.sourceSignatures is None:
+            return
+        bpy.context.scene[nrincremental.SCENE_FILES_PROP] = json.dumps(self._importedFiles)
 
-    def _importTriangleMesh(self, options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList):
-        # Extra vatrs/vertexes
-        loadExtraUvData = False
-        vert1  = None
-        vatrs1 = None
-        vertexData1 = None
-        if options.texCoord.useExtraUV:
-            while (True):
-                vert1  = nrmesh.getVertexes(1)
-                vatrs1 = nrmesh.getVertexAttributes(1)
-                if (not vert1) or (not vatrs1):
-                    break
-
-                vertexData1 = vert1.read()
-                if not vertexData1:
-                    break
-
-                if vert.getVertexCount() != vert1.getVertexCount():
-                    nrtools.logError("Vertex count != Extra vertex count {}!={}".format(vert.getVertexCount(), vert1.getVertexCount()))
-                    break
-
-                loadExtraUvData = True
-                break
 
-        return self._createMesh(options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList, loadExtraUvData, vatrs1, vert1, vertexData1)
+    def _storeHashDecisions(self, hashManager, fileData):
+        if fileData and hasattr(hashManager, "storeDecisions"):
+            # nrhashes.PersistentHashesManager
+            hashManager.storeDecisions(fileData.fileName, fileData.hashDecisions)
 
 
-    def _importLineMesh(self, options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList):
-        # Extra vatrs/vertexes
-        loadExtraUvData = False
-        vert1  = None
-        vatrs1 = None
-        vertexData1 = None
-        if options.texCoord.useExtraUV:
-            while (True):
-                vert1  = nrmesh.getVertexes(1)
-                vatrs1 = nrmesh.getVertexAttributes(1)
-                if (not vert1) or (not vatrs1):
-                    break
+    def _storeBounds(self, fileData):
+        if self.boundsIndex and fileData and (fileData.meshBounds is not None):
+            self.boundsIndex.store(fileData.fileName, fileData.meshCount, fileData.meshBounds)
 
-                vertexData1 = vert1.read()
-                if not vertexData1:
-                    break
 
-                if vert.getVertexCount() != vert1.getVertexCount():
-                    nrtools.logError("Vertex count != Extra vertex count {}!={}".format(vert.getVertexCount(), vert1.getVertexCount()))
-                    break
+    def _importMeshImpl(self, loadPostVs, fileName, options, hashManager):
+        fileData = nrdecode.decodeFile(loadPostVs, fileName, options, hashManager, self.boundsIndex)
+        self._storeHashDecisions(hashManager, fileData)
+        self._storeBounds(fileData)
+        return self._importFileData(options, fileData)
 
-                loadExtraUvData = True
-                break
 
-        return self._createLines(options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList, loadExtraUvData, vatrs1, vert1, vertexData1)
+    def importMesh(self, loadPostVs, fileName, options, hashManager):
+        res = False
+        #try:
+        res = self._importMeshImpl(loadPostVs, fileName, options, hashManager)
+        #except Exception as e:
+        #    nrtools.logError("_importMeshImpl() Exception: {}".format(str(e)))
+        return res
 
 
-    def _importPointMesh(self, options, nrmesh, vatrs, vert, vertexData, positions3, meshName):
-        return self._createPoints(options, nrmesh, vatrs, vert, vertexData, positions3, meshName)
+class StreamState:
+    Running   = 0
+    Finished  = 1
+    Cancelled = 2
 
 
-    def _importMeshImpl(self, loadPostVs, fileName, options, hashManager):
-        nrtools.logInfo("Loading: {}".format(fileName))
+class ImportProgress(object):
+    def __init__(self):
+        self.filesTotal  = 0
+        self.filesDone   = 0
+        self.meshesBuilt = 0
+        self.bytesDone   = 0  # Sizes of completely built files
+        self.pendingBytes = 0  # Decoded meshes waiting to be built
+        self.preparing   = True  # Mesh hashes/incremental plan, files are not decoded yet
+        self.__startTime = time.perf_counter()
+
+    def elapsedSeconds(self):
+        return time.perf_counter() - self.__startTime
+
+    def meshesPerSecond(self):
+        return self.meshesBuilt / max(self.elapsedSeconds(), 1e-6)
+
+    def mbPerSecond(self):
+        return self.bytesDone / 1048576.0 / max(self.elapsedSeconds(), 1e-6)
+
+    def __str__(self):
+        if self.preparing:
+            return "Preparing... {:.1f}s".format(self.elapsedSeconds())
+        return "Files {}/{} meshes={} ({:.0f}/s) {:.1f}MB/s pending={:.1f}MB".format(
+            self.filesDone, self.filesTotal, self.meshesBuilt, self.meshesPerSecond(), self.mbPerSecond(), self.pendingBytes / 1048576.0)
+
+
+# Streaming import driver. Files are decoded (nrdecode.BoundedDecoder, ExtraOptions.memoryBudgetMB)
+# while meshes are built one by one by step(), so the caller regains control between batches.
+# Cancelled import keeps created objects.
+class ImportStream(object):
+    def __init__(self, loadPostVs, paths, options):
+        self.loadPostVs = loadPostVs
+        self.paths      = paths
+        self.options    = options
+        self.state      = StreamState.Running
+        self.progress   = ImportProgress()
+        self.importer   = None
+        self.hashManager = None
+        self.decoder    = None
+        self.__fileList = []
+        self.__decoded  = collections.deque()  # Decoded FileData waiting to be built (textures prefetched)
+        self.__fileData = None                 # FileData being built
+        self.__meshes   = collections.deque()  # Remaining meshes of __fileData
+        self.__meshesCount  = 0
+        self.__buildSeconds = 0.0
+        self.__completed = set()  # Completely built files
+        self.__prepare  = None   # __prepareSteps() generator until the decoder is created
+
+
+    # Importer setup only. Capture files are listed, hashed and planned by step() (__prepareSteps)
+    def start(self):
+        loadPostVs, paths, options = self.loadPostVs, self.paths, self.options
+
+        self.hashManager = nrhashes.PersistentHashesManager()
+
+        importer = BlenderImporter()
+        importer.report = nrprofile.ImportReport(loadPostVs, options)
+        extra = options.extraOptions
+        if extra.traceMemory:
+            nrprofile.startMemoryTracing()
+        importer.linkAfterImport = extra.linkAfterImport
+        if extra.maxMeshVertices > 0:
+            # Merged meshes obey the split limit too
+            importer.merger.maxVertices = min(extra.maxMeshVertices, nrmerge.MERGE_MAX_VERTICES)
+        if extra.textureCacheDir:
+            importer.matMgr.textureCache = nrtextures.TextureCache(extra.textureCacheDir, extra.textureCacheMaxMB * 1024 * 1024)
+        if extra.texturePrefetchThreads > 0:
+            # Content hashes (material keys, texture cache) are calculated by prefetch threads
+            importer.matMgr.prefetcher = nrtextures.TexturePrefetcher(extra.texturePrefetchThreads, True)
+            if importer.matMgr.textureCache:
+                importer.matMgr.textureCache.prefetcher = importer.matMgr.prefetcher
+
+        if extra.materialLibraryDir:
+            library = MaterialLibrary(extra.materialLibraryDir)
+            if library.isSupported():
+                importer.matMgr.library = library
+            else:
+                nrtools.logWarn("Material library is not supported by this blender version")
+
+        if options.isRegionEnabled():
+            if not nrbounds.isRegionApplicable(loadPostVs, options.region):
+                nrtools.logWarn("Region [{}] not applicable to {} import. Region ignored".format(options.region, "PostVS" if loadPostVs else "PreVS"))
+            elif options.region.useBoundsCache:
+                importer.boundsIndex = nrbounds.BoundsIndex(loadPostVs, options)
+        self.importer = importer
+        self.__prepare = self.__prepareSteps()
+
+
+    # Generator. Mesh hashes (index or hashing pass), incremental plan, decoder
+    def __prepareSteps(self):
+        loadPostVs, paths, options = self.loadPostVs, self.paths, self.options
+        importer = self.importer
+        extra = options.extraOptions
+
+        for _ in self.hashManager.loadHashesSteps(loadPostVs, paths, options):
+            yield
+
+        fileList = nrdecode.collectFiles(paths)
+        if extra.incrementalImport:
+            # Hash index entries of unchanged files are kept by hashManager.save()
+            fileList = importer.prepareIncremental(loadPostVs, paths, fileList, options)
+        self.__fileList = fileList
+        self.progress.filesTotal = len(fileList)
+
+        self.decoder = nrdecode.BoundedDecoder(loadPostVs, fileList, options, self.hashManager,
+                                               extra.workersCount, extra.memoryBudgetMB * 1024 * 1024, importer.boundsIndex)
+        self.progress.preparing = False
+
+
+    def __accept(self, fileData):
+        importer = self.importer
+        importer._storeHashDecisions(self.hashManager, fileData)
+        importer._storeBounds(fileData)
+        importer.report.stats.peak("pendingBytes", self.decoder.pendingBytes)
+        if fileData:
+            importer._prefetchTextures(fileData)
+            self.__decoded.append(fileData)
+
+
+    # Decoded files are collected ahead of building (textures prefetched). Serial decoding only when idle
+    def __collect(self, timeout):
+        if (self.decoder.workersCount <= 0) and (self.__meshes or self.__decoded):
+            return
+        while True:
+            ready, fileData = self.decoder.poll(timeout)
+            if not ready:
+                return
+            self.__accept(fileData)
+            if self.decoder.workersCount <= 0:
+                return
+            timeout = 0
 
-        nr = nrfile.NRFile()
-        if not nr.parse(fileName):
-            nrtools.logError("Ninja Ripper file parsing failed: {}".format(nr.getErrorString()))
-            return False
 
-        fileDirectory = os.path.dirname(os.path.abspath(fileName))
+    def __finishFile(self):
+        fileData = self.__fileData
+        self.importer._finishFileData(fileData, self.__meshesCount, self.__buildSeconds)
+        self.__completed.add(fileData.fileName)
+        self.progress.filesDone = self.progress.filesDone + 1
+        self.progress.bytesDone = self.progress.bytesDone + fileData.fileSize
+        self.__fileData = None
 
-        skipPrinted = False
-        
-        for meshIdx in range(0, nr.getMeshCount()):
-            if options.isMeshDubEnabled():
-                skip, skipMsg = hashManager.skipMeshLoading(fileName, meshIdx)
-                if skip and (not skipPrinted):
-                    nrtools.logWarn("{}".format(skipMsg))
-                    skipPrinted = True
-                    continue
 
-            nrmesh = nr.getMesh(meshIdx)
+    # Builds meshes until seconds elapsed (None - until finished). Returns StreamState
+    def step(self, seconds=None):
+        if StreamState.Running != self.state:
+            return self.state
 
-            # ---Fast checks for mesh stage---
-            if loadPostVs:
-                if nrfile.ShaderStage.PreVs == nrmesh.getShaderStage():
-                    continue
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        while self.__prepare:
+            try:
+                next(self.__prepare)
+            except StopIteration:
+                self.__prepare = None
+                break
+            if (deadline is not None) and (time.perf_counter() >= deadline):
+                return self.state
+
+        while True:
+            self.__collect(0)
+
+            if self.__meshes:
+                meshData = self.__meshes.popleft()
+                nbytes = meshData.calcBytes()
+                buildStartTime = time.perf_counter()
+                self.importer._importMeshData(self.options, self.__fileData, meshData)
+                self.__buildSeconds = self.__buildSeconds + (time.perf_counter() - buildStartTime)
+                del meshData
+                self.decoder.release(nbytes)
+                self.progress.meshesBuilt = self.progress.meshesBuilt + 1
+                if not self.__meshes:
+                    self.__finishFile()
+            elif self.__decoded:
+                self.__fileData = self.__decoded.popleft()
+                # Meshes are dropped from FileData as they are built
+                self.__meshes = collections.deque(self.__fileData.meshes)
+                self.__fileData.meshes = []
+                self.__meshesCount  = len(self.__meshes)
+                self.__buildSeconds = 0.0
+                if not self.__meshes:
+                    self.__finishFile()
+            elif self.decoder.isFinished():
+                self.__finish(False)
+                return self.state
             else:
-                if nrfile.ShaderStage.PreVs != nrmesh.getShaderStage():
-                    continue
+                # Wait for workers (within the time slice)
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                self.__collect(timeout)
 
+            self.progress.pendingBytes = self.decoder.pendingBytes
+            if (deadline is not None) and (time.perf_counter() >= deadline):
+                return self.state
 
-            vatrs = nrmesh.getVertexAttributes(0)
-            if None == vatrs:
-                nrtools.logError("vertexAttribs == None")
-                continue
 
-            if loadPostVs:
-                # PostVS attribute with idx==0 is always POSITION with four components (homogeneous coordinates xyzw)
-                # TODO: attr_comp x/y/z/w
-                if vatrs.getAttr(0).compCount != 4:
-                    nrtools.logError("Post vs position not 4 component")
-                    continue
+    # Stops decoding. Objects created so far are kept
+    def cancel(self):
+        if StreamState.Running != self.state:
+            return
+        nrtools.logWarn("Import cancelled: {}".format(self.progress))
+        self.__finish(True)
+
+
+    # Stops decoder processes and prefetch threads. Also after errors in start()/step()
+    def close(self):
+        self.__stopDecoding()
+        if self.importer and self.importer.matMgr.prefetcher:
+            self.importer.matMgr.prefetcher.shutdown()
+
+
+    def __stopDecoding(self):
+        if self.__prepare:
+            # Stops the hashing pass process
+            self.__prepare.close()
+            self.__prepare = None
+        if self.decoder:
+            self.decoder.close()
+
+
+    def __finish(self, cancelled):
+        importer = self.importer
+        self.__stopDecoding()
+        self.__decoded.clear()
+        self.__meshes.clear()
+
+        importer.flushMerged(self.options)
+        importer.linkObjects()
+        if cancelled:
+            # Not decoded files have no hash decisions, they are hashed again next time
+            importer.discardIncremental([f for f in self.__fileList if f not in self.__completed])
+        importer.finishIncremental()
+
+        self.hashManager.save()
+        if importer.boundsIndex:
+            importer.boundsIndex.save()
+        if importer.matMgr.prefetcher:
+            importer.matMgr.prefetcher.shutdown()
+        if importer.matMgr.textureCache:
+            nrtools.logInfo("Texture cache: hits={} misses={}".format(importer.matMgr.textureCache.hits, importer.matMgr.textureCache.misses))
+            importer.matMgr.textureCache.save()
+        if importer.matMgr.library:
+            nrtools.logInfo("Material library: linked={}".format(importer.matMgr.library.linkedCount))
+            importer.matMgr.library.save()
+
+        if self.options.extraOptions.traceMemory:
+            importer.report.stats.peak("import.traced", nrprofile.stopMemoryTracing())
+        importer.report.finish()
+        if self.options.extraOptions.reportPath:
+            importer.report.save(self.options.extraOptions.reportPath)
+
+        importer.printInfo()
+        nrtools.logInfo("{}".format(self.progress))
+        setFarClipDistance()
+        importer.selectLargestObjectViewSelected()
+        self.state = StreamState.Cancelled if cancelled else StreamState.Finished
 
-            vert = nrmesh.getVertexes(0)
-            if not vert:
-                nrtools.logError("vertexes == None")
-                continue
 
-            vertexData = vert.read()
-            if None == vertexData:
-                nrtools.logError("vertexData == None")
-                continue
+def importFiles(loadPostVs, paths, options):
+    nrprofile.runProfiled(options.extraOptions.profilePath, lambda: _importFiles(loadPostVs, paths, options))
 
 
-            positions3 = None
-            if loadPostVs:
-                # PostVS
-                positions3 = nrtools.createPos3FromPostVsAsList(options, nrmesh, vatrs, vert, vertexData)
-            else:
-                positions3 = nrtools.createPos3FromPreVsAsList(options, vatrs, vert, vertexData)
+# Blocking import
+def _importFiles(loadPostVs, paths, options):
+    stream = ImportStream(loadPostVs, paths, options)
+    try:
+        stream.start()
+        stream.step()
+    finally:
+        stream.close()
 
-            if not positions3:
-                nrtools.logError("positions3 == None")
-                continue
 
-            meshName = os.path.basename(fileName)
-            meshName = os.path.splitext(meshName)[0]
-            meshCreated = False
-            if nrfile.PrimitiveTopology.TriangleList == nrmesh.getPrimitiveTopology():
-                indx = nrmesh.getIndexes(0)
-                if not indx:
-                    nrtools.logError("indexes == None")
-                    continue
-
-                if vert.getVertexCount() < 3:
-                    nrtools.logError("TriangleMesh VertexCount < 3")
-                    continue
-
-                textures = nrmesh.getTextures()
-                texList = nrtools.createTexturesList(textures, fileDirectory)
-
-                # Check texturesCnt == 0
-                # Check Quads/Box
-                skip, skipMsg = nrtools.isMeshLoadingSkipped(options, vert, indx, textures)
-                if skip:
-                    nrtools.logWarn("Mesh loading skipped: {}".format(skipMsg))
-                    continue
-
-                # Create triangle mesh
-                meshCreated = self._importTriangleMesh(options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList)
-
-            elif nrfile.PrimitiveTopology.LineList == nrmesh.getPrimitiveTopology():
-                indx = nrmesh.getIndexes(0)
-                if not indx:
-                    nrtools.logError("indexes == None")
-                    continue
-
-                if vert.getVertexCount() < 2:
-                    nrtools.logError("LineMesh VertexCount < 2")
-                    continue
-
-                textures = nrmesh.getTextures()
-                texList = nrtools.createTexturesList(textures, fileDirectory)
-
-                # Check texturesCnt == 0
-                # Check Quads/Box
-                skip, skipMsg = nrtools.isMeshLoadingSkipped(options, vert, indx, textures)
-                if skip:
-                    nrtools.logWarn("LineMesh loading skipped: {}".format(skipMsg))
-                    continue
-
-                # Create line mesh
-                meshCreated = self._importLineMesh(options, nrmesh, vatrs, vert, vertexData, positions3, indx, meshName, texList)
-
-            elif nrfile.PrimitiveTopology.PointList == nrmesh.getPrimitiveTopology():
-                # Create point mesh
-                meshCreated = self._importPointMesh(options, nrmesh, vatrs, vert, vertexData, positions3, meshName)
+def setStatusText(context, text):
+    if hasattr(context, "workspace") and hasattr(context.workspace, "status_text_set"):
+        # blender >= 2.80
+        context.workspace.status_text_set(text)
+    elif context.area:
+        context.area.header_text_set(text)
 
-            else:
-                nrtools.logError("Import not realized for primitive topology={}".format(nrfile.topologyToStr(nrmesh.getPrimitiveTopology())))
-
-            if meshCreated:
-                if nr.getFileSize() > self._maxNrSize:
-                    self._maxNrSize = nr.getFileSize()
-                    self._maxMeshName = meshName
-                self.totalCreated = self.totalCreated + 1
 
-        self.totalFilesCount = self.totalFilesCount + 1
-        return True
+# Streaming import as modal operator: meshes are built in ExtraOptions.streamBatchMs slices
+# between UI redraws, ESC cancels (objects created so far are kept).
+#   registerStreamingImport() once, then startStreamingImport(loadPostVs, paths, options)
+_pendingStream = None
 
 
-    def importMesh(self, loadPostVs, fileName, options, hashManager):
-        res = False
-        #try:
-        res = self._importMeshImpl(loadPostVs, fileName, options, hashManager)
-        #except Exception as e:
-        #    nrtools.logError("_importMeshImpl() Exception: {}".format(str(e)))
-        return res
+def startStreamingImport(loadPostVs, paths, options):
+    global _pendingStream
+    _pendingStream = ImportStream(loadPostVs, paths, options)
+    return bpy.ops.import_scene.ninjaripper_stream('INVOKE_DEFAULT')
 
 
-def importFiles(loadPostVs, paths, options):
+if hasattr(bpy, "types") and hasattr(bpy.types, "Operator"):
+    class NinjaRipperStreamingImport(bpy.types.Operator):
+        bl_idname = "import_scene.ninjaripper_stream"
+        bl_label  = "Ninja Ripper streaming import"
 
-    hashManager = nrtools.MeshHashesManager()
-    hashManager.loadHashes(loadPostVs, paths, options)
+        _stream = None
+        _timer  = None
 
-    importer = BlenderImporter()
+        def invoke(self, context, event):
+            global _pendingStream
+            self._stream, _pendingStream = _pendingStream, None
+            if not self._stream:
+                return {'CANCELLED'}
 
-    for file in paths:
-        if os.path.isfile(file):
-            importer.importMesh(loadPostVs, file, options, hashManager)
-        elif os.path.isdir(file):
-            fileList = glob.glob(file + "*.nr")
-            for file in fileList:
-                importer.importMesh(loadPostVs, file, options, hashManager)
+            try:
+                self._stream.start()
+            except Exception:
+                self._stream.close()
+                raise
+            wm = context.window_manager
+            # Files count is known after the preparation steps
+            wm.progress_begin(0, 100)
+            self._timer = wm.event_timer_add(0.01, window=context.window)
+            wm.modal_handler_add(self)
+            return {'RUNNING_MODAL'}
+
+        def modal(self, context, event):
+            stream = self._stream
+            if 'ESC' == event.type:
+                stream.cancel()
+                self.report({'WARNING'}, "Import cancelled: {}".format(stream.progress))
+                return self.__finish(context)
+
+            if 'TIMER' != event.type:
+                return {'PASS_THROUGH'}
 
-    importer.printInfo()
-    setFarClipDistance()
-    importer.selectLargestObjectViewSelected()
-    
+            try:
+                state = stream.step(stream.options.extraOptions.streamBatchMs / 1000.0)
+            except Exception:
+                stream.close()
+                self.__finish(context)
+                raise
+            context.window_manager.progress_update(int(100 * stream.progress.filesDone / max(1, stream.progress.filesTotal)))
+            setStatusText(context, "Ninja Ripper import: {}  (Esc - cancel)".format(stream.progress))
+            if StreamState.Running != state:
+                self.report({'INFO'}, "Import finished: {}".format(stream.progress))
+                return self.__finish(context)
+            return {'RUNNING_MODAL'}
+
+        # Partial results are kept: FINISHED in both cases (undo step pushed)
+        def __finish(self, context):
+            wm = context.window_manager
+            wm.event_timer_remove(self._timer)
+            wm.progress_end()
+            setStatusText(context, None)
+            return {'FINISHED'}
+
+
+def registerStreamingImport():
+    bpy.utils.register_class(NinjaRipperStreamingImport)
+
+
+def unregisterStreamingImport():
+    bpy.utils.unregister_class(NinjaRipperStreamingImport)
@@ -0,0 +1,153 @@
+import os
+import hashlib
+
+import numpy as np
+
+import nrimp
+import nrsidecar
+
+
+# Region of interest filtering (ImportOptions.region). Blender independent.
+#
+# Mesh bounds (PreVS: positions AABB, PostVS: NDC AABB) are computed while decoding,
+# meshes outside of the region are dropped before any blender datablock is created.
+# Region.useBoundsCache: per-mesh bounds are stored in a sidecar file per capture directory,
+# repeated region queries skip culled meshes without decoding and culled files without parsing.
+
+BOUNDS_INDEX_FILE_NAME = ".nrbounds.json"
+BOUNDS_INDEX_VERSION   = 1
+
+
+# Nx3 -> [[minX, minY, minZ], [maxX, maxY, maxZ]] or None (empty)
+def calcBounds(points):
+    if (points is None) or (0 == len(points)):
+        return None
+    return [points.min(axis=0).tolist(), points.max(axis=0).tolist()]
+
+
+# Clip space xyzw (Nx4) -> NDC bounds. None if any vertex is behind the camera (w <= 0): NDC box is unbounded
+def calcNdcBounds(xyzw):
+    if (xyzw is None) or (0 == len(xyzw)):
+        return None
+    w = xyzw[:, 3]
+    if np.any(w <= 0.0):
+        return None
+    return calcBounds(xyzw[:, :3] / w[:, None])
+
+
+def isBoxIntersected(bounds, boxMin, boxMax):
+    return all((bounds[0][i] <= boxMax[i]) and (bounds[1][i] >= boxMin[i]) for i in range(3))
+
+
+def isSphereIntersected(bounds, center, radius):
+    closest = [min(max(center[i], bounds[0][i]), bounds[1][i]) for i in range(3)]
+    return sum((closest[i] - center[i]) ** 2 for i in range(3)) <= radius * radius
+
+
+class RegionFilter(object):
+    def __init__(self, loadPostVs, region):
+        self.loadPostVs = loadPostVs
+        self.region = region
+
+
+    # bounds: calcBounds()/calcNdcBounds(). None == unknown, mesh is kept
+    def intersects(self, bounds):
+        if bounds is None:
+            return True
+        region = self.region
+        if nrimp.RegionLoadMode.Sphere == region.loadMode:
+            return isSphereIntersected(bounds, region.center, region.radius)
+        return isBoxIntersected(bounds, region.boxMin, region.boxMax)
+
+
+    # fileBounds: BoundsIndex.lookup() entry. Mesh without bounds (filtered/failed) is culled too
+    def isMeshCulled(self, fileBounds, meshIdx):
+        meshes = fileBounds["meshes"]
+        key = str(meshIdx)
+        if key not in meshes:
+            return False
+        return (not meshes[key]["ok"]) or (not self.intersects(meshes[key]["bounds"]))
+
+
+    def isFileCulled(self, fileBounds):
+        return all(self.isMeshCulled(fileBounds, meshIdx) for meshIdx in range(fileBounds["meshCount"]))
+
+
+# NdcBox: PostVS only. Box/Sphere: PreVS only
+def isRegionApplicable(loadPostVs, region):
+    return (nrimp.RegionLoadMode.NdcBox == region.loadMode) == bool(loadPostVs)
+
+
+# Returns RegionFilter or None (region disabled/not applicable)
+def createRegionFilter(loadPostVs, options):
+    if (not options.isRegionEnabled()) or (not isRegionApplicable(loadPostVs, options.region)):
+        return None
+    return RegionFilter(loadPostVs, options.region)
+
+
+# Options which affect stored bounds (positions source) and filtered meshes (no bounds)
+def optionsFingerprint(loadPostVs, options):
+    e = options.extraOptions
+    p = options.posPostVs
+    s = "loadPostVs={} posPreVs=[{}] posPostVs=[{} {} {} {}] dontLoadMeshesWithoutTextures={} dontLoadQuadMeshes={} dontLoadBoxMeshes={}".format(
+        loadPostVs, options.posPreVs, p.x, p.y, p.z, p.w, e.dontLoadMeshesWithoutTextures, e.dontLoadQuadMeshes, e.dontLoadBoxMeshes)
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def loadIndexFile(directory):
+    return nrsidecar.loadIndexFile(directory, BOUNDS_INDEX_FILE_NAME, BOUNDS_INDEX_VERSION, "files", {}, "Bounds index")
+
+
+def saveIndexFile(directory, files):
+    nrsidecar.saveIndexFile(directory, BOUNDS_INDEX_FILE_NAME, BOUNDS_INDEX_VERSION, "files", files, "Bounds index")
+
+
+# Per-mesh bounds sidecar files. Picklable (passed to decode workers)
+class BoundsIndex(object):
+    def __init__(self, loadPostVs, options):
+        self.fingerprint = optionsFingerprint(loadPostVs, options)
+        self.__dirs  = {}     # directory -> {baseName: entry}
+        self.__dirty = set()  # directories to save
+
+
+    def __getDirFiles(self, directory):
+        files = self.__dirs.get(directory)
+        if files is None:
+            files = loadIndexFile(directory)
+            self.__dirs[directory] = files
+        return files
+
+
+    # Returns entry {"meshCount": n, "meshes": {"meshIdx": {"ok": bool, "bounds": bounds}}} or None (missing/outdated)
+    def lookup(self, fileName):
+        fileName = os.path.abspath(fileName)
+        entry = self.__getDirFiles(os.path.dirname(fileName)).get(os.path.basename(fileName))
+        if not entry:
+            return None
+        try:
+            if (entry.get("fingerprint") != self.fingerprint) or (entry.get("signature") != nrsidecar.fileSignature(fileName)):
+                return None
+        except OSError:
+            return None
+        return entry
+
+
+    #   meshBounds: {meshIdx: (ok, bounds)} (nrdecode.FileData.meshBounds). Meshes not decoded are missing
+    def store(self, fileName, meshCount, meshBounds):
+        fileName = os.path.abspath(fileName)
+        directory = os.path.dirname(fileName)
+        meshes = {}
+        for meshIdx, (ok, bounds) in meshBounds.items():
+            meshes[str(meshIdx)] = {"ok": ok, "bounds": bounds}
+        self.__getDirFiles(directory)[os.path.basename(fileName)] = {
+            "fingerprint": self.fingerprint,
+            "signature": nrsidecar.fileSignature(fileName),
+            "meshCount": meshCount,
+            "meshes": meshes}
+        self.__dirty.add(directory)
+
+
+    def save(self):
+        for directory in self.__dirty:
+            saveIndexFile(directory, self.__dirs[directory])
+        self.__dirty.clear()
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+# Bulk (vectorized) buffer helpers. Blender independent.
+# Buffer arguments accept any buffer-protocol object (bytes, bytearray, memoryview) without copying.
+
+
+# Index buffer -> (primCount, primSize) int32 array.
+# No copy: result is a view over indexData (keeps it alive)
+def decodeIndexes(indexData, indexCount, primSize):
+    primCount = int(indexCount / primSize)
+    arr = np.frombuffer(indexData, dtype=np.int32, count=primCount * primSize)
+    return arr.reshape(primCount, primSize)
+
+
+# TriangleList -> Nx3
+def decodeTriangles(indexData, indexCount):
+    return decodeIndexes(indexData, indexCount, 3)
+
+
+# LineList -> Nx2
+def decodeLines(indexData, indexCount):
+    return decodeIndexes(indexData, indexCount, 2)
+
+
+# Positions (list of xyz / buffer) -> Nx3 float32 array
+def positionsToArray(positions3):
+    return np.ascontiguousarray(positions3, dtype=np.float32).reshape(-1, 3)
+
+
+# TexCoords (list of uv / buffer) -> Nx2 float32 array. V flipped for blender (1.0 - v)
+def texCoordsToArray(texCoords):
+    uvs = np.array(texCoords, dtype=np.float32).reshape(len(texCoords), -1)[:, :2]
+    uvs[:, 1] = 1.0 - uvs[:, 1]
+    return np.ascontiguousarray(uvs)
+
+
+# Per-vertex attribute -> per-loop attribute
+#   loopVertIndexes: flat vertex index per loop (faces.ravel())
+def gatherByIndexes(perVertex, loopVertIndexes):
+    return np.take(perVertex, loopVertIndexes, axis=0)
+
+
+# Vertex colors (list of rgb/rgba) -> Nx4 float32 array.
+#   r/g/b/a: source component index for each output channel (nrimp.VertexColors)
+def colorsToArray(colors, r, g, b, a):
+    arr = np.array(colors, dtype=np.float32).reshape(len(colors), -1)
+    if arr.shape[1] < 4:
+        alpha = np.ones((len(arr), 4 - arr.shape[1]), dtype=np.float32)
+        arr = np.hstack((arr, alpha))
+    return np.ascontiguousarray(arr[:, [r, g, b, a]])
+
+
+# Normals (list of xyz / buffer) -> Nx3 float32 array
+def normalsToArray(normals):
+    return np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3)
+
+
+# Packed normals [0,1] -> [-1,1]
+def unormToSnorm(arr):
+    return arr * 2.0 - 1.0
+
+
+# Normalize Nx3 vectors in place. Zero vectors are left as is
+def normalizeVectors(arr):
+    lengths = np.sqrt(np.einsum("ij,ij->i", arr, arr))
+    lengths[0.0 == lengths] = 1.0
+    arr /= lengths[:, None]
+    return arr
+
+
+# Octahedral encoded normals (Nx2 [-1,1]) -> Nx3 float32 unit vectors
+def octahedralToVectors(xy):
+    xy = np.asarray(xy, dtype=np.float32)
+    res = np.empty((len(xy), 3), dtype=np.float32)
+    x = xy[:, 0]
+    y = xy[:, 1]
+    z = 1.0 - np.abs(x) - np.abs(y)
+    t = np.maximum(-z, 0.0)
+    res[:, 0] = x - np.copysign(t, x)
+    res[:, 1] = y - np.copysign(t, y)
+    res[:, 2] = z
+    return normalizeVectors(res)
@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+import nrimp
+import nrtools
+import nrdecode
+import nrhashes
+import nrbounds
+import nrexport
+
+
+# Headless batch converter: .nr captures -> binary glTF (.glb) or OBJ+MTL. Blender is not required.
+#   python nrconvert.py --help
+#
+# Files are decoded by nrdecode (same ImportOptions and load modes as the blender import)
+# and written by nrexport, one output file per .nr file. Files are converted by a process pool.
+#
+# ImportOptions are read from a JSON file (--options), nested as the ImportOptions attributes:
+#   {"texCoord": {"loadMode": 3, "uAttrComp": [1, 0], "vAttrComp": [1, 1]},
+#    "meshDup": {"loadMode": 1, "hashTags": [[0, "VB"], [0, "IB"]]},
+#    "extraOptions": {"instanceMeshes": true}}
+# AttrComp values are [attr, comp], enum values are integers (nrimp.*LoadMode).
+
+
+# Sets ImportOptions attributes from nested dict. Unknown names raise ValueError
+def applyOptionsDict(obj, values, path=""):
+    for name, value in values.items():
+        fullName = path + name
+        if not hasattr(obj, name):
+            raise ValueError("Unknown option: {}".format(fullName))
+
+        current = getattr(obj, name)
+        if isinstance(current, nrimp.AttrComp):
+            setattr(obj, name, nrimp.AttrComp(int(value[0]), int(value[1])))
+        elif isinstance(obj, nrimp.MeshDuplicate) and ("hashTags" == name):
+            obj.hashTags = []
+            for idx, tag in value:
+                obj.addTag(idx, tag)
+        elif isinstance(value, dict):
+            applyOptionsDict(current, value, fullName + ".")
+        else:
+            setattr(obj, name, value)
+
+
+def loadOptions(optionsPath):
+    options = nrimp.ImportOptions()
+    if optionsPath:
+        with open(optionsPath, "r") as f:
+            applyOptionsDict(options, json.load(f))
+    return options
+
+
+# Output path keeps the file location relative to the common directory of all input files
+def createOutPath(fileName, rootDirectory, outDirectory, outFormat):
+    relName = os.path.relpath(os.path.abspath(fileName), rootDirectory)
+    return os.path.join(outDirectory, os.path.splitext(relName)[0] + "." + outFormat)
+
+
+class ConvertResult(object):
+    def __init__(self, fileName, outPath):
+        self.fileName  = fileName
+        self.outPath   = outPath
+        self.ok        = False
+        self.meshCount = 0
+        self.seconds   = 0.0
+        self.error     = ""
+        self.hashDecisions = {}  # nrdecode.FileData.hashDecisions
+        self.meshTotal  = 0      # nrdecode.FileData.meshCount
+        self.meshBounds = None   # nrdecode.FileData.meshBounds
+
+
+def convertFile(loadPostVs, fileName, outPath, outFormat, options, hashManager, boundsIndex=None):
+    res = ConvertResult(fileName, outPath)
+    startTime = time.perf_counter()
+    try:
+        fileData = nrdecode.decodeFile(loadPostVs, fileName, options, hashManager, boundsIndex)
+        if not fileData:
+            res.error = "Decoding failed"
+            return res
+
+        res.hashDecisions = fileData.hashDecisions
+        res.meshTotal  = fileData.meshCount
+        res.meshBounds = fileData.meshBounds
+        if not fileData.meshes:
+            # Nothing to write (skipped/culled meshes)
+            res.ok = True
+            return res
+
+        writer = nrexport.createWriter(outFormat, options, outPath)
+        for meshData in fileData.meshes:
+            writer.addMesh(meshData)
+        writer.save()
+        res.meshCount = writer.meshCount
+        res.ok = True
+    except Exception as e:
+        res.error = str(e)
+    finally:
+        res.seconds = time.perf_counter() - startTime
+    return res
+
+
+# Worker process state: nrdecode._initWorker() (same pool initializer as the import)
+def _convertFileWorker(task):
+    loadPostVs, options, hashManager, boundsIndex = nrdecode._workerArgs
+    fileName, outPath, outFormat = task
+    return convertFile(loadPostVs, fileName, outPath, outFormat, options, hashManager, boundsIndex)
+
+
+# Generator. Yields ConvertResult in completion order
+def convertFiles(loadPostVs, tasks, outFormat, options, hashManager, workersCount, boundsIndex=None):
+    if (workersCount <= 0) or (len(tasks) <= 1):
+        for fileName, outPath in tasks:
+            yield convertFile(loadPostVs, fileName, outPath, outFormat, options, hashManager, boundsIndex)
+        return
+
+    pool = multiprocessing.Pool(workersCount, nrdecode._initWorker, (loadPostVs, options, hashManager, boundsIndex))
+    try:
+        for res in pool.imap_unordered(_convertFileWorker, [(f, o, outFormat) for f, o in tasks]):
+            yield res
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# Returns failed files count
+def convert(loadPostVs, paths, outDirectory, outFormat, options, workersCount):
+    fileList = nrdecode.collectFiles(paths)
+    if not fileList:
+        nrtools.logWarn("No .nr files found: {}".format(paths))
+        return 0
+
+    hashManager = nrhashes.PersistentHashesManager()
+    hashManager.loadHashes(loadPostVs, paths, options)
+
+    boundsIndex = None
+    if options.isRegionEnabled():
+        if not nrbounds.isRegionApplicable(loadPostVs, options.region):
+            nrtools.logWarn("Region [{}] not applicable to {} import. Region ignored".format(options.region, "PostVS" if loadPostVs else "PreVS"))
+        elif options.region.useBoundsCache:
+            boundsIndex = nrbounds.BoundsIndex(loadPostVs, options)
+
+    rootDirectory = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in fileList])
+    tasks = [(f, createOutPath(f, rootDirectory, outDirectory, outFormat)) for f in fileList]
+
+    startTime = time.perf_counter()
+    failedCount = 0
+    meshCount = 0
+    for res in convertFiles(loadPostVs, tasks, outFormat, options, hashManager, workersCount, boundsIndex):
+        if not res.ok:
+            failedCount = failedCount + 1
+            nrtools.logError("Convert failed: {} {}".format(res.fileName, res.error))
+            continue
+
+        # Sidecar indexes are written by the main process only
+        hashManager.storeDecisions(res.fileName, res.hashDecisions)
+        if boundsIndex and (res.meshBounds is not None):
+            boundsIndex.store(res.fileName, res.meshTotal, res.meshBounds)
+        meshCount = meshCount + res.meshCount
+        nrtools.logInfo("Converted: {} -> {} meshes={} {:.3f}s".format(res.fileName, res.outPath, res.meshCount, res.seconds))
+
+    hashManager.save()
+    if boundsIndex:
+        boundsIndex.save()
+
+    nrtools.logInfo("Converted files={} failed={} meshes={} time={:.3f}s".format(
+        len(fileList) - failedCount, failedCount, meshCount, time.perf_counter() - startTime))
+    return failedCount
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Ninja Ripper .nr -> glTF/OBJ batch converter (headless)")
+    parser.add_argument("paths", nargs="+", help=".nr files or capture directories")
+    parser.add_argument("-o", "--out", required=True, help="Output directory")
+    parser.add_argument("--format", choices=["glb", "obj"], default="glb")
+    parser.add_argument("--postvs", action="store_true", help="Load PostVS (xyzw) positions")
+    parser.add_argument("--options", default="", help="ImportOptions JSON file")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Converter processes. 0 - serial")
+    args = parser.parse_args(argv[1:])
+
+    options = loadOptions(args.options)
+    options.dump(args.postvs)
+    return 1 if convert(args.postvs, args.paths, args.out, args.format, options, args.workers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
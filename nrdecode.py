@@ -0,0 +1,629 @@
+import os
+import glob
+import time
+import hashlib
+import collections
+import multiprocessing
+
+import numpy as np
+
+import nrfile
+import nrtools
+import nrimp
+import nrbulk
+import nrpostvs
+import nrlayout
+import nrbounds
+import nrprofile
+
+
+# Blender independent part of the import: .nr parsing and buffers decoding.
+# Results are plain objects with numpy arrays (picklable), so files can be decoded in worker processes
+# while the main thread only creates blender objects.
+
+
+class MeshData(object):
+    def __init__(self, meshName, topology):
+        self.meshName  = meshName
+        self.topology  = topology  # nrfile.PrimitiveTopology
+        self.group0Id  = 0
+        self.group1Id  = 0
+        self.positions = None      # Nx3 float32
+        self.faces     = None      # Nx3 int32 (TriangleList)
+        self.edges     = None      # Nx2 int32 (LineList)
+        self.texList   = None      # Texture paths. None == no material/texcoords (PointList)
+        self.uvLayers  = []        # [(uvIdx, per-loop Mx2 float32), ...]
+        self.vertexColors = []     # [per-vertex Nx4 float32, ...]
+        self.normals   = None      # Nx3 float32 custom normals
+        self.useSmooth = False     # Normals not found: use smooth shading
+        self.contentHash = None    # ExtraOptions.instanceMeshes
+        self.sources   = []        # Source .nr files (abspath). Several for merged meshes
+        self.bounds    = None      # nrbounds.calcBounds()/calcNdcBounds(). ImportOptions.region
+        self.culled    = False     # Outside of ImportOptions.region. Not imported
+
+    def getLoopVertIndexes(self):
+        if self.faces is None:
+            return np.empty(0, dtype=np.int32)
+        return self.faces.ravel()
+
+    # Hash of everything written to the blender Mesh datablock (geometry, attributes, material textures).
+    # Meshes with equal hashes can share one datablock
+    def calcContentHash(self):
+        h = hashlib.sha1()
+        h.update("{}|{}|{}".format(self.topology, self.useSmooth, self.texList).encode("utf-8"))
+
+        arrays = [("p", self.positions), ("f", self.faces), ("e", self.edges), ("n", self.normals)]
+        arrays += [("uv{}".format(uvIdx), uvs) for uvIdx, uvs in self.uvLayers]
+        arrays += [("vc", colors) for colors in self.vertexColors]
+        for tag, arr in arrays:
+            if arr is None:
+                continue
+            h.update("|{}{}|".format(tag, arr.shape).encode("utf-8"))
+            h.update(np.ascontiguousarray(arr))
+        return h.hexdigest()
+
+    # Bytes held by decoded arrays
+    def calcBytes(self):
+        arrays = [self.positions, self.faces, self.edges, self.normals]
+        arrays += [uvs for uvIdx, uvs in self.uvLayers] + self.vertexColors
+        return sum(arr.nbytes for arr in arrays if arr is not None)
+
+
+class FileData(object):
+    def __init__(self, fileName, fileSize):
+        self.fileName = fileName
+        self.fileSize = fileSize
+        self.meshes   = []  # [MeshData, ...]
+        self.hashDecisions = {}  # meshIdx: (skip, skipMsg). MeshDuplicateLoadMode.Auto. None == file not parsed
+        self.meshCount  = 0
+        self.meshBounds = None   # meshIdx: (ok, bounds) of decoded meshes. ImportOptions.region
+        self.stats    = nrprofile.StageStats()  # decode.* stages
+
+    def calcBytes(self):
+        return sum(meshData.calcBytes() for meshData in self.meshes)
+
+
+# Per-loop UV layers [(uvIdx, uvs), ...]
+#   vertexValues: nrlayout.VertexValues (unpackPlan() result)
+def decodeTexCoords(plan, vertexValues, loopVertIndexes):
+    res = []
+    for uvIdx, columns in plan.uvs:
+        values = vertexValues.getStream(columns)
+        if values is None:
+            continue
+        uvs = nrbulk.texCoordsToArray(values)
+        res.append((uvIdx, nrbulk.gatherByIndexes(uvs, loopVertIndexes)))
+    return res
+
+
+# Per-vertex rgba layers [colors, ...]
+def decodeVertexColors(options, plan, vatrs, vert, vertexData):
+    res = []
+
+    vertCol = options.vertCol
+    for colorAttrIdx in plan.colorAttrs:
+        # Unpack rgba as is. R/G/B/A remap applied to the whole buffer
+        vertColorsList = nrtools.unpackVertexColorsAsList(vert, vertexData, vatrs, colorAttrIdx, 0, 1, 2, 3, 4)
+        if not vertColorsList:
+            continue
+
+        res.append(nrbulk.colorsToArray(vertColorsList, vertCol.r, vertCol.g, vertCol.b, vertCol.a))
+    return res
+
+
+# Returns (normals, useSmooth)
+def decodeNormals(options, plan, vertexValues):
+    if plan.normals is None:
+        return None, plan.noNormalsSmooth
+
+    values = vertexValues.getStream(plan.normals)
+    if values is None:
+        # Auto: use blender AUTOSMOOTH
+        return None, (options.normalVecs.loadMode == nrimp.NormalVectorsLoadMode.Auto)
+    return unpackNormals(options.normalVecs, values), False
+
+
+# Decoded components -> Nx3 float32 (NormalVectors.encoding/renormalize)
+def unpackNormals(normalVecs, values):
+    encoding = normalVecs.encoding
+    if (nrimp.NormalVectorsEncoding.Octahedral == encoding) or (nrimp.NormalVectorsEncoding.OctahedralUnorm == encoding):
+        xy = values[:, :2]
+        if nrimp.NormalVectorsEncoding.OctahedralUnorm == encoding:
+            xy = nrbulk.unormToSnorm(xy)
+        # Unit vectors already
+        return nrbulk.octahedralToVectors(xy)
+
+    if nrimp.NormalVectorsEncoding.Unorm == encoding:
+        values = nrbulk.unormToSnorm(values)
+
+    normals = nrbulk.normalsToArray(values)
+    if normalVecs.renormalize:
+        nrbulk.normalizeVectors(normals)
+    return normals
+
+
+# Index buffer -> Nx3/Nx2 int32 array.
+# The stream is read once, the array is a view over the read buffer (no second copy).
+# Stream read() may return any buffer-protocol object (bytes, memoryview of a memory-mapped file):
+# the decoding helpers (nrlayout/nrbulk) only view it
+def decodeIndexStream(indx, primSize):
+    return nrbulk.decodeIndexes(indx.read(), indx.getIndexCount(), primSize)
+
+
+# Extra vatrs/vertexes with texcoords (TexCoords.useExtraUV)
+# Returns (vatrs1, vert1, vertexData1) or None
+def loadExtraUvData(nrmesh, vert):
+    vert1  = nrmesh.getVertexes(1)
+    vatrs1 = nrmesh.getVertexAttributes(1)
+    if (not vert1) or (not vatrs1):
+        return None
+
+    vertexData1 = vert1.read()
+    if (vertexData1 is None) or (0 == memoryview(vertexData1).nbytes):
+        return None
+
+    if vert.getVertexCount() != vert1.getVertexCount():
+        nrtools.logError("Vertex count != Extra vertex count {}!={}".format(vert.getVertexCount(), vert1.getVertexCount()))
+        return None
+
+    return (vatrs1, vert1, vertexData1)
+
+
+# .nr files list from files/directories
+def collectFiles(paths):
+    res = []
+    for file in paths:
+        if os.path.isfile(file):
+            res.append(file)
+        elif os.path.isdir(file):
+            res.extend(glob.glob(file + "*.nr"))
+    return res
+
+
+# Viewport (width, height) used by FOV/OrthoProj transform modes. None if the file has no viewport size
+def getViewportSize(nrmesh):
+    if hasattr(nrmesh, "getWidth") and hasattr(nrmesh, "getHeight"):
+        return nrmesh.getWidth(), nrmesh.getHeight()
+    return None
+
+
+# PostVS xyzw (Nx4) -> Nx3 float32 (nrpostvs). None: can't unproject here, use nrtools
+def unprojectPostVs(options, nrmesh, xyzw):
+    posPostVs = options.posPostVs
+    width, height = 0, 0
+    if nrimp.PositionTransformMode.Matrix != posPostVs.transformMode:
+        size = getViewportSize(nrmesh)
+        if (not size) or (0 == size[0]) or (0 == size[1]):
+            return None
+        width, height = size
+
+    invMat = nrpostvs.getInvProjMatrix(posPostVs, width, height)
+    if invMat is None:
+        return None
+    return nrpostvs.unprojectPositions(xyzw, invMat)
+
+
+# Returns Nx3 float32 or None.
+# Vertex buffer formats are decoded by nrtools only, so positions still pass through per-vertex tuples
+# (plan unpack or nrtools.createPos3From*AsList) before the Nx3 conversion. Mesh building uses the array only
+def decodePositions(loadPostVs, options, nrmesh, vatrs, vert, vertexData, plan, vertexValues):
+    values = vertexValues.getStream(plan.positions)
+    if values is not None:
+        if not loadPostVs:
+            return nrbulk.positionsToArray(values)
+
+        positions = unprojectPostVs(options, nrmesh, values)
+        if positions is not None:
+            return positions
+
+    if loadPostVs:
+        positions3 = nrtools.createPos3FromPostVsAsList(options, nrmesh, vatrs, vert, vertexData)
+    else:
+        positions3 = nrtools.createPos3FromPreVsAsList(options, vatrs, vert, vertexData)
+
+    if not positions3:
+        return None
+    return nrbulk.positionsToArray(positions3)
+
+
+class MeshHeader(object):
+    def __init__(self, topology, vatrs, vert):
+        self.topology = topology  # nrfile.PrimitiveTopology
+        self.vatrs    = vatrs
+        self.vert     = vert
+        self.indx     = None      # TriangleList/LineList
+        self.texList  = None      # None == no material/texcoords (PointList)
+
+
+# Skip rules which need nrtools.isMeshLoadingSkipped() (reads vertex data).
+# Its quad/box classification is nrtools internal, so every mesh is checked while these options are on.
+# Without them nrtools has nothing to skip (baseline rules: textures count, quads/box)
+def isSkipCheckNeeded(options):
+    extra = options.extraOptions
+    return extra.dontLoadQuadMeshes or extra.dontLoadBoxMeshes
+
+
+# Phase 1: all skip rules evaluated from the mesh headers (stage, topology, counts, textures).
+# Vertex/index data is read only by nrtools quad/box checks.
+# Returns MeshHeader or None (skipped/failed)
+def readMeshHeader(loadPostVs, fileDirectory, options, nrmesh):
+    # ---Fast checks for mesh stage---
+    if loadPostVs:
+        if nrfile.ShaderStage.PreVs == nrmesh.getShaderStage():
+            return None
+    else:
+        if nrfile.ShaderStage.PreVs != nrmesh.getShaderStage():
+            return None
+
+
+    vatrs = nrmesh.getVertexAttributes(0)
+    if None == vatrs:
+        nrtools.logError("vertexAttribs == None")
+        return None
+
+    if loadPostVs:
+        # PostVS attribute with idx==0 is always POSITION with four components (homogeneous coordinates xyzw)
+        # TODO: attr_comp x/y/z/w
+        if vatrs.getAttr(0).compCount != 4:
+            nrtools.logError("Post vs position not 4 component")
+            return None
+
+    vert = nrmesh.getVertexes(0)
+    if not vert:
+        nrtools.logError("vertexes == None")
+        return None
+
+    topology = nrmesh.getPrimitiveTopology()
+    header = MeshHeader(topology, vatrs, vert)
+
+    if (nrfile.PrimitiveTopology.TriangleList == topology) or (nrfile.PrimitiveTopology.LineList == topology):
+        isTriangles = (nrfile.PrimitiveTopology.TriangleList == topology)
+
+        indx = nrmesh.getIndexes(0)
+        if not indx:
+            nrtools.logError("indexes == None")
+            return None
+
+        if isTriangles and (vert.getVertexCount() < 3):
+            nrtools.logError("TriangleMesh VertexCount < 3")
+            return None
+        if (not isTriangles) and (vert.getVertexCount() < 2):
+            nrtools.logError("LineMesh VertexCount < 2")
+            return None
+
+        textures = nrmesh.getTextures()
+
+        # Check texturesCnt == 0
+        # Check Quads/Box
+        skip, skipMsg = False, ""
+        if options.extraOptions.dontLoadMeshesWithoutTextures and (0 == len(textures)):
+            skip, skipMsg = True, "no textures"
+        elif isSkipCheckNeeded(options):
+            skip, skipMsg = nrtools.isMeshLoadingSkipped(options, vert, indx, textures)
+        if skip:
+            if isTriangles:
+                nrtools.logWarn("Mesh loading skipped: {}".format(skipMsg))
+            else:
+                nrtools.logWarn("LineMesh loading skipped: {}".format(skipMsg))
+            return None
+
+        header.indx = indx
+        header.texList = nrtools.createTexturesList(textures, fileDirectory)
+
+    elif nrfile.PrimitiveTopology.PointList != topology:
+        nrtools.logError("Import not realized for primitive topology={}".format(nrfile.topologyToStr(topology)))
+        return None
+
+    return header
+
+
+# PreVS: positions bounds. PostVS: NDC bounds of clip space positions
+def calcMeshBounds(loadPostVs, plan, vertexValues, positions):
+    if not loadPostVs:
+        return nrbounds.calcBounds(positions)
+    values = vertexValues.getStream(plan.positions)
+    if values is None:
+        return None
+    return nrbounds.calcNdcBounds(values)
+
+
+# Returns MeshData or None (skipped/failed).
+# MeshData.culled: outside of the region, only bounds are set
+#   stats: nrprofile.StageStats
+#   regionFilter: nrbounds.RegionFilter or None
+def decodeMesh(loadPostVs, fileName, fileDirectory, options, nrmesh, stats, regionFilter=None):
+    with stats.stage("decode.header"):
+        header = readMeshHeader(loadPostVs, fileDirectory, options, nrmesh)
+    if not header:
+        stats.count("meshesFiltered")
+        return None
+
+    # Phase 2: buffers of the meshes which passed all checks
+    vatrs, vert = header.vatrs, header.vert
+    with stats.stage("decode.read"):
+        vertexData = vert.read()
+    if vertexData is None:
+        nrtools.logError("vertexData == None")
+        return None
+
+    meshName = os.path.basename(fileName)
+    meshName = os.path.splitext(meshName)[0]
+
+    topology = header.topology
+    meshData = MeshData(meshName, topology)
+    meshData.group0Id  = nrmesh.getGroup0Id()
+    meshData.group1Id  = nrmesh.getGroup1Id()
+    meshData.texList   = header.texList
+
+    if header.indx:
+        with stats.stage("decode.indexes"):
+            if nrfile.PrimitiveTopology.TriangleList == topology:
+                meshData.faces = decodeIndexStream(header.indx, 3)
+            else:
+                meshData.edges = decodeIndexStream(header.indx, 2)
+
+    loadColors  = options.isVertexColorEnabled()
+    loadUvs     = (meshData.texList is not None) and options.isTexCoordEnabled()
+    loadNormals = (meshData.faces is not None) and options.isNormalVecsEnabled()
+
+    extraUvData = None
+    if loadUvs and options.texCoord.useExtraUV:
+        # Use texcoord from extra UV-data
+        extraUvData = loadExtraUvData(nrmesh, vert)
+
+    # Positions/normals/uvs of vertex stream 0 unpacked in one pass
+    with stats.stage("decode.unpack"):
+        plan = nrlayout.getDecodePlan(loadPostVs, options, vatrs, True, loadUvs and (not extraUvData), loadNormals, loadColors)
+        vertexValues = nrlayout.unpackPlan(plan, vert, vertexData, vatrs)
+
+    # Nx3 float32
+    with stats.stage("decode.positions"):
+        meshData.positions = decodePositions(loadPostVs, options, nrmesh, vatrs, vert, vertexData, plan, vertexValues)
+
+    if (meshData.positions is None) or (0 == len(meshData.positions)):
+        nrtools.logError("positions3 == None")
+        return None
+
+    # Region of interest: culled before colors/uvs/normals are decoded
+    if regionFilter:
+        with stats.stage("decode.bounds"):
+            meshData.bounds = calcMeshBounds(loadPostVs, plan, vertexValues, meshData.positions)
+        if not regionFilter.intersects(meshData.bounds):
+            meshData.culled = True
+            meshData.positions = None
+            return meshData
+
+    # VertexColors
+    if loadColors:
+        with stats.stage("decode.colors"):
+            meshData.vertexColors = decodeVertexColors(options, plan, vatrs, vert, vertexData)
+
+    # Intermediates are released as soon as the last stage using them is done
+    del vertexData
+
+    # Normal vectors
+    if loadNormals:
+        with stats.stage("decode.normals"):
+            meshData.normals, meshData.useSmooth = decodeNormals(options, plan, vertexValues)
+
+    # TexCoords
+    if loadUvs:
+        if extraUvData:
+            del vertexValues
+            uvVatrs, uvVert, uvVertexData = extraUvData
+            extraUvData = None
+            with stats.stage("decode.unpack"):
+                uvPlan = nrlayout.getDecodePlan(loadPostVs, options, uvVatrs, loadPositions=False, loadUvs=True)
+                vertexValues = nrlayout.unpackPlan(uvPlan, uvVert, uvVertexData, uvVatrs)
+            del uvVert, uvVertexData
+        else:
+            uvPlan = plan
+
+        with stats.stage("decode.uvs"):
+            meshData.uvLayers = decodeTexCoords(uvPlan, vertexValues, meshData.getLoopVertIndexes())
+    del vertexValues
+
+    if options.extraOptions.instanceMeshes:
+        with stats.stage("decode.hash"):
+            meshData.contentHash = meshData.calcContentHash()
+
+    meshBytes = meshData.calcBytes()
+    stats.count("decodedBytes", meshBytes)
+    stats.peak("meshBytes", meshBytes)
+    stats.count("meshes")
+    stats.count("vertices", len(meshData.positions))
+    if meshData.faces is not None:
+        stats.count("triangles", len(meshData.faces))
+    if meshData.edges is not None:
+        stats.count("lines", len(meshData.edges))
+
+    return meshData
+
+
+# Returns FileData or None (parsing failed)
+#   boundsIndex: nrbounds.BoundsIndex or None (Region.useBoundsCache)
+def decodeFile(loadPostVs, fileName, options, hashManager, boundsIndex=None):
+    regionFilter = nrbounds.createRegionFilter(loadPostVs, options)
+    fileBounds = None
+    if regionFilter and boundsIndex:
+        fileBounds = boundsIndex.lookup(fileName)
+        if fileBounds and regionFilter.isFileCulled(fileBounds):
+            # Nothing inside the region. File is not parsed
+            nrtools.logInfo("Culled by region: {}".format(fileName))
+            fileData = FileData(fileName, os.path.getsize(fileName))
+            fileData.hashDecisions = None
+            fileData.stats.count("filesCulled")
+            return fileData
+
+    nrtools.logInfo("Loading: {}".format(fileName))
+
+    parseStartTime = time.perf_counter()
+    nr = nrfile.NRFile()
+    if not nr.parse(fileName):
+        nrtools.logError("Ninja Ripper file parsing failed: {}".format(nr.getErrorString()))
+        return None
+
+    fileDirectory = os.path.dirname(os.path.abspath(fileName))
+    fileData = FileData(fileName, nr.getFileSize())
+    fileData.meshCount = nr.getMeshCount()
+    if regionFilter:
+        fileData.meshBounds = {}
+    fileData.stats.addTime("decode.parse", time.perf_counter() - parseStartTime)
+    fileData.stats.count("files")
+    fileData.stats.count("bytes", fileData.fileSize)
+
+    skipPrinted = False
+
+    for meshIdx in range(0, nr.getMeshCount()):
+        if options.isMeshDubEnabled():
+            skip, skipMsg = hashManager.skipMeshLoading(fileName, meshIdx)
+            fileData.hashDecisions[meshIdx] = (skip, skipMsg)
+            if skip and (not skipPrinted):
+                nrtools.logWarn("{}".format(skipMsg))
+                skipPrinted = True
+                continue
+
+        if fileBounds and regionFilter.isMeshCulled(fileBounds, meshIdx):
+            # Bounds index: not decoded
+            meshBounds = fileBounds["meshes"][str(meshIdx)]
+            fileData.meshBounds[meshIdx] = (meshBounds["ok"], meshBounds["bounds"])
+            fileData.stats.count("meshesCulled")
+            continue
+
+        meshData = decodeMesh(loadPostVs, fileName, fileDirectory, options, nr.getMesh(meshIdx), fileData.stats, regionFilter)
+        if regionFilter:
+            fileData.meshBounds[meshIdx] = (meshData is not None, meshData.bounds if meshData else None)
+        if meshData and meshData.culled:
+            fileData.stats.count("meshesCulled")
+            continue
+
+        if meshData:
+            meshData.sources = [os.path.abspath(fileName)]
+            fileData.meshes.append(meshData)
+
+    return fileData
+
+
+# Worker process state. Set once per process by the pool initializer
+_workerArgs = None
+
+
+def _initWorker(loadPostVs, options, hashManager, boundsIndex):
+    global _workerArgs
+    _workerArgs = (loadPostVs, options, hashManager, boundsIndex)
+    if options.extraOptions.traceMemory:
+        # decode.* stage peaks of worker processes
+        nrprofile.startMemoryTracing()
+
+
+def _decodeFileWorker(fileName):
+    loadPostVs, options, hashManager, boundsIndex = _workerArgs
+    return decodeFile(loadPostVs, fileName, options, hashManager, boundsIndex)
+
+
+# Decoding with back-pressure (streaming import).
+# Files are submitted while estimated in-flight bytes (file sizes) plus decoded bytes not released
+# by the consumer (release()) fit budgetBytes. One file is always allowed when nothing is pending,
+# so files larger than the budget are still decoded.
+# workersCount == 0: files are decoded by poll() in the calling thread.
+class BoundedDecoder(object):
+    def __init__(self, loadPostVs, fileList, options, hashManager, workersCount, budgetBytes, boundsIndex=None):
+        self.loadPostVs  = loadPostVs
+        self.options     = options
+        self.hashManager = hashManager
+        self.boundsIndex = boundsIndex
+        self.workersCount = workersCount
+        self.budgetBytes  = budgetBytes
+        self.pendingBytes  = 0  # Decoded, not released
+        self.inFlightBytes = 0  # Submitted, not decoded (estimated)
+        self.__decodedBytes = 0  # Decoded/file size ratio observed so far. Used for in-flight estimates
+        self.__fileBytes    = 0
+        self.__files = collections.deque(fileList)
+        self.__tasks = collections.deque()  # [(AsyncResult, estimatedBytes), ...] in fileList order
+        self.__pool  = None
+        if (workersCount > 0) and (len(fileList) > 1):
+            self.__pool = multiprocessing.Pool(workersCount, _initWorker, (loadPostVs, options, hashManager, boundsIndex))
+
+
+    def isFinished(self):
+        return (not self.__files) and (not self.__tasks)
+
+
+    def __getFileSize(self, fileName):
+        try:
+            return os.path.getsize(fileName)
+        except OSError:
+            return 0
+
+
+    def __estimateBytes(self, fileName):
+        fileSize = self.__getFileSize(fileName)
+        if 0 == self.__fileBytes:
+            return fileSize
+        return int(fileSize * self.__decodedBytes / self.__fileBytes)
+
+
+    def __canSubmit(self, estimatedBytes):
+        if (0 == self.pendingBytes) and (not self.__tasks):
+            return True
+        return self.pendingBytes + self.inFlightBytes + estimatedBytes <= self.budgetBytes
+
+
+    def __submit(self):
+        while self.__files and (len(self.__tasks) < self.workersCount):
+            estimatedBytes = self.__estimateBytes(self.__files[0])
+            if not self.__canSubmit(estimatedBytes):
+                break
+            fileName = self.__files.popleft()
+            self.__tasks.append((self.__pool.apply_async(_decodeFileWorker, (fileName,)), estimatedBytes))
+            self.inFlightBytes = self.inFlightBytes + estimatedBytes
+
+
+    def __accept(self, fileData):
+        if fileData:
+            nbytes = fileData.calcBytes()
+            self.pendingBytes = self.pendingBytes + nbytes
+            if fileData.meshes:
+                self.__decodedBytes = self.__decodedBytes + nbytes
+                self.__fileBytes    = self.__fileBytes + self.__getFileSize(fileData.fileName)
+        return fileData
+
+
+    # Returns (ready, fileData). fileData None: decoding failed.
+    # Not ready: nothing decoded within timeout (None - wait) or budget is exhausted
+    def poll(self, timeout=None):
+        if not self.__pool:
+            if (not self.__files) or (not self.__canSubmit(self.__estimateBytes(self.__files[0]))):
+                return False, None
+            fileName = self.__files.popleft()
+            return True, self.__accept(decodeFile(self.loadPostVs, fileName, self.options, self.hashManager, self.boundsIndex))
+
+        self.__submit()
+        if not self.__tasks:
+            return False, None
+        asyncResult, estimatedBytes = self.__tasks[0]
+        asyncResult.wait(timeout)
+        if not asyncResult.ready():
+            return False, None
+
+        self.__tasks.popleft()
+        self.inFlightBytes = self.inFlightBytes - estimatedBytes
+        fileData = self.__accept(asyncResult.get())
+        self.__submit()
+        return True, fileData
+
+
+    # Decoded bytes handed over to the consumer (mesh built)
+    def release(self, nbytes):
+        self.pendingBytes = max(0, self.pendingBytes - nbytes)
+        if self.__pool:
+            self.__submit()
+
+
+    def close(self):
+        self.__files.clear()
+        self.__tasks.clear()
+        if self.__pool:
+            self.__pool.terminate()
+            self.__pool.join()
+            self.__pool = None
@@ -0,0 +1,397 @@
+import os
+import json
+import struct
+
+import numpy as np
+
+import nrbulk
+import nrtools
+
+
+# glTF 2.0 binary (.glb) and OBJ+MTL writers for decoded meshes (nrdecode.MeshData). Blender independent.
+#
+# Geometry is written in the coordinate system of the blender import (Z up),
+# converted the same way as blender exporters do: glTF/OBJ Y up, -Z forward.
+# Vertex buffers are written as whole numpy arrays, no per-vertex python loops.
+
+GLTF_FLOAT        = 5126
+GLTF_UNSIGNED_INT = 5125
+
+GLTF_ARRAY_BUFFER         = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+
+GLTF_MODE_POINTS    = 0
+GLTF_MODE_LINES     = 1
+GLTF_MODE_TRIANGLES = 4
+
+GLB_MAGIC      = 0x46546C67  # 'glTF'
+GLB_CHUNK_JSON = 0x4E4F534A  # 'JSON'
+GLB_CHUNK_BIN  = 0x004E4942  # 'BIN\0'
+
+
+# Blender Z up -> Y up (x, z, -y)
+def toYUp(vectors):
+    res = np.empty_like(vectors)
+    res[:, 0] = vectors[:, 0]
+    res[:, 1] = vectors[:, 2]
+    res[:, 2] = -vectors[:, 1]
+    return res
+
+
+# glTF NORMAL: unit vectors. Zero vectors (broken source data) -> +Y (up)
+def toUnitNormals(normals):
+    res = nrbulk.normalizeVectors(np.array(normals, dtype=np.float32))
+    res[0.0 == np.abs(res).sum(axis=1)] = (0.0, 1.0, 0.0)
+    return res
+
+
+# glTF COLOR_n: linear. Decoded colors are sRGB encoded byte colors (blender import: color_srgb), alpha is linear
+def srgbToLinear(colors):
+    res = np.clip(np.array(colors, dtype=np.float32), 0.0, 1.0)
+    rgb = res[:, :3]
+    res[:, :3] = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return res
+
+
+# Per-loop attribute (nrdecode.decodeTexCoords) -> per-vertex. Exact: loop values were gathered from vertices
+def loopsToVertices(loopValues, loopVertIndexes, vertexCount):
+    res = np.zeros((vertexCount, loopValues.shape[1]), dtype=loopValues.dtype)
+    res[loopVertIndexes] = loopValues
+    return res
+
+
+# Per-vertex UV layers [(uvIdx, Nx2), ...] in blender convention (origin bottom-left). Layers without loops (lines/points) are dropped
+def getVertexUvLayers(meshData):
+    loopVertIndexes = meshData.getLoopVertIndexes()
+    res = []
+    for uvIdx, loopUvs in meshData.uvLayers:
+        if (0 == len(loopVertIndexes)) or (len(loopUvs) != len(loopVertIndexes)):
+            continue
+        res.append((uvIdx, loopsToVertices(loopUvs, loopVertIndexes, len(meshData.positions))))
+    return res
+
+
+# Material textures: nrtools.createTexListForTexSlot() (first texture is diffuse). Empty list == no textures
+def getMaterialTextures(options, meshData):
+    if (not meshData.texList) or (not options.isTexCoordEnabled()):
+        return []
+    return list(nrtools.createTexListForTexSlot(options, meshData.texList))
+
+
+def relativeUri(path, outDirectory):
+    try:
+        path = os.path.relpath(path, outDirectory)
+    except ValueError:
+        # Other drive (Windows)
+        path = os.path.abspath(path)
+    return path.replace(os.sep, "/")
+
+
+# No vertices or no primitives (index buffer without faces/lines): nothing valid to write
+def isEmptyMesh(meshData):
+    if (meshData.positions is None) or (0 == len(meshData.positions)):
+        return True
+    if (meshData.faces is not None) and (0 == len(meshData.faces)):
+        return True
+    if (meshData.edges is not None) and (0 == len(meshData.edges)):
+        return True
+    return False
+
+
+def createOutDirectory(outPath):
+    directory = os.path.dirname(os.path.abspath(outPath))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+# Binary buffer of a .glb. Arrays are kept as is and written in one pass (4 bytes aligned)
+class GltfBuffer(object):
+    def __init__(self):
+        self.arrays      = []  # [(offset, contiguous array), ...]
+        self.byteLength  = 0
+        self.bufferViews = []
+        self.accessors   = []
+
+
+    def addAccessor(self, arr, accType, componentType, target, withMinMax=False):
+        arr = np.ascontiguousarray(arr)
+        offset = (self.byteLength + 3) & ~3
+        self.arrays.append((offset, arr))
+        self.byteLength = offset + arr.nbytes
+
+        self.bufferViews.append({"buffer": 0, "byteOffset": offset, "byteLength": arr.nbytes, "target": target})
+        accessor = {"bufferView": len(self.bufferViews) - 1, "componentType": componentType,
+                    "count": int(arr.shape[0]), "type": accType}
+        if withMinMax:
+            accessor["min"] = arr.min(axis=0).tolist()
+            accessor["max"] = arr.max(axis=0).tolist()
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+
+    def addFloats(self, arr, accType, withMinMax=False):
+        return self.addAccessor(arr.astype(np.float32, copy=False), accType, GLTF_FLOAT, GLTF_ARRAY_BUFFER, withMinMax)
+
+
+    def addIndexes(self, arr):
+        return self.addAccessor(arr.ravel().astype(np.uint32, copy=False), "SCALAR", GLTF_UNSIGNED_INT, GLTF_ELEMENT_ARRAY_BUFFER)
+
+
+    def paddedLength(self):
+        return (self.byteLength + 3) & ~3
+
+
+    def write(self, f):
+        pos = 0
+        for offset, arr in self.arrays:
+            if offset > pos:
+                f.write(b"\0" * (offset - pos))
+            f.write(memoryview(arr).cast("B"))
+            pos = offset + arr.nbytes
+        f.write(b"\0" * (self.paddedLength() - pos))
+
+
+# One .glb per converted file: node per mesh, shared meshes for instanced geometry (MeshData.contentHash)
+class GltfWriter(object):
+    def __init__(self, options, outPath):
+        self.options   = options
+        self.outPath   = outPath
+        self.outDirectory = createOutDirectory(outPath)
+        self.buffer    = GltfBuffer()
+        self.nodes     = []
+        self.meshes    = []
+        self.materials = []
+        self.textures  = []
+        self.images    = []
+        self.__meshByHash     = {}  # contentHash -> mesh index
+        self.__materialByKey  = {}  # (textures, vcLayersCount) -> material index
+        self.__textureByPath  = {}  # path -> texture index
+        self.meshCount = 0
+
+
+    def __addTexture(self, path):
+        texIdx = self.__textureByPath.get(path)
+        if texIdx is not None:
+            return texIdx
+
+        self.images.append({"uri": relativeUri(path, self.outDirectory)})
+        imageIdx = len(self.images) - 1
+        if path.lower().endswith(".dds"):
+            # DDS is not a core glTF image format
+            self.textures.append({"extensions": {"MSFT_texture_dds": {"source": imageIdx}}})
+        else:
+            self.textures.append({"source": imageIdx})
+        texIdx = len(self.textures) - 1
+        self.__textureByPath[path] = texIdx
+        return texIdx
+
+
+    def __addMaterial(self, textures, vcLayersCount):
+        key = (tuple(textures), vcLayersCount)
+        matIdx = self.__materialByKey.get(key)
+        if matIdx is not None:
+            return matIdx
+
+        mat = {"name": "Material_{}".format(len(self.materials)), "pbrMetallicRoughness": {"metallicFactor": 0.0}}
+        if textures:
+            mat["pbrMetallicRoughness"]["baseColorTexture"] = {"index": self.__addTexture(textures[0])}
+            mat["extras"] = {"textures": [relativeUri(t, self.outDirectory) for t in textures]}
+        self.materials.append(mat)
+        matIdx = len(self.materials) - 1
+        self.__materialByKey[key] = matIdx
+        return matIdx
+
+
+    def __addMesh(self, meshData):
+        buf = self.buffer
+        attributes = {"POSITION": buf.addFloats(toYUp(meshData.positions), "VEC3", True)}
+        if meshData.normals is not None:
+            attributes["NORMAL"] = buf.addFloats(toUnitNormals(toYUp(meshData.normals)), "VEC3")
+
+        textures = getMaterialTextures(self.options, meshData)
+        for layerIdx, (uvIdx, uvs) in enumerate(getVertexUvLayers(meshData)):
+            # glTF: origin top-left
+            uvs[:, 1] = 1.0 - uvs[:, 1]
+            attributes["TEXCOORD_{}".format(layerIdx)] = buf.addFloats(uvs, "VEC2")
+        for layerIdx, colors in enumerate(meshData.vertexColors):
+            attributes["COLOR_{}".format(layerIdx)] = buf.addFloats(srgbToLinear(colors), "VEC4")
+
+        primitive = {"attributes": attributes}
+        if meshData.faces is not None:
+            primitive["mode"] = GLTF_MODE_TRIANGLES
+            primitive["indices"] = buf.addIndexes(meshData.faces)
+        elif meshData.edges is not None:
+            primitive["mode"] = GLTF_MODE_LINES
+            primitive["indices"] = buf.addIndexes(meshData.edges)
+        else:
+            primitive["mode"] = GLTF_MODE_POINTS
+        if meshData.texList is not None:
+            primitive["material"] = self.__addMaterial(textures, len(meshData.vertexColors))
+
+        self.meshes.append({"name": meshData.meshName, "primitives": [primitive]})
+        return len(self.meshes) - 1
+
+
+    def addMesh(self, meshData):
+        if isEmptyMesh(meshData):
+            return False
+
+        meshIdx = self.__meshByHash.get(meshData.contentHash) if meshData.contentHash else None
+        if meshIdx is None:
+            meshIdx = self.__addMesh(meshData)
+            if meshData.contentHash:
+                self.__meshByHash[meshData.contentHash] = meshIdx
+
+        self.nodes.append({"name": meshData.meshName, "mesh": meshIdx,
+                           "extras": {"group0Id": meshData.group0Id, "group1Id": meshData.group1Id}})
+        self.meshCount = self.meshCount + 1
+        return True
+
+
+    def createJson(self):
+        gltf = {"asset": {"version": "2.0", "generator": "Ninja Ripper nrconvert"},
+                "scene": 0,
+                "scenes": [{}]}
+        # Top level arrays can't be empty
+        if self.nodes:
+            gltf["scenes"][0]["nodes"] = list(range(len(self.nodes)))
+            gltf["nodes"]  = self.nodes
+            gltf["meshes"] = self.meshes
+        if self.buffer.byteLength > 0:
+            gltf["buffers"] = [{"byteLength": self.buffer.paddedLength()}]
+            gltf["bufferViews"] = self.buffer.bufferViews
+            gltf["accessors"]   = self.buffer.accessors
+        if self.materials:
+            gltf["materials"] = self.materials
+        if self.textures:
+            gltf["textures"] = self.textures
+            gltf["images"]   = self.images
+            if any("extensions" in t for t in self.textures):
+                gltf["extensionsUsed"] = ["MSFT_texture_dds"]
+        return gltf
+
+
+    def save(self):
+        jsonData = json.dumps(self.createJson(), separators=(",", ":")).encode("utf-8")
+        jsonData = jsonData + b" " * (((len(jsonData) + 3) & ~3) - len(jsonData))
+        binLength = self.buffer.paddedLength()
+
+        totalLength = 12 + 8 + len(jsonData)
+        if binLength > 0:
+            totalLength = totalLength + 8 + binLength
+
+        with open(self.outPath, "wb") as f:
+            f.write(struct.pack("<III", GLB_MAGIC, 2, totalLength))
+            f.write(struct.pack("<II", len(jsonData), GLB_CHUNK_JSON))
+            f.write(jsonData)
+            if binLength > 0:
+                f.write(struct.pack("<II", binLength, GLB_CHUNK_BIN))
+                self.buffer.write(f)
+
+
+# One .obj (+ .mtl) per converted file. Object per mesh, first UV layer, first vertex colors layer
+# as "v x y z r g b" (blender/MeshLab extension). Meshes are queued and written by save()
+class ObjWriter(object):
+    def __init__(self, options, outPath):
+        self.options = options
+        self.outPath = outPath
+        self.outDirectory = createOutDirectory(outPath)
+        self.mtlPath = os.path.splitext(outPath)[0] + ".mtl"
+        self.__materials = {}  # textures tuple -> material name
+        self.__vertexOffset = 1  # OBJ indexes are 1-based and global
+        self.__uvOffset = 1
+        self.__normalOffset = 1
+        self.__meshes = []
+        self.meshCount = 0
+
+
+    def __getMaterialName(self, textures):
+        key = tuple(textures)
+        name = self.__materials.get(key)
+        if name is None:
+            name = "Material_{}".format(len(self.__materials))
+            self.__materials[key] = name
+        return name
+
+
+    def addMesh(self, meshData):
+        if isEmptyMesh(meshData):
+            return False
+        self.__meshes.append(meshData)
+        self.meshCount = self.meshCount + 1
+        return True
+
+
+    def __writeMesh(self, f, meshData):
+        f.write("o {}\n".format(meshData.meshName))
+
+        positions = toYUp(meshData.positions)
+        if meshData.vertexColors:
+            np.savetxt(f, np.hstack((positions, meshData.vertexColors[0][:, :3])), fmt="v %.6g %.6g %.6g %.6g %.6g %.6g")
+        else:
+            np.savetxt(f, positions, fmt="v %.6g %.6g %.6g")
+
+        # Face corner: v[/vt][/vn]. UVs/normals are per-vertex, so all indexes of a corner are equal (offsets apart)
+        corner = ["{}"]
+        columns = [self.__vertexOffset]
+        uvLayers = getVertexUvLayers(meshData)
+        if uvLayers:
+            np.savetxt(f, uvLayers[0][1], fmt="vt %.6g %.6g")
+            corner.append("{}")
+            columns.append(self.__uvOffset)
+            self.__uvOffset = self.__uvOffset + len(meshData.positions)
+        if meshData.normals is not None:
+            np.savetxt(f, toYUp(meshData.normals), fmt="vn %.6g %.6g %.6g")
+            if not uvLayers:
+                corner.append("")
+                columns.append(None)
+            corner.append("{}")
+            columns.append(self.__normalOffset)
+            self.__normalOffset = self.__normalOffset + len(meshData.positions)
+        cornerFmt = "/".join(c.format("%d") for c in corner)
+        offsets = [o for o in columns if o is not None]
+
+        if meshData.texList is not None:
+            f.write("usemtl {}\n".format(self.__getMaterialName(getMaterialTextures(self.options, meshData))))
+        f.write("s {}\n".format(1 if meshData.useSmooth else "off"))
+
+        if meshData.faces is not None:
+            self.__writeElements(f, "f", meshData.faces, cornerFmt, offsets)
+        elif meshData.edges is not None:
+            self.__writeElements(f, "l", meshData.edges, "%d", offsets[:1])
+        else:
+            self.__writeElements(f, "p", np.arange(len(meshData.positions), dtype=np.int64).reshape(-1, 1), "%d", offsets[:1])
+
+        self.__vertexOffset = self.__vertexOffset + len(meshData.positions)
+
+
+    # indexes: NxK. Each corner repeated per offset (v/vt/vn)
+    def __writeElements(self, f, tag, indexes, cornerFmt, offsets):
+        indexes = indexes.astype(np.int64)
+        k = indexes.shape[1]
+        columns = np.empty((len(indexes), k * len(offsets)), dtype=np.int64)
+        for i, offset in enumerate(offsets):
+            columns[:, i::len(offsets)] = indexes + offset
+        np.savetxt(f, columns, fmt="{} {}".format(tag, " ".join([cornerFmt] * k)))
+
+
+    def save(self):
+        with open(self.outPath, "w") as f:
+            f.write("mtllib {}\n".format(os.path.basename(self.mtlPath)))
+            while self.__meshes:
+                # Written meshes are released
+                self.__writeMesh(f, self.__meshes.pop(0))
+
+        with open(self.mtlPath, "w") as f:
+            for textures, name in self.__materials.items():
+                f.write("newmtl {}\nKd 1 1 1\n".format(name))
+                if textures:
+                    f.write("map_Kd {}\n".format(relativeUri(textures[0], self.outDirectory)))
+                f.write("\n")
+
+
+def createWriter(outFormat, options, outPath):
+    if "obj" == outFormat:
+        return ObjWriter(options, outPath)
+    return GltfWriter(options, outPath)
@@ -0,0 +1,177 @@
+import os
+import hashlib
+import multiprocessing
+
+import nrtools
+import nrdecode
+import nrsidecar
+
+
+# Persistent mesh duplicates index.
+#
+# nrtools.MeshHashesManager.loadHashes() parses every file of the capture before import.
+# Its per-mesh skip decisions are stored in a sidecar file per capture directory:
+#   entries: [{"key": options key, "files": {baseName: {"signature": [size, mtime_ns], "decisions": {meshIdx: [skip, skipMsg]}}}}]
+# Files with unchanged signatures replay the stored decisions. Only new/changed files go through the hashing pass,
+# so one changed file of a capture doesn't invalidate the decisions of the others.
+# Duplicates are detected among the hashed files: a mesh of a new/changed file which duplicates a mesh of an unchanged file
+# is loaded, meshes skipped in unchanged files stay skipped.
+
+HASH_INDEX_FILE_NAME = ".nrhashes.json"
+HASH_INDEX_VERSION   = 2
+HASH_INDEX_MAX_ENTRIES = 8  # Per directory. Oldest entries are dropped
+HASH_POLL_SECONDS = 0.01  # loadHashesSteps(): background hashing pass polling
+
+
+# Only options used by duplicates detection. Other options can change between imports
+def optionsFingerprint(loadPostVs, options):
+    return "loadPostVs={} meshDup=[{}]".format(loadPostVs, options.meshDup)
+
+
+def calcIndexKey(loadPostVs, options):
+    return hashlib.sha1(optionsFingerprint(loadPostVs, options).encode("utf-8")).hexdigest()
+
+
+def loadIndexFile(directory):
+    return nrsidecar.loadIndexFile(directory, HASH_INDEX_FILE_NAME, HASH_INDEX_VERSION, "entries", [], "Mesh hashes index")
+
+
+def saveIndexFile(directory, entries):
+    nrsidecar.saveIndexFile(directory, HASH_INDEX_FILE_NAME, HASH_INDEX_VERSION, "entries", entries[-HASH_INDEX_MAX_ENTRIES:], "Mesh hashes index")
+
+
+# Hashing pass. nrtools.MeshHashesManager is picklable (passed to decode workers too)
+def calcHashes(loadPostVs, paths, options):
+    hashManager = nrtools.MeshHashesManager()
+    hashManager.loadHashes(loadPostVs, paths, options)
+    return hashManager
+
+
+# Drop-in replacement of nrtools.MeshHashesManager (loadHashes/skipMeshLoading)
+class PersistentHashesManager(object):
+    def __init__(self):
+        self.hashManager = None  # nrtools.MeshHashesManager of the hashed (new/changed) files
+        self.indexKey    = None
+        self.indexed     = {}    # abspath -> {meshIdx: (skip, skipMsg)}. Unchanged files, decisions from the index
+        self.decisions   = {}    # abspath -> {meshIdx: (skip, skipMsg)}. Hashed files, recorded while decoding
+        self.hashedFiles = []    # New/changed files. Empty: all decisions from the index
+        self.fromIndex   = False
+
+
+    def loadHashes(self, loadPostVs, paths, options):
+        for _ in self.loadHashesSteps(loadPostVs, paths, options, False):
+            pass
+
+
+    # Generator. Yields between index files and while the hashing pass runs (ImportStream.step() time slices).
+    #   background: hashing pass in a separate process, so the caller stays responsive. Closing the generator stops it
+    def loadHashesSteps(self, loadPostVs, paths, options, background=True):
+        if not options.isMeshDubEnabled():
+            return
+
+        fileList = nrdecode.collectFiles(paths)
+        yield
+        self.indexKey = calcIndexKey(loadPostVs, options)
+        self.hashedFiles = self.__loadDecisions(fileList)
+        if not self.hashedFiles:
+            nrtools.logInfo("Mesh hashes loaded from index: {} files".format(len(fileList)))
+            self.fromIndex = True
+            return
+        if self.indexed:
+            nrtools.logInfo("Mesh hashes loaded from index: {} files, {} new/changed files hashed".format(len(self.indexed), len(self.hashedFiles)))
+        yield
+
+        hashPaths = paths if (not self.indexed) else self.hashedFiles
+        if not background:
+            self.hashManager = calcHashes(loadPostVs, hashPaths, options)
+            return
+
+        pool = multiprocessing.Pool(1)
+        try:
+            res = pool.apply_async(calcHashes, (loadPostVs, hashPaths, options))
+            while not res.ready():
+                res.wait(HASH_POLL_SECONDS)
+                yield
+            self.hashManager = res.get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+    def skipMeshLoading(self, fileName, meshIdx):
+        fileDecisions = self.indexed.get(os.path.abspath(fileName))
+        if fileDecisions is not None:
+            return fileDecisions.get(meshIdx, (False, ""))
+
+        if not self.hashManager:
+            return False, ""
+        return self.hashManager.skipMeshLoading(fileName, meshIdx)
+
+
+    # fileDecisions: {meshIdx: (skip, skipMsg)} recorded while decoding (nrdecode.FileData.hashDecisions).
+    # None: file was not parsed (region culling), it is hashed again next time
+    def storeDecisions(self, fileName, fileDecisions):
+        fileName = os.path.abspath(fileName)
+        if (not self.indexKey) or (fileDecisions is None) or (fileName in self.indexed):
+            return
+        self.decisions[fileName] = fileDecisions
+
+
+    # Write index sidecar files after the import. Entries of other files (not decoded by this import) are kept
+    def save(self):
+        if (not self.indexKey) or (not self.decisions):
+            return
+
+        dirFiles = {}
+        for fileName, fileDecisions in self.decisions.items():
+            try:
+                signature = nrsidecar.fileSignature(fileName)
+            except OSError:
+                continue
+            dirFiles.setdefault(os.path.dirname(fileName), {})[os.path.basename(fileName)] = {"signature": signature, "decisions": fileDecisions}
+
+        for directory, files in dirFiles.items():
+            entries = loadIndexFile(directory)
+            entry = self.__findEntry(entries)
+            if entry is None:
+                entry = {"key": self.indexKey, "files": {}}
+            else:
+                entries.remove(entry)
+            # Deleted files are dropped
+            entryFiles = dict((k, v) for k, v in entry.get("files", {}).items() if os.path.isfile(os.path.join(directory, k)))
+            entryFiles.update(files)
+            entries.append({"key": self.indexKey, "files": entryFiles})
+            saveIndexFile(directory, entries)
+
+
+    def __findEntry(self, entries):
+        for entry in entries:
+            if entry.get("key") == self.indexKey:
+                return entry
+        return None
+
+
+    # Returns new/changed files (not in the index or other signature)
+    def __loadDecisions(self, fileList):
+        dirFiles = {}
+        indexed = {}
+        stale = []
+        for fileName in fileList:
+            fileName = os.path.abspath(fileName)
+            directory = os.path.dirname(fileName)
+            if directory not in dirFiles:
+                entry = self.__findEntry(loadIndexFile(directory))
+                dirFiles[directory] = entry.get("files", {}) if entry else {}
+
+            fileEntry = dirFiles[directory].get(os.path.basename(fileName))
+            try:
+                if (not fileEntry) or (fileEntry.get("signature") != nrsidecar.fileSignature(fileName)):
+                    stale.append(fileName)
+                    continue
+                # JSON: meshIdx keys are strings
+                indexed[fileName] = dict((int(k), tuple(v)) for k, v in fileEntry["decisions"].items())
+            except (OSError, KeyError, TypeError, ValueError, AttributeError):
+                stale.append(fileName)
+
+        self.indexed = indexed
+        return stale
@@ -17,6 +17,14 @@ class NormalVectorsLoadMode:
     AttrComp = 2
 
 
+# Normal vectors storage in vertex buffer
+class NormalVectorsEncoding:
+    Float      = 0  # xyz as is
+    Unorm      = 1  # xyz [0,1] -> [-1,1]
+    Octahedral = 2  # xy octahedral encoded [-1,1]
+    OctahedralUnorm = 3  # xy octahedral encoded [0,1]
+
+
 class VertexColorsLoadMode:
     Disabled = 0
     Auto     = 1 # attrIdx/compIdx calculated in importMesh()
@@ -86,6 +94,18 @@ def PositionTransformModeToStr(e):
     return "Unknown"
 
 
+def NormalVectorsEncodingToStr(e):
+    if NormalVectorsEncoding.Float == e:
+        return "Float"
+    elif NormalVectorsEncoding.Unorm == e:
+        return "Unorm"
+    elif NormalVectorsEncoding.Octahedral == e:
+        return "Octahedral"
+    elif NormalVectorsEncoding.OctahedralUnorm == e:
+        return "OctahedralUnorm"
+    return "Unknown"
+
+
 def NormalVectorsLoadModeToStr(e):
     if NormalVectorsLoadMode.Disabled == e:
         return "Disabled"
@@ -185,10 +205,15 @@ class NormalVectors(object):
         self.x = AttrComp(2, 0)  # X/Y/Z-ATTR/COMP
         self.y = AttrComp(2, 1)
         self.z = AttrComp(2, 2)
+        self.encoding = NormalVectorsEncoding.Float
+        self.renormalize = False  # Normalize decoded vectors (quantized/packed formats)
 
     def __str__(self):
         baseStr = "loadMode={}".format(NormalVectorsLoadModeToStr(self.loadMode))
-        if (NormalVectorsLoadMode.Auto == self.loadMode) or (NormalVectorsLoadMode.Disabled == self.loadMode):
+        if NormalVectorsLoadMode.Disabled == self.loadMode:
+            return baseStr
+        baseStr = "{} encoding={} renormalize={}".format(baseStr, NormalVectorsEncodingToStr(self.encoding), self.renormalize)
+        if NormalVectorsLoadMode.Auto == self.loadMode:
             return baseStr
         elif NormalVectorsLoadMode.AttrComp == self.loadMode:
             return "{} x=[{}] y=[{}] z=[{}]".format(baseStr, self.x, self.y, self.z)
@@ -211,15 +236,69 @@ class VertexColors(object):
         return "{} vcIdx={} r={} g={} b={} a={}".format(baseStr, self.vcIdx, self.r, self.g, self.b, self.a)
 
 
+class RegionLoadMode:
+    Disabled = 0
+    Box      = 1  # PreVS: axis-aligned box boxMin/boxMax
+    Sphere   = 2  # PreVS: center/radius
+    NdcBox   = 3  # PostVS: NDC box boxMin/boxMax (x/w, y/w, z/w)
+
+
+def RegionLoadModeToStr(e):
+    if RegionLoadMode.Disabled == e:
+        return "Disabled"
+    elif RegionLoadMode.Box == e:
+        return "Box"
+    elif RegionLoadMode.Sphere == e:
+        return "Sphere"
+    elif RegionLoadMode.NdcBox == e:
+        return "NdcBox"
+    return "Unknown"
+
+
+# Region of interest. Meshes with bounds outside of the region are not imported
+class Region(object):
+    def __init__(self):
+        self.loadMode = RegionLoadMode.Disabled
+        self.boxMin = [-1.0, -1.0, 0.0]
+        self.boxMax = [1.0, 1.0, 1.0]
+        self.center = [0.0, 0.0, 0.0]
+        self.radius = 1.0
+        self.useBoundsCache = False  # Per-mesh bounds sidecar file per capture directory
+
+    def __str__(self):
+        baseStr = "loadMode={}".format(RegionLoadModeToStr(self.loadMode))
+        if RegionLoadMode.Disabled == self.loadMode:
+            return baseStr
+        baseStr = "{} useBoundsCache={}".format(baseStr, self.useBoundsCache)
+        if RegionLoadMode.Sphere == self.loadMode:
+            return "{} center={} radius={}".format(baseStr, self.center, self.radius)
+        return "{} boxMin={} boxMax={}".format(baseStr, self.boxMin, self.boxMax)
+
+
 class ExtraOptions(object):
     def __init__(self):
         self.groupMeshes = False
         self.dontLoadMeshesWithoutTextures = False
         self.dontLoadQuadMeshes = False
         self.dontLoadBoxMeshes = False
+        self.workersCount = 0  # 0 - serial import. >0 - files parsed/decoded by process pool
+        self.instanceMeshes = False  # Identical geometry shares one Mesh datablock (linked duplicates)
+        self.mergeGroupMeshes = False  # Meshes with same group ids/material merged into one object
+        self.incrementalImport = False  # Re-import: only new/changed files, objects of deleted files removed
+        self.texturePrefetchThreads = 0  # >0 - textures checked/read by thread pool before material creation
+        self.textureCacheDir = ""  # Converted textures disk cache (content hash keyed). Empty - disabled
+        self.textureCacheMaxMB = 2048  # Texture cache size limit. Least recently used textures are evicted
+        self.memoryBudgetMB = 1024  # Decoded meshes waiting to be built. Decoding is paused above the budget
+        self.streamBatchMs  = 50    # Streaming import: build time slice between UI updates
+        self.maxMeshVertices = 0    # Larger meshes are split into several objects. 0 - no limit
+        self.materialLibraryDir = ""  # Persistent material library (.blend files). Known materials are linked. Empty - disabled
+        self.linkAfterImport = False  # Objects linked to the scene once after the whole import (default - after each file)
+        self.traceMemory = False    # tracemalloc peaks per stage/import in the import report (slow)
+        self.reportPath  = ""  # JSON import report (per-stage timers/counters, per-file times)
+        self.profilePath = ""  # cProfile stats of the whole import
 
     def __str__(self):
-        return "groupMeshes={} dontLoadMeshesWithoutTextures={} dontLoadQuadMeshes={} dontLoadBoxMeshes={}".format(self.groupMeshes, self.dontLoadMeshesWithoutTextures, self.dontLoadQuadMeshes, self.dontLoadBoxMeshes)
+        return "groupMeshes={} dontLoadMeshesWithoutTextures={} dontLoadQuadMeshes={} dontLoadBoxMeshes={} workersCount={} instanceMeshes={} mergeGroupMeshes={} incrementalImport={} texturePrefetchThreads={} textureCacheDir={} textureCacheMaxMB={} memoryBudgetMB={} streamBatchMs={} maxMeshVertices={} traceMemory={} materialLibraryDir={} linkAfterImport={} reportPath={} profilePath={}".format(self.groupMeshes, self.dontLoadMeshesWithoutTextures, self.dontLoadQuadMeshes, self.dontLoadBoxMeshes, self.workersCount, self.instanceMeshes, self.mergeGroupMeshes, self.incrementalImport, self.texturePrefetchThreads, self.textureCacheDir, self.textureCacheMaxMB, self.memoryBudgetMB, self.streamBatchMs, self.maxMeshVertices, self.traceMemory, self.materialLibraryDir, self.linkAfterImport, self.reportPath, self.profilePath)
 
 
 class MeshDuplicateTag(object):
@@ -259,6 +338,7 @@ class ImportOptions(object):
         self.vertCol      = VertexColors()
         self.extraOptions = ExtraOptions()
         self.meshDup      = MeshDuplicate()
+        self.region       = Region()
 
 
     def isNormalVecsEnabled(self):
@@ -273,6 +353,9 @@ class ImportOptions(object):
     def isMeshDubEnabled(self):
         return self.meshDup.loadMode != MeshDuplicateLoadMode.Disabled
 
+    def isRegionEnabled(self):
+        return self.region.loadMode != RegionLoadMode.Disabled
+
     def dump(self, postVs):
         if postVs:
             print("PosPostVs=[{}]".format(self.posPostVs))
@@ -284,4 +367,5 @@ class ImportOptions(object):
         print("VertexColors=[{}]".format(self.vertCol))
         print("ExtraOptions=[{}]".format(self.extraOptions))
         print("MeshDup=[{}]".format(self.meshDup))
+        print("Region=[{}]".format(self.region))
 
@@ -0,0 +1,105 @@
+import os
+import json
+import hashlib
+
+import nrsidecar
+
+
+# Incremental re-import (ExtraOptions.incrementalImport). Blender independent part.
+#
+# The scene stores the imported files with their signatures (size, mtime, options fingerprint),
+# every created object stores its source files. On re-import only new/changed files are imported,
+# objects of changed/deleted files are removed first.
+# Merged objects (ExtraOptions.mergeGroupMeshes) have several sources: all of them are re-imported.
+
+SCENE_FILES_PROP  = "nrImportedFiles"  # JSON {abspath: signature}
+OBJECT_SOURCES_PROP = "nrSources"      # JSON [abspath, ...]
+
+
+# Options which change created objects
+def optionsFingerprint(loadPostVs, options):
+    e = options.extraOptions
+    s = "loadPostVs={} posPostVs=[{}] posPreVs=[{}] texCoord=[{}] normalVecs=[{}] vertCol=[{}] meshDup=[{}] region=[{}]".format(
+        loadPostVs, options.posPostVs, options.posPreVs, options.texCoord, options.normalVecs, options.vertCol, options.meshDup, options.region)
+    s = s + " groupMeshes={} dontLoadMeshesWithoutTextures={} dontLoadQuadMeshes={} dontLoadBoxMeshes={} instanceMeshes={} mergeGroupMeshes={} maxMeshVertices={}".format(
+        e.groupMeshes, e.dontLoadMeshesWithoutTextures, e.dontLoadQuadMeshes, e.dontLoadBoxMeshes, e.instanceMeshes, e.mergeGroupMeshes, e.maxMeshVertices)
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def fileSignature(fileName, fingerprint):
+    return "{}|{}|{}".format(*(nrsidecar.fileSignature(fileName) + [fingerprint]))
+
+
+def loadJson(value, default):
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except Exception:
+        return default
+
+
+# File was matched by importFiles() paths (nrdecode.collectFiles: file or directory prefix)
+def isCoveredByPaths(fileName, paths):
+    for path in paths:
+        if os.path.isdir(path):
+            if os.path.dirname(fileName) == os.path.abspath(path):
+                return True
+        elif fileName == os.path.abspath(path):
+            return True
+    return False
+
+
+class IncrementalPlan(object):
+    def __init__(self):
+        self.filesToImport = []   # Paths to import (new/changed + other sources of removed objects)
+        self.removeKeys    = set()  # Object keys to remove
+        self.deletedFiles  = []   # Recorded files which no longer exist
+        self.skippedCount  = 0    # Unchanged files
+
+
+#   importedFiles: {abspath: signature} (SCENE_FILES_PROP)
+#   objectSources: [(objKey, [abspath, ...]), ...] (OBJECT_SOURCES_PROP)
+#   signatures: {abspath: signature} of collected files
+def planImport(importedFiles, objectSources, paths, fileList, signatures):
+    plan = IncrementalPlan()
+
+    stale = set()
+    for fileName, signature in importedFiles.items():
+        if fileName in signatures:
+            if signatures[fileName] != signature:
+                stale.add(fileName)
+        elif isCoveredByPaths(fileName, paths) and (not os.path.isfile(fileName)):
+            stale.add(fileName)
+            plan.deletedFiles.append(fileName)
+
+    # Objects of files which were not recorded (cancelled streaming import) are replaced
+    for objKey, sources in objectSources:
+        stale.update(fileName for fileName in sources if fileName not in importedFiles)
+
+    # Objects built from stale files are removed. Their other sources must be imported again
+    changed = True
+    while changed:
+        changed = False
+        for objKey, sources in objectSources:
+            if (objKey in plan.removeKeys) or (not stale.intersection(sources)):
+                continue
+            plan.removeKeys.add(objKey)
+            for fileName in sources:
+                if fileName not in stale:
+                    stale.add(fileName)
+                    changed = True
+
+    for fileName in fileList:
+        absName = os.path.abspath(fileName)
+        if (absName not in importedFiles) or (absName in stale):
+            plan.filesToImport.append(fileName)
+        else:
+            plan.skippedCount = plan.skippedCount + 1
+
+    # Sources outside of current paths
+    for fileName in sorted(stale):
+        if (fileName not in signatures) and os.path.isfile(fileName):
+            plan.filesToImport.append(fileName)
+
+    return plan
@@ -0,0 +1,206 @@
+import numpy as np
+
+import nrimp
+import nrtools
+
+
+# Vertex layout decode plans. Blender independent.
+#
+# Captures reuse a handful of vertex layouts for thousands of meshes. Layout interpretation
+# (normals/texcoord/color attribute lookup, uv set selection) is done once per
+# (layout signature, options selection) and memoized in a DecodePlan.
+# All AttrComp selections of a mesh (position, normals, uv sets) are concatenated, so the
+# vertex buffer is unpacked by a single nrtools call. Streams are column views of the result.
+# Component formats/offsets are known to nrtools only, so the pass itself is nrtools unpacking, not a numpy strided view.
+# If the single pass fails (bad AttrComp) streams are unpacked one by one and only the failed ones are dropped.
+#
+# Vertex colors keep nrtools.unpackVertexColorsAsList() (color formats conversion), only the attribute list is memoized.
+
+MAX_CACHED_PLANS = 256
+
+_planCache = {}
+
+
+class DecodePlan(object):
+    def __init__(self):
+        self.comps      = []    # [nrimp.AttrComp, ...] unpacked in one pass
+        self.positions  = None  # slice. None == positions not in the plan (decoded by nrtools: PosPreVs Auto)
+        self.normals    = None  # slice. None == no normals
+        self.noNormalsSmooth = False  # Normals not found: use smooth shading
+        self.uvs        = []    # [(uvIdx, slice), ...]
+        self.colorAttrs = []    # Vertex color attribute indexes
+
+
+    def addComps(self, comps):
+        start = len(self.comps)
+        self.comps.extend(comps)
+        return slice(start, len(self.comps))
+
+
+    # Column slices of the streams (positions, normals, uv sets)
+    def getStreams(self):
+        res = [columns for uvIdx, columns in self.uvs]
+        if self.normals is not None:
+            res.insert(0, self.normals)
+        if self.positions is not None:
+            res.insert(0, self.positions)
+        return res
+
+
+# unpackPlan() result. NxK float32 values, streams which failed to unpack are not available
+class VertexValues(object):
+    def __init__(self, compsCount):
+        self.values = np.empty((0, compsCount), dtype=np.float32)
+        self.failed = set()  # Slice starts of failed streams
+
+
+    def __len__(self):
+        return len(self.values)
+
+
+    # Column view of the stream or None (not in the plan/unpacking failed)
+    def getStream(self, columns):
+        if (columns is None) or (0 == len(self.values)) or (columns.start in self.failed):
+            return None
+        return self.values[:, columns]
+
+
+# Hashable description of vatrs (all fields of the layout and its attributes, nested objects included).
+# None == layout can't be described (field of unknown type), plan is compiled but not cached
+def layoutSignature(vatrs):
+    if not hasattr(vatrs, "getAttrCount"):
+        return None
+
+    class UnknownField(Exception):
+        pass
+
+    def value(v):
+        if (v is None) or isinstance(v, (bool, int, float, str, bytes)):
+            return v
+        if isinstance(v, (tuple, list)):
+            return tuple(value(x) for x in v)
+        if hasattr(v, "__dict__"):
+            return (type(v).__name__, fields(v))
+        raise UnknownField()
+
+    def fields(obj):
+        return tuple(sorted((k, value(v)) for k, v in vars(obj).items()))
+
+    try:
+        sig = [fields(vatrs)]
+        for idx in range(vatrs.getAttrCount()):
+            sig.append(fields(vatrs.getAttr(idx)))
+    except (TypeError, UnknownField):
+        return None
+    return tuple(sig)
+
+
+def compsToStr(comps):
+    return " ".join("[{}]".format(c) for c in comps)
+
+
+# Options selection used by the plan. Streams which are not loaded don't split the cache
+def selectionKey(loadPostVs, options, loadPositions, loadUvs, loadNormals, loadColors):
+    posStr = None
+    if loadPositions:
+        if loadPostVs:
+            p = options.posPostVs
+            posStr = compsToStr([p.x, p.y, p.z, p.w])
+        else:
+            posStr = str(options.posPreVs)
+    tc = options.texCoord
+    return (loadPostVs, posStr,
+            "{} uvIdx={} attrName={}".format(tc, tc.uvIdx, tc.attrName) if loadUvs else None,
+            str(options.normalVecs) if loadNormals else None,
+            str(options.vertCol) if loadColors else None)
+
+
+def compilePlan(loadPostVs, options, vatrs, loadPositions, loadUvs, loadNormals, loadColors):
+    plan = DecodePlan()
+
+    # Positions
+    if not loadPositions:
+        pass
+    elif loadPostVs:
+        p = options.posPostVs
+        plan.positions = plan.addComps([p.x, p.y, p.z, p.w])
+    elif nrimp.PositionLoadMode.AttrComp == options.posPreVs.loadMode:
+        p = options.posPreVs
+        plan.positions = plan.addComps([p.x, p.y, p.z])
+
+    # Normals
+    if loadNormals:
+        if options.normalVecs.loadMode == nrimp.NormalVectorsLoadMode.Auto:
+            autoVAtr = nrtools.createNormalVectorsAuto(vatrs)
+            if autoVAtr:
+                plan.normals = plan.addComps(autoVAtr)
+            else:
+                # NORMAL/NORMALS semantic not found.
+                # Use blender AUTOSMOOTH
+                plan.noNormalsSmooth = True
+        elif options.normalVecs.loadMode == nrimp.NormalVectorsLoadMode.AttrComp:
+            n = options.normalVecs
+            plan.normals = plan.addComps([n.x, n.y, n.z])
+
+    # TexCoords
+    if loadUvs:
+        texCoordAttrList = nrtools.createTexCoordList(options, vatrs)
+        for uvIdx in nrtools.createUVIdxListForUvIdx(options, texCoordAttrList):
+            tcAttrComp = texCoordAttrList[uvIdx]
+            plan.uvs.append((uvIdx, plan.addComps([tcAttrComp.u, tcAttrComp.v])))
+
+    # VertexColors
+    if loadColors:
+        plan.colorAttrs = list(nrtools.createVertexColorAttrsList(vatrs))
+
+    return plan
+
+
+def getDecodePlan(loadPostVs, options, vatrs, loadPositions=True, loadUvs=False, loadNormals=False, loadColors=False):
+    sig = layoutSignature(vatrs)
+    if sig is None:
+        return compilePlan(loadPostVs, options, vatrs, loadPositions, loadUvs, loadNormals, loadColors)
+
+    key = (sig, selectionKey(loadPostVs, options, loadPositions, loadUvs, loadNormals, loadColors))
+    plan = _planCache.get(key)
+    if plan is None:
+        plan = compilePlan(loadPostVs, options, vatrs, loadPositions, loadUvs, loadNormals, loadColors)
+        if len(_planCache) >= MAX_CACHED_PLANS:
+            _planCache.clear()
+        _planCache[key] = plan
+    return plan
+
+
+# comps -> NxK float32 array. None if unpacking failed
+def unpackComps(vert, vertexData, vatrs, comps):
+    try:
+        values = nrtools.unpackVertexComponentVaAsList(vert, vertexData, vatrs, comps)
+    except Exception as e:
+        nrtools.logWarn("Vertex components unpack failed: {} {}".format(compsToStr(comps), str(e)))
+        return None
+    if not values:
+        return None
+    return np.array(values, dtype=np.float32).reshape(len(values), len(comps))
+
+
+# Unpacks all plan.comps in one pass. Returns VertexValues
+def unpackPlan(plan, vert, vertexData, vatrs):
+    res = VertexValues(len(plan.comps))
+    if not plan.comps:
+        return res
+
+    values = unpackComps(vert, vertexData, vatrs, plan.comps)
+    if values is not None:
+        res.values = values
+        return res
+
+    # Failed components are isolated: streams unpacked separately, failed streams dropped
+    vertexCount = vert.getVertexCount()
+    res.values = np.zeros((vertexCount, len(plan.comps)), dtype=np.float32)
+    for columns in plan.getStreams():
+        values = unpackComps(vert, vertexData, vatrs, plan.comps[columns])
+        if (values is None) or (len(values) != vertexCount):
+            res.failed.add(columns.start)
+        else:
+            res.values[:, columns] = values
+    return res
@@ -0,0 +1,101 @@
+import collections
+
+import numpy as np
+
+import nrdecode
+
+
+# Merge-by-group mode (ExtraOptions.mergeGroupMeshes). Blender independent.
+#
+# Decoded meshes with the same group ids, material and vertex data layout are concatenated
+# into one MeshData (indexes offset by the vertex count of the previous meshes),
+# so thousands of draw calls are built as a few large objects.
+# Buckets are flushed when they reach maxVertices, so merged meshes stay bounded.
+
+MERGE_MAX_VERTICES = 4 * 1024 * 1024
+
+
+#   materialKey: MaterialManager.calcMaterialKey()
+def calcMergeKey(meshData, materialKey):
+    return (meshData.group0Id, meshData.group1Id, meshData.topology, materialKey,
+            tuple(uvIdx for uvIdx, uvs in meshData.uvLayers), len(meshData.vertexColors),
+            meshData.normals is None, meshData.useSmooth)
+
+
+def concatIndexes(arrays, offsets):
+    return np.concatenate([a + np.int32(o) for a, o in zip(arrays, offsets)]).astype(np.int32, copy=False)
+
+
+# meshList: MeshData with equal calcMergeKey()
+def mergeMeshData(meshName, meshList):
+    if 1 == len(meshList):
+        return meshList[0]
+
+    first = meshList[0]
+    res = nrdecode.MeshData(meshName, first.topology)
+    res.group0Id  = first.group0Id
+    res.group1Id  = first.group1Id
+    res.texList   = first.texList
+    res.useSmooth = first.useSmooth
+    seen = set()
+    for m in meshList:
+        for fileName in m.sources:
+            if fileName not in seen:
+                seen.add(fileName)
+                res.sources.append(fileName)
+
+    offsets = np.cumsum([0] + [len(m.positions) for m in meshList[:-1]])
+    res.positions = np.concatenate([m.positions for m in meshList])
+    if first.faces is not None:
+        res.faces = concatIndexes([m.faces for m in meshList], offsets)
+    if first.edges is not None:
+        res.edges = concatIndexes([m.edges for m in meshList], offsets)
+
+    for layerIdx, (uvIdx, uvs) in enumerate(first.uvLayers):
+        res.uvLayers.append((uvIdx, np.concatenate([m.uvLayers[layerIdx][1] for m in meshList])))
+    for layerIdx in range(len(first.vertexColors)):
+        res.vertexColors.append(np.concatenate([m.vertexColors[layerIdx] for m in meshList]))
+    if first.normals is not None:
+        res.normals = np.concatenate([m.normals for m in meshList])
+    return res
+
+
+class MeshMerger(object):
+    def __init__(self, maxVertices=MERGE_MAX_VERTICES):
+        self.maxVertices = maxVertices
+        self.__buckets = collections.OrderedDict()  # mergeKey -> [MeshData, ...]
+        self.__vertexCounts = {}                    # mergeKey -> vertices in bucket
+        self.__mergedId = 0
+
+
+    # Returns merged MeshData when the bucket is full, otherwise None
+    def add(self, mergeKey, meshData):
+        bucket = self.__buckets.setdefault(mergeKey, [])
+        vertexCount = self.__vertexCounts.get(mergeKey, 0)
+
+        res = None
+        if bucket and (vertexCount + len(meshData.positions) > self.maxVertices):
+            res = self.__merge(mergeKey)
+            bucket = self.__buckets.setdefault(mergeKey, [])
+            vertexCount = 0
+
+        bucket.append(meshData)
+        self.__vertexCounts[mergeKey] = vertexCount + len(meshData.positions)
+        return res
+
+
+    # Merged MeshData of all pending buckets
+    def flush(self):
+        res = []
+        for mergeKey in list(self.__buckets.keys()):
+            res.append(self.__merge(mergeKey))
+        return res
+
+
+    def __merge(self, mergeKey):
+        meshList = self.__buckets.pop(mergeKey)
+        self.__vertexCounts.pop(mergeKey, None)
+        first = meshList[0]
+        meshName = "merged_{}_{}_{}".format(first.group0Id, first.group1Id, self.__mergedId)
+        self.__mergedId = self.__mergedId + 1
+        return mergeMeshData(meshName, meshList)
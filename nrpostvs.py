@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+
+import nrimp
+
+
+# Vectorized PostVS unprojection. Blender independent.
+#
+# PostVS positions are clip space xyzw (row vector convention: clip = pos * projMat).
+# Projection matrix is inverted once and applied to the whole Nx4 buffer, followed by the perspective divide.
+# Inverted matrices are cached per (transformMode, fovY, width, height, useRightHanded) across meshes/files.
+
+PROJ_NEAR = 0.01    # Same near/far as nrimp.PosPostVs.projMat default
+PROJ_FAR  = 1000.0
+
+MAX_CACHED_MATRICES = 64
+
+_invMatrixCache = {}
+
+
+# D3DXMatrixPerspectiveFovLH/RH
+def createPerspectiveFovMatrix(fovY, width, height, useRightHanded, zn=PROJ_NEAR, zf=PROJ_FAR):
+    ys = 1.0 / math.tan(math.radians(fovY) / 2.0)
+    xs = ys / (float(width) / float(height))
+    m = np.zeros((4, 4), dtype=np.float64)
+    m[0, 0] = xs
+    m[1, 1] = ys
+    if useRightHanded:
+        m[2, 2] = zf / (zn - zf)
+        m[2, 3] = -1.0
+        m[3, 2] = zn * zf / (zn - zf)
+    else:
+        m[2, 2] = zf / (zf - zn)
+        m[2, 3] = 1.0
+        m[3, 2] = -zn * zf / (zf - zn)
+    return m
+
+
+# D3DXMatrixOrthoLH/RH
+def createOrthoMatrix(width, height, useRightHanded, zn=PROJ_NEAR, zf=PROJ_FAR):
+    m = np.identity(4, dtype=np.float64)
+    m[0, 0] = 2.0 / float(width)
+    m[1, 1] = 2.0 / float(height)
+    if useRightHanded:
+        m[2, 2] = 1.0 / (zn - zf)
+    else:
+        m[2, 2] = 1.0 / (zf - zn)
+    m[3, 2] = zn / (zn - zf)
+    return m
+
+
+def createProjMatrix(posPostVs, width, height):
+    if nrimp.PositionTransformMode.Matrix == posPostVs.transformMode:
+        return np.array(posPostVs.projMat, dtype=np.float64).reshape(4, 4)
+    elif nrimp.PositionTransformMode.FOV == posPostVs.transformMode:
+        return createPerspectiveFovMatrix(posPostVs.fovY, width, height, posPostVs.useRightHanded)
+    elif nrimp.PositionTransformMode.OrthoProj == posPostVs.transformMode:
+        return createOrthoMatrix(width, height, posPostVs.useRightHanded)
+    return None
+
+
+def calcMatrixKey(posPostVs, width, height):
+    if nrimp.PositionTransformMode.Matrix == posPostVs.transformMode:
+        return (posPostVs.transformMode, tuple(tuple(row) for row in posPostVs.projMat))
+    return (posPostVs.transformMode, posPostVs.fovY, width, height, posPostVs.useRightHanded)
+
+
+# Returns inverted 4x4 projection matrix or None (unknown mode/singular matrix)
+def getInvProjMatrix(posPostVs, width, height):
+    key = calcMatrixKey(posPostVs, width, height)
+    if key in _invMatrixCache:
+        return _invMatrixCache[key]
+
+    invMat = None
+    projMat = createProjMatrix(posPostVs, width, height)
+    if projMat is not None:
+        try:
+            invMat = np.linalg.inv(projMat)
+        except np.linalg.LinAlgError:
+            invMat = None
+
+    if len(_invMatrixCache) >= MAX_CACHED_MATRICES:
+        _invMatrixCache.clear()
+    _invMatrixCache[key] = invMat
+    return invMat
+
+
+# xyzw: Nx4 clip space positions. Returns Nx3 float32
+def unprojectPositions(xyzw, invMat):
+    pos = np.asarray(xyzw, dtype=np.float64).reshape(-1, 4).dot(invMat)
+    w = pos[:, 3]
+    w[0.0 == w] = 1.0
+    return np.ascontiguousarray(pos[:, :3] / w[:, None], dtype=np.float32)
@@ -0,0 +1,188 @@
+import time
+import json
+import cProfile
+import contextlib
+import tracemalloc
+
+import nrtools
+
+
+# Import instrumentation. Blender independent.
+#
+# StageStats: cumulative wall time/calls per stage and counters. Decode stats are collected per file
+# (also in worker processes, returned with nrdecode.FileData) and merged into the ImportReport.
+#
+# Stage names:
+#   decode.parse decode.header (skip rules, no vertex data) decode.read decode.unpack (one pass over vertex data) decode.positions decode.indexes decode.colors decode.uvs decode.normals decode.hash decode.bounds (ImportOptions.region)
+#   build.object (datablocks + collection linking) build.geometry build.colors build.material
+#   build.uvs build.update build.normals build.merge (ExtraOptions.mergeGroupMeshes) build.split (ExtraOptions.maxMeshVertices)
+#   build.link (SceneAssembler: objects linked to collections)
+#
+# Peaks (bytes): meshBytes (largest decoded mesh), pendingBytes (decoded meshes waiting to be built),
+# ExtraOptions.traceMemory: per-stage traced allocations peak, import.traced (whole import, main process).
+
+
+# Traced memory peak over the whole tracing. Stages reset the tracemalloc peak, the previous one is kept here
+_tracedPeak = 0
+
+
+def startMemoryTracing():
+    global _tracedPeak
+    _tracedPeak = 0
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+# Returns traced peak bytes
+def stopMemoryTracing():
+    if not tracemalloc.is_tracing():
+        return _tracedPeak
+    peak = max(_tracedPeak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return peak
+
+
+def _resetTracedPeak():
+    global _tracedPeak
+    _tracedPeak = max(_tracedPeak, tracemalloc.get_traced_memory()[1])
+    if hasattr(tracemalloc, "reset_peak"):
+        # python >= 3.9
+        tracemalloc.reset_peak()
+
+
+class StageStats(object):
+    def __init__(self):
+        self.seconds  = {}  # stage -> cumulative seconds
+        self.calls    = {}  # stage -> calls
+        self.counters = {}  # name -> value
+        self.peaks    = {}  # name -> max bytes
+
+
+    # Traced memory (ExtraOptions.traceMemory): allocations peak of the stage above the memory at its start
+    @contextlib.contextmanager
+    def stage(self, name):
+        traced = tracemalloc.is_tracing()
+        if traced:
+            _resetTracedPeak()
+            startBytes = tracemalloc.get_traced_memory()[0]
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addTime(name, time.perf_counter() - t)
+            if traced and tracemalloc.is_tracing():
+                self.peak(name, tracemalloc.get_traced_memory()[1] - startBytes)
+                _resetTracedPeak()
+
+
+    def addTime(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+    def peak(self, name, value):
+        if value > self.peaks.get(name, 0):
+            self.peaks[name] = value
+
+
+    def totalSeconds(self, prefix=""):
+        return sum(v for k, v in self.seconds.items() if k.startswith(prefix))
+
+
+    def merge(self, other):
+        for k, v in other.seconds.items():
+            self.seconds[k] = self.seconds.get(k, 0.0) + v
+        for k, v in other.calls.items():
+            self.calls[k] = self.calls.get(k, 0) + v
+        for k, v in other.counters.items():
+            self.counters[k] = self.counters.get(k, 0) + v
+        for k, v in other.peaks.items():
+            self.peak(k, v)
+
+
+    def toDict(self):
+        stages = {}
+        for k in sorted(self.seconds):
+            stages[k] = {"seconds": self.seconds[k], "calls": self.calls.get(k, 0)}
+        return {"stages": stages, "counters": dict(self.counters), "peaks": dict(self.peaks)}
+
+
+class ImportReport(object):
+    def __init__(self, loadPostVs=False, options=None):
+        self.loadPostVs = loadPostVs
+        self.options    = options
+        self.stats      = StageStats()
+        self.files      = []
+        self.__startTime = time.perf_counter()
+        self.totalSeconds = 0.0
+
+
+    # decodeStats: nrdecode.FileData.stats
+    def addFile(self, fileName, fileSize, meshesCount, decodeStats, buildSeconds):
+        self.stats.merge(decodeStats)
+        self.files.append({
+            "fileName": fileName,
+            "fileSize": fileSize,
+            "meshes": meshesCount,
+            "decodeSeconds": decodeStats.totalSeconds("decode."),
+            "buildSeconds": buildSeconds})
+
+
+    def finish(self):
+        self.totalSeconds = time.perf_counter() - self.__startTime
+
+
+    def toDict(self):
+        res = {
+            "loadPostVs": self.loadPostVs,
+            "options": optionsToDict(self.options) if self.options else {},
+            "totalSeconds": self.totalSeconds,
+            "files": self.files}
+        res.update(self.stats.toDict())
+        return res
+
+
+    def save(self, path):
+        try:
+            with open(path, "w") as f:
+                json.dump(self.toDict(), f, indent=1)
+            nrtools.logInfo("Import report saved: {}".format(path))
+        except Exception as e:
+            nrtools.logError("Import report save failed: {} {}".format(path, str(e)))
+
+
+    def printSummary(self):
+        nrtools.logInfo("Import time={:.3f}s".format(self.totalSeconds))
+        for k in sorted(self.stats.seconds):
+            nrtools.logInfo("  {:<18} {:>9.3f}s calls={}".format(k, self.stats.seconds[k], self.stats.calls.get(k, 0)))
+        for k in sorted(self.stats.peaks):
+            nrtools.logInfo("  peak {:<13} {:>9.2f}MB".format(k, self.stats.peaks[k] / 1048576.0))
+
+
+def optionsToDict(options):
+    return {
+        "posPostVs": str(options.posPostVs),
+        "posPreVs": str(options.posPreVs),
+        "texCoord": str(options.texCoord),
+        "normalVecs": str(options.normalVecs),
+        "vertCol": str(options.vertCol),
+        "extraOptions": str(options.extraOptions),
+        "meshDup": str(options.meshDup),
+        "region": str(options.region)}
+
+
+# Runs func() under cProfile when profilePath is set. Stats saved to profilePath (pstats format)
+def runProfiled(profilePath, func):
+    if not profilePath:
+        return func()
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        profiler.dump_stats(profilePath)
+        nrtools.logInfo("Profile saved: {}".format(profilePath))
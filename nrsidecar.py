@@ -0,0 +1,43 @@
+import os
+import json
+
+import nrtools
+
+
+# Sidecar index files (JSON files next to the capture: .nrhashes.json, .nrbounds.json). Blender independent.
+#
+#   {"version": version, <dataKey>: data}
+# Missing, outdated (other version) and unreadable files are loaded as empty.
+# Save failures (read-only capture directory etc.) are logged, the import goes on.
+
+
+# Source file signature. Changed files invalidate their index data
+def fileSignature(fileName):
+    st = os.stat(fileName)
+    return [st.st_size, st.st_mtime_ns]
+
+
+# Returns data or default
+#   title: index name for log messages
+def loadIndexFile(directory, fileName, version, dataKey, default, title):
+    path = os.path.join(directory, fileName)
+    if not os.path.isfile(path):
+        return default
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != version:
+            return default
+        return data.get(dataKey, default)
+    except Exception as e:
+        nrtools.logWarn("{} load failed: {} {}".format(title, path, str(e)))
+        return default
+
+
+def saveIndexFile(directory, fileName, version, dataKey, data, title):
+    path = os.path.join(directory, fileName)
+    try:
+        with open(path, "w") as f:
+            json.dump({"version": version, dataKey: data}, f)
+    except Exception as e:
+        nrtools.logWarn("{} save failed: {} {}".format(title, path, str(e)))
@@ -0,0 +1,62 @@
+import numpy as np
+
+import nrdecode
+
+
+# Large mesh splitting (ExtraOptions.maxMeshVertices). Blender independent.
+#
+# Primitives are cut into consecutive ranges small enough for maxVertices even if no vertex is shared,
+# each range gets its own compacted vertex set. Parts are generated one by one,
+# so only one part is alive next to the source mesh while it is built.
+
+
+def createPart(meshData, partIdx, vertIndexes):
+    part = nrdecode.MeshData("{}_part{}".format(meshData.meshName, partIdx), meshData.topology)
+    part.group0Id  = meshData.group0Id
+    part.group1Id  = meshData.group1Id
+    part.texList   = meshData.texList
+    part.useSmooth = meshData.useSmooth
+    part.sources   = meshData.sources
+    part.bounds    = meshData.bounds
+    if meshData.contentHash:
+        # Split is deterministic: identical meshes give identical parts
+        part.contentHash = "{}_{}".format(meshData.contentHash, partIdx)
+
+    part.uvLayers  = meshData.uvLayers  # Lines/points: no loops, layers are empty
+    part.positions = meshData.positions[vertIndexes]
+    part.vertexColors = [colors[vertIndexes] for colors in meshData.vertexColors]
+    if meshData.normals is not None:
+        part.normals = meshData.normals[vertIndexes]
+    return part
+
+
+# Primitive indexes (faces/edges) of the range -> (used vertices, remapped indexes)
+def compactIndexes(prims):
+    vertIndexes, remapped = np.unique(prims, return_inverse=True)
+    return vertIndexes, remapped.reshape(prims.shape).astype(np.int32)
+
+
+# Generator of MeshData parts with at most maxVertices vertices
+def splitMeshData(meshData, maxVertices):
+    if meshData.faces is not None:
+        prims, primSize = meshData.faces, 3
+    elif meshData.edges is not None:
+        prims, primSize = meshData.edges, 2
+    else:
+        # Points
+        for partIdx, start in enumerate(range(0, len(meshData.positions), maxVertices)):
+            yield createPart(meshData, partIdx, np.arange(start, min(start + maxVertices, len(meshData.positions))))
+        return
+
+    primsPerPart = max(1, maxVertices // primSize)
+    for partIdx, start in enumerate(range(0, len(prims), primsPerPart)):
+        end = min(start + primsPerPart, len(prims))
+        vertIndexes, remapped = compactIndexes(prims[start:end])
+        part = createPart(meshData, partIdx, vertIndexes)
+        if meshData.faces is not None:
+            part.faces = remapped
+            # Per-loop layers: loops of the faces range
+            part.uvLayers = [(uvIdx, uvs[start * 3:end * 3]) for uvIdx, uvs in meshData.uvLayers]
+        else:
+            part.edges = remapped
+        yield part
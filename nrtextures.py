@@ -0,0 +1,240 @@
+import os
+import time
+import json
+import hashlib
+import threading
+import concurrent.futures
+
+import nrtools
+
+
+# Texture prefetch. Blender independent.
+#
+# bpy.data.images.load() must run on the main thread, but disk access does not.
+# Texture files are checked (exists/header) and read by a thread pool ahead of material creation,
+# so images.load() reads from the OS file cache and broken textures are rejected without touching blender.
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+DDS_MAGIC       = b"DDS "
+DDS_HEADER_SIZE = 128  # magic + DDS_HEADER
+
+
+# Returns (ok, msg, contentHash). contentHash: sha1 of the file (calcHash) or None
+def checkTextureFile(fullpath, calcHash=False):
+    h = hashlib.sha1() if calcHash else None
+    try:
+        if not os.path.isfile(fullpath):
+            return False, "file not found", None
+
+        with open(fullpath, "rb") as f:
+            header = f.read(DDS_HEADER_SIZE)
+            if 0 == len(header):
+                return False, "empty file", None
+
+            if fullpath.lower().endswith(".dds"):
+                if (len(header) < DDS_HEADER_SIZE) or (header[:4] != DDS_MAGIC):
+                    return False, "invalid DDS header", None
+
+            # Warm file cache for images.load()
+            chunk = header
+            while chunk:
+                if h:
+                    h.update(chunk)
+                chunk = f.read(READ_CHUNK_SIZE)
+    except Exception as e:
+        return False, str(e), None
+    return True, "", (h.hexdigest() if h else None)
+
+
+class TexturePrefetcher(object):
+    #   calcHash: content hashes for material keys/TextureCache computed by the pool
+    def __init__(self, threadsCount, calcHash=False):
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=threadsCount)
+        self.__futures = {}  # fullpath -> Future
+        self.__calcHash = calcHash
+
+
+    def prefetch(self, texList):
+        for fullpath in texList:
+            if fullpath not in self.__futures:
+                self.__futures[fullpath] = self.__executor.submit(checkTextureFile, fullpath, self.__calcHash)
+
+
+    # Blocks until the texture is checked. Not prefetched textures are assumed valid
+    def isValid(self, fullpath):
+        future = self.__futures.get(fullpath)
+        if not future:
+            return True
+
+        ok, msg, contentHash = future.result()
+        if not ok:
+            nrtools.logError("--> Texture prefetch failed: {} {}".format(fullpath, msg))
+        return ok
+
+
+    # Blocks until the texture is read. None: not prefetched/hash not calculated
+    def getContentHash(self, fullpath):
+        future = self.__futures.get(fullpath)
+        if not future:
+            return None
+        return future.result()[2]
+
+
+    def shutdown(self):
+        self.__executor.shutdown(wait=False)
+
+
+# Disk cache of converted textures (ExtraOptions.textureCacheDir).
+#
+# Source textures are keyed by content hash, so identical textures saved by the ripper
+# under different names share one entry. Textures are converted once (decoded by blender,
+# saved in a format which loads without block decompression) and loaded from the cache later.
+# Textures which failed to load are remembered too. Size bounded, least recently used entries are evicted.
+#
+# Index (cacheDir/.nrtexcache.json, the directory may be shared with ExtraOptions.materialLibraryDir):
+#   sources: {abspath: [size, mtime_ns, contentHash]}  (content is not re-hashed for unchanged files)
+#   entries: {contentHash: {"file": name, "size": bytes, "lastUsed": time, "failed": bool}}
+
+TEXTURE_CACHE_INDEX_FILE_NAME = ".nrtexcache.json"
+TEXTURE_CACHE_VERSION = 1
+
+
+def calcFileHash(fullpath):
+    h = hashlib.sha1()
+    with open(fullpath, "rb") as f:
+        chunk = f.read(READ_CHUNK_SIZE)
+        while chunk:
+            h.update(chunk)
+            chunk = f.read(READ_CHUNK_SIZE)
+    return h.hexdigest()
+
+
+class TextureCache(object):
+    def __init__(self, cacheDir, maxBytes):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.prefetcher = None  # TexturePrefetcher(calcHash=True)
+        self.hits   = 0
+        self.misses = 0
+        self.__sources = {}
+        self.__entries = {}
+        self.__lock = threading.Lock()
+        self.__load()
+
+
+    def __indexPath(self):
+        return os.path.join(self.cacheDir, TEXTURE_CACHE_INDEX_FILE_NAME)
+
+
+    def __load(self):
+        path = self.__indexPath()
+        if not os.path.isfile(path):
+            return
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != TEXTURE_CACHE_VERSION:
+                return
+            self.__sources = data.get("sources", {})
+            self.__entries = data.get("entries", {})
+        except Exception as e:
+            nrtools.logWarn("Texture cache index load failed: {} {}".format(path, str(e)))
+
+
+    # Returns content hash or None (file can't be read)
+    def getContentHash(self, fullpath):
+        absPath = os.path.abspath(fullpath)
+        try:
+            st = os.stat(absPath)
+        except OSError:
+            return None
+
+        with self.__lock:
+            source = self.__sources.get(absPath)
+        if source and (source[0] == st.st_size) and (source[1] == st.st_mtime_ns):
+            return source[2]
+
+        contentHash = self.prefetcher.getContentHash(fullpath) if self.prefetcher else None
+        if not contentHash:
+            try:
+                contentHash = calcFileHash(absPath)
+            except Exception:
+                return None
+
+        with self.__lock:
+            self.__sources[absPath] = [st.st_size, st.st_mtime_ns, contentHash]
+        return contentHash
+
+
+    # Returns cached file path or None
+    def lookup(self, contentHash):
+        entry = self.__entries.get(contentHash)
+        if (not entry) or entry.get("failed"):
+            self.misses = self.misses + 1
+            return None
+
+        path = os.path.join(self.cacheDir, entry["file"])
+        if not os.path.isfile(path):
+            del self.__entries[contentHash]
+            self.misses = self.misses + 1
+            return None
+
+        entry["lastUsed"] = time.time()
+        self.hits = self.hits + 1
+        return path
+
+
+    def isFailed(self, contentHash):
+        entry = self.__entries.get(contentHash)
+        return bool(entry and entry.get("failed"))
+
+
+    # Path for a new entry. ext: converted file extension
+    def getEntryPath(self, contentHash, ext):
+        if not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+        return os.path.join(self.cacheDir, contentHash + ext)
+
+
+    # Converted file was written to getEntryPath()
+    def add(self, contentHash, path):
+        self.__entries[contentHash] = {"file": os.path.basename(path), "size": os.path.getsize(path), "lastUsed": time.time(), "failed": False}
+
+
+    def markFailed(self, contentHash):
+        self.__entries[contentHash] = {"file": "", "size": 0, "lastUsed": time.time(), "failed": True}
+
+
+    # Least recently used entries are removed until the cache fits maxBytes
+    def evict(self):
+        totalBytes = sum(e["size"] for e in self.__entries.values())
+        if totalBytes <= self.maxBytes:
+            return
+
+        for contentHash, entry in sorted(self.__entries.items(), key=lambda x: x[1]["lastUsed"]):
+            if totalBytes <= self.maxBytes:
+                break
+            if entry["failed"]:
+                continue
+            try:
+                os.remove(os.path.join(self.cacheDir, entry["file"]))
+            except OSError:
+                pass
+            totalBytes = totalBytes - entry["size"]
+            del self.__entries[contentHash]
+
+        # Sources of evicted entries are kept: hashing is still saved
+        nrtools.logInfo("Texture cache evicted to {} bytes".format(totalBytes))
+
+
+    def save(self):
+        self.evict()
+        if not os.path.isdir(self.cacheDir):
+            return
+        path = self.__indexPath()
+        try:
+            with open(path, "w") as f:
+                json.dump({"version": TEXTURE_CACHE_VERSION, "sources": self.__sources, "entries": self.__entries}, f)
+        except Exception as e:
+            nrtools.logWarn("Texture cache index save failed: {} {}".format(path, str(e)))
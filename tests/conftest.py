@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Headless bpy/nrfile/nrtools stand-ins. Registered before importer modules are imported
+import nrbenchstub
+_bpy = nrbenchstub.install()
+
+
+@pytest.fixture
+def bpy():
+    nrbenchstub.reset(_bpy)
+    return _bpy
@@ -0,0 +1,374 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+import nrimp
+import nrblendimp
+import nrbenchstub
+
+
+def test_merged_meshes_obey_max_mesh_vertices(bpy, tmp_path):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=60, primCount=40, uvSets=0, texturesCount=0)
+    capture = nrbenchstub.generateCapture(str(tmp_path), 4, [desc] * 3)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.mergeGroupMeshes = True
+    options.extraOptions.maxMeshVertices = 100
+    nrblendimp.importFiles(False, [capture], options)
+
+    assert len(bpy.data.meshes) > 1
+    for mesh in bpy.data.meshes:
+        assert 0 < len(mesh.vertices) <= 100
+
+
+def test_prefetch_threads_hash_textures(bpy, tmp_path, monkeypatch):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, texturesCount=2)
+    capture = nrbenchstub.generateCapture(str(tmp_path), 2, [desc])
+
+    # Without texture cache hashes still come from the prefetcher, not from the main thread
+    hashed = []
+    monkeypatch.setattr(nrblendimp.nrtextures, "calcFileHash", hashed.append)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.texturePrefetchThreads = 2
+    nrblendimp.importFiles(False, [capture], options)
+    assert 2 == len(bpy.data.objects)
+    assert [] == hashed
+
+
+def test_decoder_closed_on_build_error(bpy, tmp_path, monkeypatch):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, texturesCount=0)
+    capture = nrbenchstub.generateCapture(str(tmp_path), 4, [desc])
+
+    closed = []
+    close = nrblendimp.nrdecode.BoundedDecoder.close
+    def closeDecoder(self):
+        closed.append(self)
+        close(self)
+    def buildMesh(self, options, meshData):
+        raise RuntimeError("build failed")
+    monkeypatch.setattr(nrblendimp.nrdecode.BoundedDecoder, "close", closeDecoder)
+    monkeypatch.setattr(nrblendimp.BlenderImporter, "_buildMesh", buildMesh)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.workersCount = 2
+    with pytest.raises(RuntimeError):
+        nrblendimp.importFiles(False, [capture], options)
+    assert closed
+
+
+def test_stream_start_does_no_file_io(bpy, tmp_path, monkeypatch):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, texturesCount=0)
+    capture = nrbenchstub.generateCapture(str(tmp_path), 3, [desc])
+    options = nrimp.ImportOptions()
+    options.meshDup.loadMode = nrimp.MeshDuplicateLoadMode.Auto
+    options.extraOptions.incrementalImport = True
+    stream = nrblendimp.ImportStream(False, [capture], options)
+
+    touched = []
+    def record(func):
+        def wrapper(path, *args, **kwargs):
+            if str(path).startswith(capture):
+                touched.append((func.__name__, path))
+            return func(path, *args, **kwargs)
+        return wrapper
+    with monkeypatch.context() as m:
+        m.setattr(os, "stat", record(os.stat))
+        m.setattr(nrblendimp.nrdecode.glob, "glob", record(nrblendimp.nrdecode.glob.glob))
+        m.setattr("builtins.open", record(open))
+        stream.start()
+    assert [] == touched
+    assert stream.progress.preparing
+
+    # Files are listed/hashed by the steps
+    while nrblendimp.StreamState.Running == stream.step(0.001):
+        pass
+    assert 3 == stream.progress.filesTotal
+    assert 3 == len(bpy.data.objects)
+
+
+def createLibraryCapture(directory):
+    # Two materials: one and two textures
+    descList = [nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, texturesCount=n) for n in (1, 2)]
+    return nrbenchstub.generateCapture(os.path.join(directory, "capture"), 2, descList)
+
+
+def createLibraryOptions(directory):
+    options = nrimp.ImportOptions()
+    options.extraOptions.materialLibraryDir = os.path.join(directory, "library")
+    return options
+
+
+def loadLibraryIndex(directory):
+    with open(os.path.join(directory, nrblendimp.MATERIAL_LIBRARY_INDEX_FILE_NAME), "r") as f:
+        return json.load(f)
+
+
+def test_material_key_uses_texture_content(bpy, tmp_path):
+    for name, data in (("a.dds", b"DDS 1"), ("b.dds", b"DDS 1"), ("c.dds", b"DDS 2")):
+        with open(str(tmp_path / name), "wb") as f:
+            f.write(data)
+    options = nrimp.ImportOptions()
+    matMgr = nrblendimp.MaterialManager()
+    keyA = matMgr.calcMaterialKey(options, [str(tmp_path / "a.dds")], 0)
+    keyB = matMgr.calcMaterialKey(options, [str(tmp_path / "b.dds")], 0)
+    keyC = matMgr.calcMaterialKey(options, [str(tmp_path / "c.dds")], 0)
+
+    # Same content under another name: same material
+    assert keyA == keyB
+    assert keyA != keyC
+    assert nrblendimp.MaterialLibrary.calcDigest(keyA) == nrblendimp.MaterialLibrary.calcDigest(keyB)
+    assert nrblendimp.MaterialLibrary.calcDigest(keyA) != nrblendimp.MaterialLibrary.calcDigest(keyC)
+
+    options.texCoord.textureSlotIdx = 1
+    assert keyA != matMgr.calcMaterialKey(options, [str(tmp_path / "a.dds")], 0)
+
+
+def test_material_library_save_and_link(bpy, tmp_path):
+    library = nrblendimp.MaterialLibrary(str(tmp_path))
+    assert library.link("0" * 40) is None
+
+    digest = nrblendimp.MaterialLibrary.calcDigest(((), 0, (1, 0)))
+    name = nrblendimp.MaterialLibrary.getMaterialName(digest)
+    library.add(digest, bpy.data.materials.new(name))
+    library.save()
+
+    index = loadLibraryIndex(str(tmp_path))
+    assert nrblendimp.MATERIAL_LIBRARY_VERSION == index["version"]
+    fileName = index["materials"][digest]
+    assert os.path.isfile(os.path.join(str(tmp_path), fileName))
+
+    # New library instance: index round trip
+    bpy.data.materials.clear()
+    library = nrblendimp.MaterialLibrary(str(tmp_path))
+    mat = library.link(digest)
+    assert name == mat.name
+    assert 1 == library.linkedCount
+
+    # .blend file removed: not linked, material is built again
+    os.remove(os.path.join(str(tmp_path), fileName))
+    assert library.link(digest) is None
+
+
+def test_material_library_second_import_links(bpy, tmp_path):
+    capture = createLibraryCapture(str(tmp_path))
+    options = createLibraryOptions(str(tmp_path))
+    loadCount = bpy.data.libraries.loadCount
+
+    nrblendimp.importFiles(False, [capture], options)
+    assert loadCount == bpy.data.libraries.loadCount
+    assert 2 == len(bpy.data.materials)
+    for mat in bpy.data.materials:
+        assert len(mat.node_tree.nodes) > 1
+    assert 2 == len(loadLibraryIndex(options.extraOptions.materialLibraryDir)["materials"])
+    blendFiles = [x for x in os.listdir(options.extraOptions.materialLibraryDir) if x.endswith(".blend")]
+    assert 1 == len(blendFiles)
+
+    # Same library directory: materials are linked, no node trees are built
+    nrbenchstub.reset(bpy)
+    nrblendimp.importFiles(False, [capture], options)
+    assert loadCount + 2 == bpy.data.libraries.loadCount
+    assert 4 == len(bpy.data.objects)
+    assert 2 == len(bpy.data.materials)
+    for mat in bpy.data.materials:
+        assert 1 == len(mat.node_tree.nodes)
+    # Nothing new to save
+    assert blendFiles == [x for x in os.listdir(options.extraOptions.materialLibraryDir) if x.endswith(".blend")]
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({"0" * 40: "materials.blend"}),  # Unversioned index
+    json.dumps({"version": 99, "materials": {"0" * 40: "materials.blend"}}),
+    json.dumps({"version": 1, "materials": ["materials.blend"]}),
+    json.dumps({"version": 1, "materials": {"0" * 40: 5}}),
+])
+def test_material_library_bad_index_is_rebuilt(bpy, tmp_path, content):
+    capture = createLibraryCapture(str(tmp_path))
+    options = createLibraryOptions(str(tmp_path))
+    os.makedirs(options.extraOptions.materialLibraryDir)
+    with open(os.path.join(options.extraOptions.materialLibraryDir, nrblendimp.MATERIAL_LIBRARY_INDEX_FILE_NAME), "w") as f:
+        f.write(content)
+
+    loadCount = bpy.data.libraries.loadCount
+    nrblendimp.importFiles(False, [capture], options)
+    assert loadCount == bpy.data.libraries.loadCount
+    assert 4 == len(bpy.data.objects)
+    assert 2 == len(loadLibraryIndex(options.extraOptions.materialLibraryDir)["materials"])
+
+
+def test_material_library_shares_texture_cache_dir(bpy, tmp_path):
+    capture = createLibraryCapture(str(tmp_path))
+    options = createLibraryOptions(str(tmp_path))
+    options.extraOptions.textureCacheDir = options.extraOptions.materialLibraryDir
+
+    nrblendimp.importFiles(False, [capture], options)
+    assert 2 == len(loadLibraryIndex(options.extraOptions.materialLibraryDir)["materials"])
+    with open(os.path.join(options.extraOptions.textureCacheDir, nrblendimp.nrtextures.TEXTURE_CACHE_INDEX_FILE_NAME), "r") as f:
+        # Equal texture content: one entry
+        assert 1 == len(json.load(f)["entries"])
+
+    nrbenchstub.reset(bpy)
+    loadCount = bpy.data.libraries.loadCount
+    nrblendimp.importFiles(False, [capture], options)
+    assert loadCount + 2 == bpy.data.libraries.loadCount
+
+
+@pytest.mark.parametrize("encoding", [nrimp.NormalVectorsEncoding.Float, nrimp.NormalVectorsEncoding.Octahedral])
+@pytest.mark.parametrize("mergeGroupMeshes", [False, True])
+def test_normals_passed_as_array(bpy, tmp_path, monkeypatch, encoding, mergeGroupMeshes):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=0, normals=True, texturesCount=0)
+    capture = nrbenchstub.generateCapture(str(tmp_path), 2, [desc, desc])
+
+    passed = []
+    def setNormals(self, normals):
+        passed.append(normals)
+        self.normals = normals
+    monkeypatch.setattr(nrbenchstub.Mesh, "normals_split_custom_set_from_vertices", setNormals)
+
+    options = nrimp.ImportOptions()
+    options.normalVecs.encoding = encoding
+    options.extraOptions.mergeGroupMeshes = mergeGroupMeshes
+    nrblendimp.importFiles(False, [capture], options)
+    assert passed
+    for normals in passed:
+        assert isinstance(normals, np.ndarray)
+        assert np.float32 == normals.dtype
+        assert normals.flags.c_contiguous
+        assert 3 == normals.shape[1]
+    if nrimp.NormalVectorsEncoding.Octahedral == encoding:
+        for mesh in bpy.data.meshes:
+            assert np.allclose(np.linalg.norm(mesh.normals, axis=1), 1.0, atol=1e-5)
+    for mesh in bpy.data.meshes:
+        assert len(mesh.vertices) == len(mesh.normals)
+
+
+# Files with the same seed have identical mesh buffers
+def createInstancingCapture(directory, descList):
+    nrbenchstub.generateCapture(directory, 0, descList)
+    for i, desc in enumerate(descList):
+        nrbenchstub.writeSyntheticFile(os.path.join(directory, "frame_{:05d}.nr".format(i)), [desc], seed=0)
+    return os.path.join(directory, "")
+
+
+@pytest.mark.parametrize("instanceMeshes", [False, True])
+def test_identical_draws_share_mesh(bpy, tmp_path, instanceMeshes):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=1, normals=True)
+    capture = createInstancingCapture(str(tmp_path), [desc] * 3)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.instanceMeshes = instanceMeshes
+    nrblendimp.importFiles(False, [capture], options)
+    assert 3 == len(bpy.data.objects)
+    dataIds = set(id(obj.data) for obj in bpy.data.objects)
+    if instanceMeshes:
+        assert 1 == len(bpy.data.meshes)
+        assert 1 == len(dataIds)
+    else:
+        assert 3 == len(bpy.data.meshes)
+        assert 3 == len(dataIds)
+
+
+def test_different_material_is_not_shared(bpy, tmp_path):
+    # Same buffers, other textures
+    descList = [nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=1, texturesCount=n) for n in (1, 2, 1)]
+    capture = createInstancingCapture(str(tmp_path), descList)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.instanceMeshes = True
+    nrblendimp.importFiles(False, [capture], options)
+    assert 3 == len(bpy.data.objects)
+    assert 2 == len(bpy.data.meshes)
+    objects = [bpy.data.objects[name] for name in ("frame_00000", "frame_00001", "frame_00002")]
+    assert objects[0].data is objects[2].data
+    assert objects[0].data is not objects[1].data
+
+
+def createMeshData(uvs):
+    meshData = nrblendimp.nrdecode.MeshData("mesh", nrbenchstub.PrimitiveTopology.TriangleList)
+    meshData.positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+    meshData.faces = np.array([[0, 1, 2], [2, 1, 3]], dtype=np.int32)
+    meshData.texList = []
+    meshData.uvLayers = [(0, np.array(uvs, dtype=np.float32).reshape(-1, 2))]
+    meshData.contentHash = meshData.calcContentHash()
+    return meshData
+
+
+def test_different_uvs_are_not_shared(bpy):
+    uvs = [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 1.0], [1.0, 0.0], [1.0, 1.0]]
+    otherUvs = [[0.5, 0.0]] + uvs[1:]
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.instanceMeshes = True
+    importer = nrblendimp.BlenderImporter()
+    for meshData in (createMeshData(uvs), createMeshData(uvs), createMeshData(otherUvs)):
+        assert importer._buildMesh(options, meshData)
+    assert 2 == len(bpy.data.meshes)
+    assert 1 == importer.totalInstanced
+
+
+GROUP_KEYS = [(1, 1), (1, 2), (2, 1)]
+
+
+def createGroupCapture(directory):
+    descList = [nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=0, texturesCount=0, group0Id=g0, group1Id=g1)
+                for g0, g1 in GROUP_KEYS]
+    return nrbenchstub.generateCapture(directory, 2, descList)
+
+
+# Objects reachable from the scene collection
+def getLinkedObjects(collection):
+    res = list(collection.objects.objects)
+    for child in collection.children.objects:
+        res.extend(getLinkedObjects(child))
+    return res
+
+
+def test_group_meshes_collections(bpy, tmp_path):
+    capture = createGroupCapture(str(tmp_path))
+    options = nrimp.ImportOptions()
+    options.extraOptions.groupMeshes = True
+    nrblendimp.importFiles(False, [capture], options)
+
+    scene = bpy.context.scene.collection
+    assert [] == scene.objects.objects
+    assert ["grp_1", "grp_2"] == [c.name for c in scene.children.objects]
+    grp1, grp2 = scene.children.objects
+    assert ["grp_1_1", "grp_1_2"] == [c.name for c in grp1.children.objects]
+    assert ["grp_2_1"] == [c.name for c in grp2.children.objects]
+    assert [] == grp1.objects.objects
+    assert 5 == len(bpy.data.collections)
+
+    # Each collection holds the meshes of its group from both files
+    for g0, g1 in GROUP_KEYS:
+        objects = bpy.data.collections["grp_{}_{}".format(g0, g1)].objects.objects
+        assert 2 == len(objects)
+    assert 6 == len(getLinkedObjects(scene))
+
+
+@pytest.mark.parametrize("linkAfterImport", [False, True])
+@pytest.mark.parametrize("groupMeshes", [False, True])
+def test_link_after_import(bpy, tmp_path, monkeypatch, linkAfterImport, groupMeshes):
+    capture = createGroupCapture(str(tmp_path))
+
+    linkedPerFile = []
+    finishFileData = nrblendimp.BlenderImporter._finishFileData
+    def recordLinked(self, fileData, meshesCount, buildSeconds):
+        finishFileData(self, fileData, meshesCount, buildSeconds)
+        linkedPerFile.append(len(getLinkedObjects(bpy.context.scene.collection)))
+    monkeypatch.setattr(nrblendimp.BlenderImporter, "_finishFileData", recordLinked)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.groupMeshes = groupMeshes
+    options.extraOptions.linkAfterImport = linkAfterImport
+    nrblendimp.importFiles(False, [capture], options)
+
+    if linkAfterImport:
+        # Nothing in the scene while files are built
+        assert [0, 0] == linkedPerFile
+    else:
+        assert [3, 6] == linkedPerFile
+    assert 6 == len(getLinkedObjects(bpy.context.scene.collection))
+    assert 6 == len(bpy.data.objects)
@@ -0,0 +1,190 @@
+import os
+
+import numpy as np
+import pytest
+
+import nrimp
+import nrbounds
+import nrdecode
+import nrbenchstub
+
+
+UNIT = [[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]]
+
+
+def createRegion(loadMode, **kwargs):
+    region = nrimp.Region()
+    region.loadMode = loadMode
+    region.__dict__.update(kwargs)
+    return region
+
+
+def createOptions(region):
+    options = nrimp.ImportOptions()
+    options.region = region
+    return options
+
+
+@pytest.mark.parametrize("boxMin, boxMax, expected", [
+    ([0.25, 0.25, 0.25], [0.75, 0.75, 0.75], True),  # Region inside the bounds
+    ([-1.0, -1.0, -1.0], [2.0, 2.0, 2.0], True),     # Bounds inside the region
+    ([0.5, -1.0, 0.5], [2.0, 0.5, 2.0], True),       # Straddling
+    ([1.0, 1.0, 1.0], [2.0, 2.0, 2.0], True),        # Touching corner
+    ([1.5, 0.0, 0.0], [2.0, 1.0, 1.0], False),       # Outside along x
+    ([0.0, 0.0, -2.0], [1.0, 1.0, -0.5], False),     # Outside along z
+])
+def test_box_intersection(boxMin, boxMax, expected):
+    assert expected == nrbounds.isBoxIntersected(UNIT, boxMin, boxMax)
+    regionFilter = nrbounds.RegionFilter(False, createRegion(nrimp.RegionLoadMode.Box, boxMin=boxMin, boxMax=boxMax))
+    assert expected == regionFilter.intersects(UNIT)
+
+
+@pytest.mark.parametrize("center, radius, expected", [
+    ([0.5, 0.5, 0.5], 0.1, True),   # Inside
+    ([2.0, 0.5, 0.5], 1.0, True),   # Touching face
+    ([2.0, 0.5, 0.5], 0.9, False),
+    ([2.0, 2.0, 2.0], 1.75, True),  # Corner distance sqrt(3)
+    ([2.0, 2.0, 2.0], 1.7, False),
+])
+def test_sphere_intersection(center, radius, expected):
+    assert expected == nrbounds.isSphereIntersected(UNIT, center, radius)
+    regionFilter = nrbounds.RegionFilter(False, createRegion(nrimp.RegionLoadMode.Sphere, center=center, radius=radius))
+    assert expected == regionFilter.intersects(UNIT)
+
+
+def test_unknown_bounds_are_kept():
+    regionFilter = nrbounds.RegionFilter(False, createRegion(nrimp.RegionLoadMode.Box, boxMin=[5.0] * 3, boxMax=[6.0] * 3))
+    assert regionFilter.intersects(None)
+    assert nrbounds.calcBounds(None) is None
+    assert nrbounds.calcBounds(np.empty((0, 3), dtype=np.float32)) is None
+
+
+def test_ndc_bounds():
+    xyzw = np.array([[1.0, 2.0, 0.5, 2.0],
+                     [-3.0, 0.0, 1.5, 3.0],
+                     [0.5, -0.5, 0.25, 1.0]], dtype=np.float32)
+    assert [[-1.0, -0.5, 0.25], [0.5, 1.0, 0.5]] == nrbounds.calcNdcBounds(xyzw)
+
+    # Vertex behind the camera: unbounded
+    xyzw[1, 3] = -1.0
+    assert nrbounds.calcNdcBounds(xyzw) is None
+    xyzw[1, 3] = 0.0
+    assert nrbounds.calcNdcBounds(xyzw) is None
+
+
+def test_region_applicability():
+    assert nrbounds.isRegionApplicable(True, createRegion(nrimp.RegionLoadMode.NdcBox))
+    assert not nrbounds.isRegionApplicable(False, createRegion(nrimp.RegionLoadMode.NdcBox))
+    assert nrbounds.isRegionApplicable(False, createRegion(nrimp.RegionLoadMode.Sphere))
+    assert not nrbounds.isRegionApplicable(True, createRegion(nrimp.RegionLoadMode.Box))
+    assert nrbounds.createRegionFilter(True, createOptions(createRegion(nrimp.RegionLoadMode.Box))) is None
+    assert nrbounds.createRegionFilter(False, createOptions(createRegion(nrimp.RegionLoadMode.Disabled))) is None
+
+
+def test_file_culled_only_if_all_meshes_culled():
+    regionFilter = nrbounds.RegionFilter(False, createRegion(nrimp.RegionLoadMode.Box, boxMin=[0.0] * 3, boxMax=[1.0] * 3))
+    outside = {"ok": True, "bounds": [[2.0] * 3, [3.0] * 3]}
+    failed  = {"ok": False, "bounds": None}
+    fileBounds = {"meshCount": 2, "meshes": {"0": outside, "1": failed}}
+    assert regionFilter.isFileCulled(fileBounds)
+
+    fileBounds["meshes"]["1"] = {"ok": True, "bounds": UNIT}
+    assert not regionFilter.isFileCulled(fileBounds)
+
+    # Mesh missing in the index (skipped duplicate): not culled
+    fileBounds["meshes"] = {"0": outside}
+    assert not regionFilter.isMeshCulled(fileBounds, 1)
+    assert not regionFilter.isFileCulled(fileBounds)
+
+
+# Synthetic positions are in [0, 1)
+def createCapture(directory, filesCount, postVs=False):
+    topology = nrbenchstub.PrimitiveTopology.PointList if postVs else nrbenchstub.PrimitiveTopology.TriangleList
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, topology=topology, postVs=postVs,
+                                         uvSets=0, normals=False, texturesCount=0)
+    nrbenchstub.generateCapture(directory, filesCount, [desc, desc])
+    return sorted(os.path.join(directory, x) for x in os.listdir(directory) if x.endswith(".nr"))
+
+
+@pytest.mark.parametrize("loadPostVs, loadMode", [(False, nrimp.RegionLoadMode.Box), (True, nrimp.RegionLoadMode.NdcBox)])
+def test_decode_file_culls_meshes(tmp_path, loadPostVs, loadMode):
+    fileName = createCapture(str(tmp_path), 1, loadPostVs)[0]
+
+    options = createOptions(createRegion(loadMode, boxMin=[-1.0, -1.0, -1.0], boxMax=[2.0, 2.0, 2.0]))
+    fileData = nrdecode.decodeFile(loadPostVs, fileName, options, None)
+    assert 2 == len(fileData.meshes)
+    for meshData in fileData.meshes:
+        assert not meshData.culled
+        assert meshData.positions is not None
+    assert [0, 1] == sorted(fileData.meshBounds.keys())
+    for ok, bounds in fileData.meshBounds.values():
+        assert ok
+        assert np.all(np.array(bounds[0]) >= 0.0) and np.all(np.array(bounds[1]) < 1.0)
+
+    options = createOptions(createRegion(loadMode, boxMin=[2.0, 2.0, 2.0], boxMax=[3.0, 3.0, 3.0]))
+    fileData = nrdecode.decodeFile(loadPostVs, fileName, options, None)
+    assert [] == fileData.meshes
+    assert 2 == fileData.stats.counters["meshesCulled"]
+    assert 2 == len(fileData.meshBounds)
+
+
+def storeBounds(boundsIndex, fileNames, options):
+    for fileName in fileNames:
+        fileData = nrdecode.decodeFile(False, fileName, options, None, boundsIndex)
+        boundsIndex.store(fileName, fileData.meshCount, fileData.meshBounds)
+    boundsIndex.save()
+
+
+def test_bounds_index_culls_without_parsing(tmp_path, monkeypatch):
+    fileNames = createCapture(str(tmp_path), 2)
+    inside = createOptions(createRegion(nrimp.RegionLoadMode.Box, boxMin=[-1.0] * 3, boxMax=[2.0] * 3, useBoundsCache=True))
+    storeBounds(nrbounds.BoundsIndex(False, inside), fileNames, inside)
+    assert os.path.isfile(os.path.join(str(tmp_path), nrbounds.BOUNDS_INDEX_FILE_NAME))
+
+    parsed = []
+    parse = nrbenchstub.NRFile.parse
+    def recordParse(self, fileName):
+        parsed.append(os.path.basename(fileName))
+        return parse(self, fileName)
+    monkeypatch.setattr(nrbenchstub.NRFile, "parse", recordParse)
+
+    # Cache hit: region query of another run, files are not parsed
+    outside = createOptions(createRegion(nrimp.RegionLoadMode.Box, boxMin=[2.0] * 3, boxMax=[3.0] * 3, useBoundsCache=True))
+    boundsIndex = nrbounds.BoundsIndex(False, outside)
+    for fileName in fileNames:
+        assert boundsIndex.lookup(fileName) is not None
+        fileData = nrdecode.decodeFile(False, fileName, outside, None, boundsIndex)
+        assert [] == fileData.meshes
+        assert 1 == fileData.stats.counters["filesCulled"]
+    assert [] == parsed
+
+    # Region with meshes inside: parsed and decoded
+    fileData = nrdecode.decodeFile(False, fileNames[0], inside, None, nrbounds.BoundsIndex(False, inside))
+    assert 2 == len(fileData.meshes)
+    assert ["frame_00000.nr"] == parsed
+
+    # Changed file: signature differs, cache miss. Other file still hits
+    nrbenchstub.writeSyntheticFile(fileNames[1], [nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=0, texturesCount=0)], seed=100)
+    os.utime(fileNames[1], ns=(0, os.stat(fileNames[0]).st_mtime_ns + 1000000))
+    boundsIndex = nrbounds.BoundsIndex(False, outside)
+    assert boundsIndex.lookup(fileNames[0]) is not None
+    assert boundsIndex.lookup(fileNames[1]) is None
+    del parsed[:]
+    fileData = nrdecode.decodeFile(False, fileNames[1], outside, None, boundsIndex)
+    assert ["frame_00001.nr"] == parsed
+    assert 1 == fileData.stats.counters["meshesCulled"]
+
+
+def test_bounds_index_keyed_by_options(tmp_path):
+    fileNames = createCapture(str(tmp_path), 1)
+    options = createOptions(createRegion(nrimp.RegionLoadMode.Box, useBoundsCache=True))
+    storeBounds(nrbounds.BoundsIndex(False, options), fileNames, options)
+    assert nrbounds.BoundsIndex(False, options).lookup(fileNames[0]) is not None
+
+    # Filtered meshes have no bounds: other filter options don't use stored entries
+    options.extraOptions.dontLoadQuadMeshes = True
+    assert nrbounds.BoundsIndex(False, options).lookup(fileNames[0]) is None
+    # Region itself is not part of the key
+    options.extraOptions.dontLoadQuadMeshes = False
+    options.region.boxMin = [5.0] * 3
+    assert nrbounds.BoundsIndex(False, options).lookup(fileNames[0]) is not None
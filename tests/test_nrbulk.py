@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import nrbulk
+
+
+S3 = 1.0 / np.sqrt(3.0)
+S2 = 1.0 / np.sqrt(2.0)
+
+
+@pytest.mark.parametrize("xy, expected", [
+    ((0.0, 0.0), (0.0, 0.0, 1.0)),     # +Z
+    ((1.0, 0.0), (1.0, 0.0, 0.0)),     # +X
+    ((-1.0, 0.0), (-1.0, 0.0, 0.0)),   # -X
+    ((0.0, 1.0), (0.0, 1.0, 0.0)),     # +Y
+    ((0.0, -1.0), (0.0, -1.0, 0.0)),   # -Y
+    ((1.0, 1.0), (0.0, 0.0, -1.0)),    # -Z: any corner
+    ((-1.0, -1.0), (0.0, 0.0, -1.0)),
+    ((0.5, 0.5), (S2, S2, 0.0)),       # Equator diagonal
+    ((-0.5, 0.5), (-S2, S2, 0.0)),
+    ((1.0 / 3.0, 1.0 / 3.0), (S3, S3, S3)),          # Upper hemisphere diagonal
+    ((2.0 / 3.0, 2.0 / 3.0), (S3, S3, -S3)),         # Lower hemisphere: folded
+    ((-2.0 / 3.0, 2.0 / 3.0), (-S3, S3, -S3)),
+    ((2.0 / 3.0, -2.0 / 3.0), (S3, -S3, -S3)),
+])
+def test_octahedral_known_vectors(xy, expected):
+    res = nrbulk.octahedralToVectors(np.array([xy], dtype=np.float32))
+    assert np.float32 == res.dtype
+    assert np.allclose(res[0], expected, atol=1e-6)
+
+
+# Reference encoder: vector -> octahedral xy
+def encodeOctahedral(v):
+    p = v / np.abs(v).sum(axis=1)[:, None]
+    x, y = p[:, 0], p[:, 1]
+    sign = lambda a: np.where(a >= 0.0, 1.0, -1.0)
+    lower = p[:, 2] < 0.0
+    resX = np.where(lower, (1.0 - np.abs(y)) * sign(x), x)
+    resY = np.where(lower, (1.0 - np.abs(x)) * sign(y), y)
+    return np.column_stack([resX, resY])
+
+
+def test_octahedral_round_trip():
+    rnd = np.random.default_rng(0)
+    v = rnd.normal(size=(1000, 3))
+    v /= np.linalg.norm(v, axis=1)[:, None]
+    res = nrbulk.octahedralToVectors(encodeOctahedral(v))
+    assert np.allclose(np.linalg.norm(res, axis=1), 1.0, atol=1e-6)
+    assert np.allclose(res, v, atol=1e-5)
+
+
+def test_unorm_to_snorm_and_normalize():
+    values = nrbulk.unormToSnorm(np.array([[0.0, 0.5, 1.0]], dtype=np.float32))
+    assert [[-1.0, 0.0, 1.0]] == values.tolist()
+
+    arr = np.array([[3.0, 0.0, 4.0], [0.0, 0.0, 0.0]], dtype=np.float32)
+    nrbulk.normalizeVectors(arr)
+    assert np.allclose(arr, [[0.6, 0.0, 0.8], [0.0, 0.0, 0.0]])
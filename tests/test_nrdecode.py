@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pytest
+
+import nrimp
+import nrtools
+import nrdecode
+import nrbenchstub
+
+
+PRIM_COUNTS = [2, 4, 6, 12, 20, 100]
+
+
+# Stand-in for nrtools quad/box classification: a "box" with split faces (20 triangles) is skipped too
+def isMeshLoadingSkipped(options, vert, indx, textures):
+    primCount = indx.getIndexCount() // 3
+    if options.extraOptions.dontLoadQuadMeshes and (2 == primCount):
+        return True, "quad"
+    if options.extraOptions.dontLoadBoxMeshes and (primCount in (12, 20)):
+        return True, "box"
+    return False, ""
+
+
+@pytest.mark.parametrize("quads,boxes", [(False, False), (True, False), (False, True), (True, True)])
+def test_skip_decisions_match_baseline(tmp_path, monkeypatch, quads, boxes):
+    monkeypatch.setattr(nrtools, "isMeshLoadingSkipped", isMeshLoadingSkipped)
+    descs = [nrbenchstub.SyntheticMeshDesc(vertexCount=40, primCount=n, uvSets=0, texturesCount=1) for n in PRIM_COUNTS]
+    capture = nrbenchstub.generateCapture(str(tmp_path), 1, descs)
+    fileName = os.path.join(capture, "frame_00000.nr")
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.dontLoadQuadMeshes = quads
+    options.extraOptions.dontLoadBoxMeshes  = boxes
+    fileData = nrdecode.decodeFile(False, fileName, options, nrbenchstub.MeshHashesManager())
+
+    # Baseline: nrtools check for every triangle mesh
+    nr = nrbenchstub.NRFile()
+    nr.parse(fileName)
+    expected = []
+    for meshIdx in range(nr.getMeshCount()):
+        mesh = nr.getMesh(meshIdx)
+        if not isMeshLoadingSkipped(options, mesh.vert, mesh.indx, mesh.textures)[0]:
+            expected.append(PRIM_COUNTS[meshIdx])
+    assert expected == [len(m.faces) for m in fileData.meshes]
+
+
+# Stream data as a read-only memoryview slice of a larger buffer, like a memory-mapped .nr file
+def readMapped(self):
+    mapping = bytearray(16) + bytearray(self.data) + bytearray(16)
+    return memoryview(mapping).toreadonly()[16:16 + len(self.data)]
+
+
+# numpy arrays export the buffer protocol too
+def readArray(self):
+    return np.frombuffer(self.data, dtype=np.uint8)
+
+
+def decodeMeshes(fileName, options):
+    fileData = nrdecode.decodeFile(False, fileName, options, nrbenchstub.MeshHashesManager())
+    res = []
+    for m in fileData.meshes:
+        arrays = [m.positions, m.faces, m.edges, m.normals] + [uvs for uvIdx, uvs in m.uvLayers] + m.vertexColors
+        res.append((m.topology, m.contentHash, [a.tolist() if a is not None else None for a in arrays]))
+    return res
+
+
+@pytest.mark.parametrize("read", [readMapped, readArray])
+def test_buffer_streams_match_bytes(tmp_path, monkeypatch, read):
+    topology = nrbenchstub.PrimitiveTopology
+    descs = [nrbenchstub.SyntheticMeshDesc(vertexCount=40, primCount=30, uvSets=2, colorSets=1, normals=True),
+             nrbenchstub.SyntheticMeshDesc(vertexCount=40, primCount=30, topology=topology.LineList, uvSets=0),
+             nrbenchstub.SyntheticMeshDesc(vertexCount=40, primCount=0, topology=topology.PointList, uvSets=0, texturesCount=0)]
+    capture = nrbenchstub.generateCapture(str(tmp_path), 1, descs)
+    fileName = os.path.join(capture, "frame_00000.nr")
+
+    options = nrimp.ImportOptions()
+    options.vertCol.loadMode = nrimp.VertexColorsLoadMode.Auto
+    options.extraOptions.instanceMeshes = True
+    expected = decodeMeshes(fileName, options)
+    assert 3 == len(expected)
+
+    monkeypatch.setattr(nrbenchstub.SyntheticStream, "read", read)
+    assert expected == decodeMeshes(fileName, options)
+
+
+def test_index_stream_is_not_copied():
+    stream = nrbenchstub.SyntheticStream(np.arange(12, dtype=np.int32).tobytes(), 12)
+    view = readMapped(stream)
+    stream.read = lambda: view
+
+    faces = nrdecode.decodeIndexStream(stream, 3)
+    assert [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9, 10, 11]] == faces.tolist()
+    assert np.shares_memory(faces, np.frombuffer(view, dtype=np.uint8))
+
+
+@pytest.mark.parametrize("workersCount", [0, 2])
+def test_memoryview_streams_import(bpy, tmp_path, monkeypatch, workersCount):
+    import nrblendimp
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=40, primCount=30, uvSets=1, normals=True)
+    capture = nrbenchstub.generateCapture(str(tmp_path), 3, [desc])
+    monkeypatch.setattr(nrbenchstub.SyntheticStream, "read", readMapped)
+
+    options = nrimp.ImportOptions()
+    options.extraOptions.workersCount = workersCount
+    nrblendimp.importFiles(False, [capture], options)
+    assert 3 == len(bpy.data.meshes)
+    for mesh in bpy.data.meshes:
+        assert 40 == len(mesh.vertices)
+        assert 90 == len(mesh.loops)
+
+
+@pytest.mark.parametrize("encoding, values, expected", [
+    (nrimp.NormalVectorsEncoding.Octahedral, [[1.0, 0.0], [0.0, 0.0], [1.0, 1.0]], [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, -1.0]]),
+    (nrimp.NormalVectorsEncoding.OctahedralUnorm, [[1.0, 0.5], [0.5, 0.5], [0.5, 0.0]], [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, -1.0, 0.0]]),
+    (nrimp.NormalVectorsEncoding.Unorm, [[1.0, 0.5, 0.5], [0.5, 0.5, 0.0]], [[1.0, 0.0, 0.0], [0.0, 0.0, -1.0]]),
+])
+def test_unpack_normals_encodings(encoding, values, expected):
+    normalVecs = nrimp.NormalVectors()
+    normalVecs.encoding = encoding
+    normals = nrdecode.unpackNormals(normalVecs, np.array(values, dtype=np.float32))
+    assert (len(expected), 3) == normals.shape
+    assert np.allclose(normals, expected, atol=1e-6)
+
+
+def test_unpack_normals_renormalize():
+    normalVecs = nrimp.NormalVectors()
+    values = np.array([[0.0, 0.0, 0.5], [0.3, 0.0, 0.4]], dtype=np.float32)
+    assert np.allclose(nrdecode.unpackNormals(normalVecs, values), values)
+
+    normalVecs.renormalize = True
+    assert np.allclose(nrdecode.unpackNormals(normalVecs, values), [[0.0, 0.0, 1.0], [0.6, 0.0, 0.8]])
@@ -0,0 +1,209 @@
+import os
+import json
+import struct
+
+import numpy as np
+
+import nrimp
+import nrdecode
+import nrexport
+import nrconvert
+import nrbenchstub
+
+
+def createMeshData(name, vertexCount, faces):
+    meshData = nrdecode.MeshData(name, nrbenchstub.PrimitiveTopology.TriangleList)
+    meshData.positions = np.random.default_rng(0).random((vertexCount, 3), dtype=np.float32)
+    meshData.faces = np.array(faces, dtype=np.int32).reshape(-1, 3)
+    return meshData
+
+
+# Returns (gltf json, bin chunk)
+def readGlb(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, length = struct.unpack_from("<III", data)
+    assert (nrexport.GLB_MAGIC, 2, len(data)) == (magic, version, length)
+
+    jsonLength, chunkType = struct.unpack_from("<II", data, 12)
+    assert nrexport.GLB_CHUNK_JSON == chunkType
+    assert 0 == jsonLength % 4
+    gltf = json.loads(data[20:20 + jsonLength])
+
+    binData = b""
+    if 20 + jsonLength < len(data):
+        binLength, chunkType = struct.unpack_from("<II", data, 20 + jsonLength)
+        assert nrexport.GLB_CHUNK_BIN == chunkType
+        assert 0 == binLength % 4
+        binData = data[28 + jsonLength:28 + jsonLength + binLength]
+        assert len(binData) == binLength
+    return gltf, binData
+
+
+ACCESSOR_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4}
+
+
+# glTF 2.0 structure: references in range, views inside the buffer, accessors inside their views
+def validateGltf(gltf, binData):
+    assert "2.0" == gltf["asset"]["version"]
+    assert 0 <= gltf["scene"] < len(gltf["scenes"])
+    for name, value in gltf.items():
+        if isinstance(value, list):
+            assert value, name
+
+    nodes = gltf.get("nodes", [])
+    for scene in gltf["scenes"]:
+        assert all(0 <= n < len(nodes) for n in scene.get("nodes", []))
+    for node in nodes:
+        assert 0 <= node["mesh"] < len(gltf["meshes"])
+
+    if binData:
+        assert [{"byteLength": len(binData)}] == gltf["buffers"]
+    for view in gltf.get("bufferViews", []):
+        assert 0 == view["buffer"]
+        assert 0 == view["byteOffset"] % 4
+        assert 0 < view["byteLength"]
+        assert view["byteOffset"] + view["byteLength"] <= len(binData)
+
+    accessors = gltf.get("accessors", [])
+    for accessor in accessors:
+        view = gltf["bufferViews"][accessor["bufferView"]]
+        assert 0 < accessor["count"]
+        assert accessor["componentType"] in (nrexport.GLTF_FLOAT, nrexport.GLTF_UNSIGNED_INT)
+        assert accessor["count"] * ACCESSOR_SIZES[accessor["type"]] * 4 <= view["byteLength"]
+
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh["primitives"]:
+            attributes = primitive["attributes"]
+            position = accessors[attributes["POSITION"]]
+            assert ("VEC3", 3, 3) == (position["type"], len(position["min"]), len(position["max"]))
+            for name, accessorIdx in attributes.items():
+                assert accessors[accessorIdx]["count"] == position["count"], name
+            if "indices" in primitive:
+                indices = accessors[primitive["indices"]]
+                view = gltf["bufferViews"][indices["bufferView"]]
+                assert nrexport.GLTF_ELEMENT_ARRAY_BUFFER == view["target"]
+                values = np.frombuffer(binData, dtype=np.uint32, count=indices["count"], offset=view["byteOffset"])
+                assert values.max() < position["count"]
+                assert 0 == indices["count"] % (3 if nrexport.GLTF_MODE_TRIANGLES == primitive["mode"] else 2)
+            if "material" in primitive:
+                assert 0 <= primitive["material"] < len(gltf["materials"])
+
+    for material in gltf.get("materials", []):
+        texture = material["pbrMetallicRoughness"].get("baseColorTexture")
+        if texture:
+            assert 0 <= texture["index"] < len(gltf["textures"])
+    for texture in gltf.get("textures", []):
+        source = texture["extensions"]["MSFT_texture_dds"]["source"] if "extensions" in texture else texture["source"]
+        assert 0 <= source < len(gltf["images"])
+
+
+def readAccessor(gltf, binData, accessorIdx):
+    accessor = gltf["accessors"][accessorIdx]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    size = ACCESSOR_SIZES[accessor["type"]]
+    values = np.frombuffer(binData, dtype=np.float32, count=accessor["count"] * size, offset=view["byteOffset"])
+    return values.reshape(-1, size)
+
+
+def test_glb_structure(tmp_path):
+    topology = nrbenchstub.PrimitiveTopology
+    descs = [nrbenchstub.SyntheticMeshDesc(vertexCount=50, primCount=20, topology=t, uvSets=2, colorSets=1, texturesCount=1)
+             for t in (topology.TriangleList, topology.LineList, topology.PointList)]
+    capture = nrbenchstub.generateCapture(str(tmp_path / "capture"), 1, descs + descs)
+    options = nrimp.ImportOptions()
+    options.vertCol.loadMode = nrimp.VertexColorsLoadMode.Auto
+    options.extraOptions.instanceMeshes = True
+
+    fileName = os.path.join(capture, "frame_00000.nr")
+    outPath = str(tmp_path / "out.glb")
+    res = nrconvert.convertFile(False, fileName, outPath, "glb", options, nrbenchstub.MeshHashesManager())
+    assert res.ok, res.error
+
+    gltf, binData = readGlb(outPath)
+    validateGltf(gltf, binData)
+    assert 6 == len(gltf["nodes"])
+    assert [nrexport.GLTF_MODE_TRIANGLES, nrexport.GLTF_MODE_LINES, nrexport.GLTF_MODE_POINTS] == \
+        [m["primitives"][0]["mode"] for m in gltf["meshes"][:3]]
+    assert ["MSFT_texture_dds"] == gltf["extensionsUsed"]
+
+    # Unit normals, linear colors (decoded colors are sRGB encoded)
+    fileData = nrdecode.decodeFile(False, fileName, options, nrbenchstub.MeshHashesManager())
+    attributes = gltf["meshes"][0]["primitives"][0]["attributes"]
+    normals = readAccessor(gltf, binData, attributes["NORMAL"])
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1.0, atol=1e-5)
+    srgb = fileData.meshes[0].vertexColors[0]
+    colors = readAccessor(gltf, binData, attributes["COLOR_0"])
+    assert np.all((0.0 <= colors) & (colors <= 1.0))
+    assert np.allclose(colors[:, 3], srgb[:, 3])
+    assert np.allclose(colors[:, :3], np.where(srgb[:, :3] <= 0.04045, srgb[:, :3] / 12.92, ((srgb[:, :3] + 0.055) / 1.055) ** 2.4), atol=1e-6)
+    assert np.all(colors[:, :3] <= srgb[:, :3] + 1e-6)
+    for mesh in gltf["meshes"]:
+        attributes = mesh["primitives"][0]["attributes"]
+        if "NORMAL" in attributes:
+            assert np.allclose(np.linalg.norm(readAccessor(gltf, binData, attributes["NORMAL"]), axis=1), 1.0, atol=1e-5)
+
+
+def test_color_and_normal_conversion():
+    colors = nrexport.srgbToLinear(np.array([[0.0, 0.04045, 1.0, 0.5], [0.5, 1.5, -0.5, 0.25]], dtype=np.float32))
+    assert np.allclose(colors, [[0.0, 0.04045 / 12.92, 1.0, 0.5], [0.2140411, 1.0, 0.0, 0.25]], atol=1e-6)
+
+    normals = nrexport.toUnitNormals(np.array([[0.0, 0.0, 2.0], [3.0, 4.0, 0.0], [0.0, 0.0, 0.0]], dtype=np.float32))
+    assert np.allclose(normals, [[0.0, 0.0, 1.0], [0.6, 0.8, 0.0], [0.0, 1.0, 0.0]])
+
+
+def test_empty_meshes_are_skipped(tmp_path):
+    outPath = str(tmp_path / "out.glb")
+    writer = nrexport.GltfWriter(nrimp.ImportOptions(), outPath)
+    assert not writer.addMesh(createMeshData("empty", 4, []))
+    assert writer.addMesh(createMeshData("tri", 3, [0, 1, 2]))
+    writer.save()
+
+    gltf, binData = readGlb(outPath)
+    validateGltf(gltf, binData)
+    assert ["tri"] == [m["name"] for m in gltf["meshes"]]
+    for accessor in gltf["accessors"]:
+        assert accessor["count"] > 0
+    for view in gltf["bufferViews"]:
+        assert view["byteLength"] > 0
+
+
+def test_no_meshes_writes_valid_glb(tmp_path):
+    outPath = str(tmp_path / "out.glb")
+    writer = nrexport.GltfWriter(nrimp.ImportOptions(), outPath)
+    writer.addMesh(createMeshData("empty", 4, []))
+    writer.save()
+
+    gltf, binData = readGlb(outPath)
+    validateGltf(gltf, binData)
+    assert [{}] == gltf["scenes"]
+    for name in ("nodes", "meshes", "accessors", "bufferViews", "buffers"):
+        assert name not in gltf
+    assert b"" == binData
+
+
+def test_obj_written_on_save(tmp_path):
+    outPath = str(tmp_path / "out.obj")
+    writer = nrexport.ObjWriter(nrimp.ImportOptions(), outPath)
+    writer.addMesh(createMeshData("a", 3, [0, 1, 2]))
+    writer.addMesh(createMeshData("b", 3, [2, 1, 0]))
+    assert not os.path.exists(outPath)
+    writer.save()
+
+    with open(outPath, "r") as f:
+        lines = f.read().splitlines()
+    assert ["o a", "o b"] == [x for x in lines if x.startswith("o ")]
+    assert ["f 1 2 3", "f 6 5 4"] == [x for x in lines if x.startswith("f ")]
+
+
+def test_convert_worker_pool(tmp_path):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, texturesCount=1)
+    capture = nrbenchstub.generateCapture(str(tmp_path / "capture"), 3, [desc, desc])
+    outDirectory = str(tmp_path / "out")
+
+    assert 0 == nrconvert.convert(False, [capture], outDirectory, "glb", nrimp.ImportOptions(), 2)
+    assert 3 == len(os.listdir(outDirectory))
+    for name in os.listdir(outDirectory):
+        gltf, binData = readGlb(os.path.join(outDirectory, name))
+        validateGltf(gltf, binData)
+        assert 2 == len(gltf["nodes"])
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+
+import pytest
+
+import nrimp
+import nrhashes
+import nrblendimp
+import nrbenchstub
+
+
+def createCapture(directory):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=0, normals=False, texturesCount=0)
+    nrbenchstub.generateCapture(directory, 0, [])
+    # frame_00000/frame_00001: same buffers, second one is a duplicate
+    for i, seed in enumerate((0, 0, 1)):
+        nrbenchstub.writeSyntheticFile(os.path.join(directory, "frame_{:05d}.nr".format(i)), [desc], seed=seed)
+    return os.path.join(str(directory), "")
+
+
+def createOptions(incremental):
+    options = nrimp.ImportOptions()
+    options.meshDup.loadMode = nrimp.MeshDuplicateLoadMode.Auto
+    options.extraOptions.incrementalImport = incremental
+    return options
+
+
+def loadIndexFiles(directory):
+    with open(os.path.join(directory, nrhashes.HASH_INDEX_FILE_NAME), "r") as f:
+        return [sorted(entry["files"].keys()) for entry in json.load(f)["entries"]]
+
+
+def test_incremental_import_keeps_full_index(bpy, tmp_path):
+    capture = createCapture(str(tmp_path))
+    allFiles = ["frame_00000.nr", "frame_00001.nr", "frame_00002.nr"]
+
+    nrblendimp.importFiles(False, [capture], createOptions(True))
+    assert 2 == len(bpy.data.objects)
+    assert [allFiles] == loadIndexFiles(capture)
+
+    # Only frame_00002 is re-imported
+    time.sleep(0.01)
+    os.utime(os.path.join(capture, "frame_00002.nr"), None)
+    nrblendimp.importFiles(False, [capture], createOptions(True))
+    assert 2 == len(bpy.data.objects)
+    for files in loadIndexFiles(capture):
+        assert allFiles == files
+
+    nrbenchstub.reset(bpy)
+    nrblendimp.importFiles(False, [capture], createOptions(False))
+    assert 2 == len(bpy.data.objects)
+
+
+# Paths of the background hashing passes
+def recordHashedPaths(monkeypatch):
+    hashed = []
+    Pool = nrhashes.multiprocessing.Pool
+    class RecordingPool(object):
+        def __init__(self, processes):
+            self.pool = Pool(processes)
+        def apply_async(self, func, args):
+            hashed.append(sorted(os.path.basename(os.path.normpath(p)) for p in args[1]))
+            return self.pool.apply_async(func, args)
+        def terminate(self):
+            self.pool.terminate()
+        def join(self):
+            self.pool.join()
+    monkeypatch.setattr(nrhashes.multiprocessing, "Pool", RecordingPool)
+    return hashed
+
+
+def test_changed_file_is_hashed_alone(bpy, tmp_path, monkeypatch):
+    capture = createCapture(str(tmp_path))
+    hashed = recordHashedPaths(monkeypatch)
+    nrblendimp.importFiles(False, [capture], createOptions(False))
+    assert 2 == len(bpy.data.objects)
+    assert [[os.path.basename(os.path.normpath(capture))]] == hashed
+
+    # Unchanged capture: no hashing pass
+    manager = nrhashes.PersistentHashesManager()
+    manager.loadHashes(False, [capture], createOptions(False))
+    assert manager.fromIndex
+
+    # frame_00002 changed: only its decisions are invalidated
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=0, normals=False, texturesCount=0)
+    nrbenchstub.writeSyntheticFile(os.path.join(capture, "frame_00002.nr"), [desc, desc], seed=2)
+    manager = nrhashes.PersistentHashesManager()
+    manager.loadHashes(False, [capture], createOptions(False))
+    assert not manager.fromIndex
+    assert [os.path.join(capture, "frame_00002.nr")] == manager.hashedFiles
+    assert ["frame_00000.nr", "frame_00001.nr"] == sorted(os.path.basename(f) for f in manager.indexed)
+    # Duplicate decision of the unchanged file is kept
+    assert manager.skipMeshLoading(os.path.join(capture, "frame_00001.nr"), 0)[0]
+    assert not manager.skipMeshLoading(os.path.join(capture, "frame_00000.nr"), 0)[0]
+
+    nrbenchstub.reset(bpy)
+    nrblendimp.importFiles(False, [capture], createOptions(False))
+    assert ["frame_00002.nr"] == hashed[-1]
+    assert 2 == len(hashed)
+    assert ["frame_00000", "frame_00002", "frame_00002.001"] == sorted(bpy.data.objects.keys())
+
+    nrbenchstub.reset(bpy)
+    nrblendimp.importFiles(False, [capture], createOptions(False))
+    assert 2 == len(hashed)
+    assert ["frame_00000", "frame_00002", "frame_00002.001"] == sorted(bpy.data.objects.keys())
+
+
+def test_deleted_file_is_dropped_from_index(bpy, tmp_path):
+    capture = createCapture(str(tmp_path))
+    nrblendimp.importFiles(False, [capture], createOptions(False))
+    os.remove(os.path.join(capture, "frame_00000.nr"))
+
+    # frame_00001 keeps its stored decision. Its original is gone: documented limitation
+    nrbenchstub.reset(bpy)
+    nrbenchstub.writeSyntheticFile(os.path.join(capture, "frame_00003.nr"), [nrbenchstub.SyntheticMeshDesc(vertexCount=30, primCount=10, uvSets=0, normals=False, texturesCount=0)], seed=3)
+    nrblendimp.importFiles(False, [capture], createOptions(False))
+    assert [["frame_00001.nr", "frame_00002.nr", "frame_00003.nr"]] == loadIndexFiles(capture)
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({"version": 1, "entries": [{"key": "k", "files": {"frame_00000.nr": {"0": [False, ""]}}}]}),
+    None,  # Current version, entry with bad file records
+])
+def test_bad_index_is_rebuilt(bpy, tmp_path, monkeypatch, content):
+    capture = createCapture(str(tmp_path))
+    options = createOptions(False)
+    if content is None:
+        files = {"frame_00000.nr": {"decisions": {}}, "frame_00001.nr": [1, 2],
+                 "frame_00002.nr": {"signature": [0, 0], "decisions": {}}}
+        content = json.dumps({"version": nrhashes.HASH_INDEX_VERSION, "entries": [{"key": nrhashes.calcIndexKey(False, options), "files": files}]})
+    with open(os.path.join(capture, nrhashes.HASH_INDEX_FILE_NAME), "w") as f:
+        f.write(content)
+
+    hashed = recordHashedPaths(monkeypatch)
+    nrblendimp.importFiles(False, [capture], options)
+    assert 1 == len(hashed)
+    assert 2 == len(bpy.data.objects)
+    assert [["frame_00000.nr", "frame_00001.nr", "frame_00002.nr"]] == loadIndexFiles(capture)
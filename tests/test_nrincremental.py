@@ -0,0 +1,68 @@
+import os
+
+import nrincremental
+
+
+def createCapture(directory, count):
+    files = []
+    for i in range(count):
+        fileName = os.path.join(directory, "frame_{:05d}.nr".format(i))
+        with open(fileName, "w") as f:
+            f.write("{}")
+        files.append(fileName)
+    return files
+
+
+def plan(importedFiles, objectSources, directory, signatures):
+    paths = [os.path.join(directory, "")]
+    fileList = sorted(signatures.keys())
+    return nrincremental.planImport(importedFiles, objectSources, paths, fileList, signatures)
+
+
+def test_unchanged_and_added_files(tmp_path):
+    directory = str(tmp_path)
+    a, b, c = createCapture(directory, 3)
+    imported = {a: "1", b: "1"}
+    res = plan(imported, [("obj_a", [a]), ("obj_b", [b])], directory, {a: "1", b: "1", c: "1"})
+    assert [c] == res.filesToImport
+    assert set() == res.removeKeys
+    assert 2 == res.skippedCount
+
+
+def test_changed_file_objects_removed(tmp_path):
+    directory = str(tmp_path)
+    a, b = createCapture(directory, 2)
+    res = plan({a: "1", b: "1"}, [("obj_a", [a]), ("obj_b", [b])], directory, {a: "2", b: "1"})
+    assert [a] == res.filesToImport
+    assert {"obj_a"} == res.removeKeys
+    assert [] == res.deletedFiles
+
+
+def test_deleted_file_objects_removed(tmp_path):
+    directory = str(tmp_path)
+    a, b = createCapture(directory, 2)
+    os.remove(b)
+    res = plan({a: "1", b: "1"}, [("obj_a", [a]), ("obj_b", [b])], directory, {a: "1"})
+    assert [] == res.filesToImport
+    assert {"obj_b"} == res.removeKeys
+    assert [b] == res.deletedFiles
+
+
+def test_merged_object_sources_reimported(tmp_path):
+    directory = str(tmp_path)
+    a, b, c = createCapture(directory, 3)
+    imported = {a: "1", b: "1", c: "1"}
+    objects = [("merged_0", [a, b]), ("merged_1", [b, c]), ("obj_c", [c])]
+    res = plan(imported, objects, directory, {a: "2", b: "1", c: "1"})
+    # a changed -> merged_0 (a, b) -> merged_1 (b, c) -> obj_c
+    assert {"merged_0", "merged_1", "obj_c"} == res.removeKeys
+    assert [a, b, c] == res.filesToImport
+
+
+def test_unrecorded_sources_replaced(tmp_path):
+    directory = str(tmp_path)
+    a, b = createCapture(directory, 2)
+    # Cancelled import: objects of b were created, b was not recorded
+    res = plan({a: "1"}, [("obj_a", [a]), ("obj_b", [b])], directory, {a: "1", b: "1"})
+    assert {"obj_b"} == res.removeKeys
+    assert [b] == res.filesToImport
@@ -0,0 +1,53 @@
+import numpy as np
+
+import nrimp
+import nrlayout
+import nrbenchstub
+
+
+def createMesh():
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=16, primCount=4, uvSets=1, normals=True)
+    return nrbenchstub.SyntheticMesh(desc, np.random.default_rng(0))
+
+
+def test_failed_stream_is_isolated():
+    mesh = createMesh()
+    vertexData = mesh.vert.read()
+    plan = nrlayout.DecodePlan()
+    plan.positions = plan.addComps([nrimp.AttrComp(0, i) for i in range(3)])
+    plan.normals = plan.addComps([nrimp.AttrComp(1, i) for i in range(3)])
+    # No such attribute
+    plan.uvs.append((0, plan.addComps([nrimp.AttrComp(9, 0), nrimp.AttrComp(9, 1)])))
+
+    values = nrlayout.unpackPlan(plan, mesh.vert, vertexData, mesh.vatrs)
+    expected = np.frombuffer(vertexData, dtype=np.float32).reshape(16, -1)
+    assert np.array_equal(values.getStream(plan.positions), expected[:, 0:3])
+    assert np.array_equal(values.getStream(plan.normals), expected[:, 3:6])
+    assert values.getStream(plan.uvs[0][1]) is None
+
+
+def test_single_pass_matches_streams():
+    mesh = createMesh()
+    vertexData = mesh.vert.read()
+    plan = nrlayout.DecodePlan()
+    plan.positions = plan.addComps([nrimp.AttrComp(0, i) for i in range(3)])
+    plan.uvs.append((0, plan.addComps([nrimp.AttrComp(2, 0), nrimp.AttrComp(2, 1)])))
+
+    values = nrlayout.unpackPlan(plan, mesh.vert, vertexData, mesh.vatrs)
+    expected = np.frombuffer(vertexData, dtype=np.float32).reshape(16, -1)
+    assert not values.failed
+    assert np.array_equal(values.getStream(plan.uvs[0][1]), expected[:, 6:8])
+
+
+def test_layout_signature_includes_all_fields():
+    a = createMesh().vatrs
+    b = createMesh().vatrs
+    assert nrlayout.layoutSignature(a) == nrlayout.layoutSignature(b)
+
+    a.getAttr(0).formats = ["R32G32B32_FLOAT"]
+    b.getAttr(0).formats = ["R16G16B16A16_FLOAT"]
+    assert nrlayout.layoutSignature(a) != nrlayout.layoutSignature(b)
+
+    # Field which can't be described: plan is not cached
+    b.getAttr(0).formats = object()
+    assert nrlayout.layoutSignature(b) is None
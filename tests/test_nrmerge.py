@@ -0,0 +1,55 @@
+import numpy as np
+
+import nrdecode
+import nrmerge
+import nrbenchstub
+
+
+def createMeshData(name, vertexCount):
+    meshData = nrdecode.MeshData(name, nrbenchstub.PrimitiveTopology.TriangleList)
+    meshData.positions = np.full((vertexCount, 3), len(name), dtype=np.float32)
+    meshData.faces = np.arange(vertexCount // 3 * 3, dtype=np.int32).reshape(-1, 3)
+    meshData.sources = ["/capture/{}.nr".format(name)]
+    return meshData
+
+
+def test_bucket_flushed_above_cap():
+    merger = nrmerge.MeshMerger(100)
+    assert merger.add("key", createMeshData("a", 40)) is None
+    assert merger.add("key", createMeshData("b", 40)) is None
+    merged = merger.add("key", createMeshData("c", 40))
+    assert 80 == len(merged.positions)
+    assert ["/capture/a.nr", "/capture/b.nr"] == merged.sources
+
+    rest = merger.flush()
+    assert [40] == [len(m.positions) for m in rest]
+
+
+def test_bucket_exactly_at_cap_is_kept():
+    merger = nrmerge.MeshMerger(100)
+    assert merger.add("key", createMeshData("a", 50)) is None
+    assert merger.add("key", createMeshData("b", 50)) is None
+    assert [100] == [len(m.positions) for m in merger.flush()]
+
+
+def test_mesh_above_cap_is_not_merged():
+    merger = nrmerge.MeshMerger(100)
+    assert merger.add("key", createMeshData("a", 150)) is None
+    merged = merger.add("key", createMeshData("b", 30))
+    assert 150 == len(merged.positions)
+    assert [30] == [len(m.positions) for m in merger.flush()]
+
+
+def test_keys_are_separate():
+    merger = nrmerge.MeshMerger(100)
+    assert merger.add("a", createMeshData("a", 60)) is None
+    assert merger.add("b", createMeshData("b", 60)) is None
+    assert [60, 60] == [len(m.positions) for m in merger.flush()]
+
+
+def test_merged_indexes_are_offset():
+    a = createMeshData("a", 6)
+    b = createMeshData("bb", 3)
+    merged = nrmerge.mergeMeshData("merged", [a, b])
+    assert merged.faces.tolist() == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+    assert np.array_equal(merged.positions[merged.faces[2]], b.positions[b.faces[0]])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import nrimp
+import nrtools
+import nrdecode
+import nrpostvs
+import nrbenchstub
+
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+# PostVS mesh with clip space positions of random view space points (near/far 0.01/1000)
+def createPostVsMesh(posPostVs):
+    desc = nrbenchstub.SyntheticMeshDesc(vertexCount=64, primCount=0, topology=nrbenchstub.PrimitiveTopology.PointList,
+                                         postVs=True, uvSets=0, normals=False, texturesCount=0)
+    mesh = nrbenchstub.SyntheticMesh(desc, np.random.default_rng(0))
+
+    rnd = np.random.default_rng(1)
+    depth = rnd.uniform(0.5, 900.0, 64)
+    # Right handed view space looks along -z
+    viewPos = np.column_stack([rnd.uniform(-0.3, 0.3, 64) * depth, rnd.uniform(-0.3, 0.3, 64) * depth,
+                               -depth if posPostVs.useRightHanded else depth, np.ones(64)])
+    projMat = nrpostvs.createProjMatrix(posPostVs, WIDTH, HEIGHT)
+    clip = viewPos.dot(projMat).astype(np.float32)
+    mesh.vert.data = clip.tobytes()
+    return mesh, clip, viewPos[:, :3]
+
+
+@pytest.mark.parametrize("transformMode", [nrimp.PositionTransformMode.FOV, nrimp.PositionTransformMode.OrthoProj,
+                                           nrimp.PositionTransformMode.Matrix])
+@pytest.mark.parametrize("useRightHanded", [False, True])
+def test_unproject_matches_reference(transformMode, useRightHanded):
+    options = nrimp.ImportOptions()
+    options.posPostVs.transformMode = transformMode
+    options.posPostVs.useRightHanded = useRightHanded
+    if nrimp.PositionTransformMode.Matrix == transformMode:
+        options.posPostVs.projMat = nrpostvs.createPerspectiveFovMatrix(60.0, WIDTH, HEIGHT, useRightHanded).tolist()
+    mesh, clip, viewPos = createPostVsMesh(options.posPostVs)
+
+    positions = nrdecode.unprojectPostVs(options, mesh, clip)
+    reference = np.array(nrtools.createPos3FromPostVsAsList(options, mesh, mesh.vatrs, mesh.vert, mesh.vert.read()))
+    assert positions.shape == reference.shape
+    assert np.allclose(positions, reference, rtol=1e-5, atol=1e-4)
+    # Round trip (float32 clip coordinates)
+    assert np.allclose(positions, viewPos, rtol=1e-2, atol=1e-2)
@@ -0,0 +1,21 @@
+import os
+
+import nrsidecar
+
+
+def test_round_trip(tmp_path):
+    directory = str(tmp_path)
+    nrsidecar.saveIndexFile(directory, ".index.json", 2, "files", {"a.nr": [1, 2]}, "Test index")
+    assert {"a.nr": [1, 2]} == nrsidecar.loadIndexFile(directory, ".index.json", 2, "files", {}, "Test index")
+
+
+def test_outdated_and_broken_files_load_as_default(tmp_path):
+    directory = str(tmp_path)
+    assert [] == nrsidecar.loadIndexFile(directory, ".index.json", 1, "entries", [], "Test index")
+
+    nrsidecar.saveIndexFile(directory, ".index.json", 1, "entries", [{"key": "k"}], "Test index")
+    assert [] == nrsidecar.loadIndexFile(directory, ".index.json", 2, "entries", [], "Test index")
+
+    with open(os.path.join(directory, ".index.json"), "w") as f:
+        f.write("{broken")
+    assert [] == nrsidecar.loadIndexFile(directory, ".index.json", 1, "entries", [], "Test index")
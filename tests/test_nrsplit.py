@@ -0,0 +1,57 @@
+import numpy as np
+
+import nrdecode
+import nrsplit
+import nrbenchstub
+
+
+def createMeshData(topology, vertexCount, prims):
+    rnd = np.random.default_rng(0)
+    meshData = nrdecode.MeshData("mesh", topology)
+    meshData.positions = rnd.random((vertexCount, 3), dtype=np.float32)
+    meshData.normals = rnd.random((vertexCount, 3), dtype=np.float32)
+    meshData.vertexColors = [rnd.random((vertexCount, 4), dtype=np.float32)]
+    if nrbenchstub.PrimitiveTopology.TriangleList == topology:
+        meshData.faces = prims
+        meshData.uvLayers = [(0, rnd.random((prims.size, 2), dtype=np.float32))]
+    elif nrbenchstub.PrimitiveTopology.LineList == topology:
+        meshData.edges = prims
+    return meshData
+
+
+def test_triangles_remapped():
+    faces = np.random.default_rng(1).integers(0, 50, size=(40, 3), dtype=np.int32)
+    meshData = createMeshData(nrbenchstub.PrimitiveTopology.TriangleList, 50, faces)
+
+    start = 0
+    for part in nrsplit.splitMeshData(meshData, 10):
+        assert len(part.positions) <= 10
+        assert part.faces.max() < len(part.positions)
+        end = start + len(part.faces)
+        # Same corners after remapping
+        assert np.array_equal(part.positions[part.faces], meshData.positions[faces[start:end]])
+        assert np.array_equal(part.normals[part.faces], meshData.normals[faces[start:end]])
+        assert np.array_equal(part.vertexColors[0][part.faces], meshData.vertexColors[0][faces[start:end]])
+        assert np.array_equal(part.uvLayers[0][1], meshData.uvLayers[0][1][start * 3:end * 3])
+        start = end
+    assert len(faces) == start
+
+
+def test_lines_remapped():
+    edges = np.random.default_rng(2).integers(0, 30, size=(25, 2), dtype=np.int32)
+    meshData = createMeshData(nrbenchstub.PrimitiveTopology.LineList, 30, edges)
+
+    parts = list(nrsplit.splitMeshData(meshData, 7))
+    assert np.array_equal(np.concatenate([p.positions[p.edges] for p in parts]), meshData.positions[edges])
+    for part in parts:
+        assert len(part.positions) <= 7
+        assert [] == part.uvLayers
+
+
+def test_points_split():
+    meshData = createMeshData(nrbenchstub.PrimitiveTopology.PointList, 25, None)
+
+    parts = list(nrsplit.splitMeshData(meshData, 10))
+    assert [10, 10, 5] == [len(p.positions) for p in parts]
+    assert np.array_equal(np.concatenate([p.positions for p in parts]), meshData.positions)
+    assert ["mesh_part0", "mesh_part1", "mesh_part2"] == [p.meshName for p in parts]
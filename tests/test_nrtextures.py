@@ -0,0 +1,78 @@
+import os
+import json
+
+import nrtextures
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now = self.now + 1.0
+        return self.now
+
+
+def addEntry(cache, contentHash, size):
+    path = cache.getEntryPath(contentHash, ".png")
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    cache.add(contentHash, path)
+    return path
+
+
+def createCache(tmp_path, monkeypatch, maxBytes):
+    monkeypatch.setattr(nrtextures.time, "time", Clock().time)
+    return nrtextures.TextureCache(str(tmp_path), maxBytes)
+
+
+def test_evict_removes_least_recently_used(tmp_path, monkeypatch):
+    cache = createCache(tmp_path, monkeypatch, 250)
+    paths = [addEntry(cache, h, 100) for h in ("a", "b", "c")]
+    # "a" is used after "b": "b" is the oldest one
+    assert paths[0] == cache.lookup("a")
+
+    cache.evict()
+    assert os.path.isfile(paths[0])
+    assert not os.path.isfile(paths[1])
+    assert os.path.isfile(paths[2])
+    assert cache.lookup("b") is None
+    assert paths[2] == cache.lookup("c")
+
+
+def test_evict_keeps_failed_entries(tmp_path, monkeypatch):
+    cache = createCache(tmp_path, monkeypatch, 100)
+    cache.markFailed("broken")
+    paths = [addEntry(cache, h, 100) for h in ("a", "b")]
+
+    cache.evict()
+    assert cache.isFailed("broken")
+    assert not os.path.isfile(paths[0])
+    assert os.path.isfile(paths[1])
+
+
+def test_evict_fits_byte_cap(tmp_path, monkeypatch):
+    cache = createCache(tmp_path, monkeypatch, 250)
+    paths = [addEntry(cache, h, 100) for h in ("a", "b", "c", "d", "e")]
+
+    cache.evict()
+    kept = [p for p in paths if os.path.isfile(p)]
+    assert paths[3:] == kept
+
+    # Under the cap: nothing to do
+    cache.evict()
+    assert paths[3:] == [p for p in paths if os.path.isfile(p)]
+
+
+def test_index_survives_reload(tmp_path, monkeypatch):
+    cache = createCache(tmp_path, monkeypatch, 1000)
+    path = addEntry(cache, "a", 100)
+    cache.markFailed("broken")
+    cache.save()
+
+    with open(os.path.join(str(tmp_path), nrtextures.TEXTURE_CACHE_INDEX_FILE_NAME), "r") as f:
+        assert nrtextures.TEXTURE_CACHE_VERSION == json.load(f)["version"]
+
+    cache = nrtextures.TextureCache(str(tmp_path), 1000)
+    assert path == cache.lookup("a")
+    assert cache.isFailed("broken")